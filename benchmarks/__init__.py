@@ -0,0 +1,47 @@
+"""Benchmarks for the vendors app.
+
+Every benchmark runs against its own SQLite file (``bench_vendors_db.sqlite3``
+by default) so ``vendors_db.sqlite3`` is never touched. Run them from the
+repository root, e.g. ``python -m benchmarks.query_plans --help``.
+"""
+
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DATABASE = BASE_DIR / "bench_vendors_db.sqlite3"
+
+
+def setup_django(database=DEFAULT_DATABASE, profile=None):
+    """Configures Django against the benchmark database instead of the
+    development one, with the connection settings of the ``DATABASE_PROFILES``
+    entry ``profile`` when given. Must run before any model is imported"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "vendor_management_system.settings")
+
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = str(database)
+    if profile is not None:
+        for key in (
+            "CONN_MAX_AGE",
+            "CONN_HEALTH_CHECKS",
+            "TRANSACTION_MODE",
+            "PRAGMAS",
+        ):
+            settings.DATABASES["default"].pop(key, None)
+        settings.DATABASES["default"].update(settings.DATABASE_PROFILES[profile])
+    settings.ALLOWED_HOSTS = ["testserver"]
+    django.setup()
+
+
+def reset_database(database=DEFAULT_DATABASE):
+    """Recreates the benchmark database from the migrations"""
+    from django.core.management import call_command
+    from django.db import connection
+
+    connection.close()
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{database}{suffix}").unlink(missing_ok=True)
+
+    call_command("migrate", verbosity=0)
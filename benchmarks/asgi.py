@@ -0,0 +1,200 @@
+"""WSGI vs ASGI throughput of the vendor performance read endpoints.
+
+Both handlers are driven in-process at the same concurrency, each in its own
+process: the WSGI one through the sync DRF views from ``--concurrency``
+threads, the ASGI one through the native async views of
+``vendors.async_apis`` (``VENDOR_ASYNC_READ_VIEWS``) from as many concurrent
+tasks on one event loop, i.e. a single worker. Requests go through the whole
+middleware stack, only the network and the server are left out.
+
+    python -m benchmarks.asgi --concurrency 200 --requests 4000 \
+        --output benchmarks/results/asgi.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import DEFAULT_DATABASE, reset_database, setup_django
+from benchmarks.endpoints import USERNAME, drive
+from benchmarks.report import add_report_arguments, finish_report
+from benchmarks.stats import summarize
+
+MODES = ("wsgi", "asgi")
+
+
+def read_cases(vendor_ids):
+    """(name, url name, method, kwargs, body) of the dashboard poller reads"""
+
+    def vendor(number):
+        return vendor_ids[number % len(vendor_ids)]
+
+    return [
+        (
+            "vendor_performance",
+            "vendor_performance_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n)},
+            None,
+        ),
+        (
+            "vendor_performance_logs",
+            "vendor_performance_log_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n)},
+            None,
+        ),
+        (
+            "vendor_performance_trend",
+            "vendor_performance_log_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n), "query": "bucket=day"},
+            None,
+        ),
+    ]
+
+
+async def adrive(case, requests, concurrency):
+    """Issues ``requests`` GET requests of ``case`` from ``concurrency`` tasks
+    sharing one ``AsyncClient``"""
+    from asgiref.sync import sync_to_async
+    from django.contrib.auth.models import User
+    from django.test import AsyncClient
+    from django.urls import reverse
+
+    from vendors.instrumentation import observe_queries
+
+    name, url_name, method, kwargs, body = case
+    numbers = itertools.count()
+    timings, query_counts, statuses = [], [], {}
+
+    client = AsyncClient(raise_request_exception=False)
+    user = await User.objects.aget(username=USERNAME)
+    await sync_to_async(client.force_login)(user)
+
+    async def worker():
+        while True:
+            number = next(numbers)
+            if number >= requests:
+                return
+
+            url_kwargs = dict(kwargs(number))
+            query = url_kwargs.pop("query", "")
+            url = reverse(f"vendors:{url_name}", kwargs=url_kwargs)
+            if query:
+                url = f"{url}?{query}"
+
+            with observe_queries() as queries:
+                started = time.perf_counter()
+                response = await client.get(url)
+                elapsed = (time.perf_counter() - started) * 1000
+
+            timings.append(elapsed)
+            query_counts.append(queries.queries)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(timings)
+    summary.update(
+        {
+            "throughput_rps": round(len(timings) / elapsed, 1),
+            "queries": max(query_counts),
+            "queries_mean": round(sum(query_counts) / len(query_counts), 2),
+            "statuses": {str(status): count for status, count in statuses.items()},
+            "errors": sum(count for status, count in statuses.items() if status >= 400),
+        }
+    )
+    return summary
+
+
+def run_mode(mode, database, vendor_ids, requests, concurrency):
+    """Drives every read case under ``mode``, in a fresh process since the URL
+    configuration picks the sync or async views once"""
+    setup_django(database)
+    # requests queued behind the others all cross the slow request threshold
+    for logger in ("django.request", "vendors.instrumentation"):
+        logging.getLogger(logger).setLevel(logging.CRITICAL)
+    from django.conf import settings
+
+    settings.VENDOR_ASYNC_READ_VIEWS = mode == "asgi"
+
+    results = {}
+    for case in read_cases(vendor_ids):
+        if mode == "asgi":
+            results[case[0]] = asyncio.run(adrive(case, requests, concurrency))
+        else:
+            results[case[0]] = drive(case, requests, concurrency)
+    return results
+
+
+def run(database, vendor_ids, requests, concurrency):
+    results = {}
+    print(
+        f"{'endpoint':<33}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'queries':>9}{'errors':>8}"
+    )
+    context = multiprocessing.get_context("spawn")
+    for mode in MODES:
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            mode_results = pool.submit(
+                run_mode, mode, database, vendor_ids, requests, concurrency
+            ).result()
+
+        for name, result in mode_results.items():
+            key = f"{mode}.{name}"
+            results[key] = result
+            print(
+                f"{key:<33}{result['throughput_rps']:>9}{result['p50_ms']:>9}"
+                f"{result['p95_ms']:>9}{result['p99_ms']:>9}{result['queries']:>9}"
+                f"{result['errors']:>8}"
+            )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vendors", type=int, default=10)
+    parser.add_argument("--purchase-orders", type=int, default=100)
+    parser.add_argument("--logs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--database", default=str(DEFAULT_DATABASE))
+    add_report_arguments(parser)
+    options = parser.parse_args(argv)
+
+    setup_django(options.database)
+    from django.contrib.auth.models import User
+    from django.db import connections
+
+    from benchmarks.data import seed
+
+    reset_database(options.database)
+    vendor_ids = seed(
+        vendors=options.vendors,
+        purchase_orders=options.purchase_orders,
+        logs=options.logs,
+    )
+    User.objects.create_user(username=USERNAME, password=USERNAME)
+    connections.close_all()
+
+    results = run(options.database, vendor_ids, options.requests, options.concurrency)
+
+    settings = {
+        "vendors": options.vendors,
+        "purchase_orders": options.purchase_orders,
+        "logs": options.logs,
+        "concurrency": options.concurrency,
+        "requests": options.requests,
+    }
+    return finish_report("asgi", settings, results, options)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
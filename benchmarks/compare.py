@@ -0,0 +1,39 @@
+"""Flags regressions of a benchmark report against a stored baseline, exits
+with status 1 when there are any.
+
+    python -m benchmarks.compare benchmarks/results/baseline.json \
+        benchmarks/results/endpoints.json --threshold 0.2
+"""
+
+import argparse
+
+from benchmarks.report import (
+    DEFAULT_THRESHOLD,
+    compare_reports,
+    load_report,
+    print_regressions,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    options = parser.parse_args(argv)
+
+    baseline = load_report(options.baseline)
+    current = load_report(options.current)
+    if baseline["benchmark"] != current["benchmark"]:
+        parser.error(
+            f"cannot compare a {current['benchmark']} report"
+            f" with a {baseline['benchmark']} baseline"
+        )
+
+    regressions = compare_reports(baseline, current, options.threshold)
+    print_regressions(regressions, options.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
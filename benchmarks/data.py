@@ -0,0 +1,135 @@
+"""Deterministic data generator for the benchmarks"""
+
+import random
+
+from django.db import transaction
+from django.utils import timezone
+
+from vendors.constants import PO_STATUS
+from vendors.services import PERFORMANCE_LOG_METRICS
+
+STATUSES = (PO_STATUS.pending, PO_STATUS.completed, PO_STATUS.cancelled)
+
+
+def seed(vendors=10, purchase_orders=1000, logs=100, batch_size=2000, random_seed=0):
+    """Inserts ``vendors`` vendors with ``purchase_orders`` orders and ``logs``
+    performance logs each, bypassing the model signals, then rebuilds the
+    vendor counters and the daily rollups in bulk. Returns the created vendor
+    ids"""
+    from vendors.models import PurchaseOrder, Vendor, VendorPerformanceLog
+    from vendors.services import compute_vendor_scorecard
+
+    rng = random.Random(random_seed)
+    now = timezone.now()
+
+    with transaction.atomic():
+        first_id = Vendor.objects.count() + 1
+        created = Vendor.objects.bulk_create(
+            Vendor(
+                name=f"Vendor {number}",
+                contact_details=f"{number:010}",
+                address=f"{number}, Chennai.",
+                vendor_code=f"VE-BENCH-{number:07}",
+            )
+            for number in range(first_id, first_id + vendors)
+        )
+        vendor_ids = [vendor.id for vendor in created]
+
+        orders = []
+        order_number = PurchaseOrder.objects.count()
+        for vendor_id in vendor_ids:
+            for _ in range(purchase_orders):
+                order_number += 1
+                order_date = now - timezone.timedelta(minutes=rng.randrange(525600))
+                status = rng.choices(STATUSES, weights=(3, 6, 1))[0]
+                completed = status == PO_STATUS.completed
+                orders.append(
+                    PurchaseOrder(
+                        vendor_id=vendor_id,
+                        po_number=f"PO-BENCH-{order_number:09}",
+                        order_date=order_date,
+                        delivery_date=order_date
+                        + timezone.timedelta(days=rng.randrange(-5, 30)),
+                        items=["item"] * rng.randrange(1, 5),
+                        quantity=rng.randrange(1, 500),
+                        status=status,
+                        quality_rating=(
+                            rng.choice((None, 1, 2, 3, 4, 5)) if completed else None
+                        ),
+                        acknowledgment_date=(
+                            order_date
+                            + timezone.timedelta(minutes=rng.randrange(1, 2880))
+                            if rng.random() < 0.8
+                            else None
+                        ),
+                    )
+                )
+                # bulk_create skips save(), which stamps the completion
+                orders[-1].set_completion_state(
+                    now=order_date + timezone.timedelta(days=rng.randrange(1, 30))
+                )
+                if len(orders) >= batch_size:
+                    PurchaseOrder.objects.bulk_create(orders)
+                    orders = []
+        PurchaseOrder.objects.bulk_create(orders)
+
+        VendorPerformanceLog.objects.bulk_create(
+            (
+                VendorPerformanceLog(
+                    vendor_id=vendor_id,
+                    date=now - timezone.timedelta(minutes=index * 60),
+                    **{
+                        metric: rng.uniform(0, 100)
+                        for metric in PERFORMANCE_LOG_METRICS
+                    },
+                )
+                for vendor_id in vendor_ids
+                for index in range(logs)
+            ),
+            batch_size=batch_size,
+        )
+
+        seed_rollups(vendor_ids, batch_size)
+
+        scorecards = compute_vendor_scorecard(vendor_ids)
+        for vendor in created:
+            vendor.apply_scorecard(scorecards[vendor.id])
+        Vendor.objects.bulk_update(
+            created, fields=Vendor.METRIC_UPDATE_FIELDS, batch_size=batch_size
+        )
+
+    return vendor_ids
+
+
+def seed_rollups(vendor_ids, batch_size=2000):
+    """Builds the daily performance rollups of ``vendor_ids`` from their logs"""
+    from vendors.models import VendorPerformanceLog, VendorPerformanceRollup
+
+    rollups = {}
+    logs = VendorPerformanceLog.objects.filter(vendor_id__in=vendor_ids)
+    for log in logs.order_by("date", "id").iterator():
+        key = (log.vendor_id, timezone.localdate(log.date))
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = rollups[key] = VendorPerformanceRollup(
+                vendor_id=log.vendor_id, day=key[1], count=0
+            )
+            for metric in PERFORMANCE_LOG_METRICS:
+                setattr(rollup, f"{metric}_sum", 0.0)
+                setattr(rollup, f"{metric}_min", getattr(log, metric))
+                setattr(rollup, f"{metric}_max", getattr(log, metric))
+
+        rollup.count += 1
+        rollup.last_date = log.date
+        for metric in PERFORMANCE_LOG_METRICS:
+            value = getattr(log, metric)
+            setattr(rollup, f"{metric}_sum", getattr(rollup, f"{metric}_sum") + value)
+            setattr(
+                rollup, f"{metric}_min", min(getattr(rollup, f"{metric}_min"), value)
+            )
+            setattr(
+                rollup, f"{metric}_max", max(getattr(rollup, f"{metric}_max"), value)
+            )
+            setattr(rollup, f"{metric}_last", value)
+
+    VendorPerformanceRollup.objects.bulk_create(rollups.values(), batch_size=batch_size)
@@ -0,0 +1,279 @@
+"""Load test of every endpoint in ``vendors/urls.py``, driven in-process
+through the Django test client at a fixed concurrency.
+
+Each endpoint gets ``--requests`` requests spread over ``--concurrency``
+threads, each thread with its own client and database connection. The report
+records throughput, p50/p95/p99 latency and the queries per request.
+
+    python -m benchmarks.endpoints --concurrency 4 --requests 200 \
+        --output benchmarks/results/endpoints.json
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import threading
+import time
+
+from benchmarks import DEFAULT_DATABASE, reset_database, setup_django
+from benchmarks.report import add_report_arguments, finish_report
+from benchmarks.stats import summarize
+
+USERNAME = "benchmark"
+
+
+def endpoint_cases(vendor_ids):
+    """(name, url name, method, kwargs, body) of each benchmarked request, where
+    kwargs and body are functions of the request number"""
+    from django.utils import timezone
+
+    from vendors.models import PurchaseOrder
+
+    po_ids = list(
+        PurchaseOrder.objects.filter(vendor_id__in=vendor_ids)
+        .order_by("id")
+        .values_list("id", flat=True)[:1000]
+    )
+
+    def vendor(number):
+        return vendor_ids[number % len(vendor_ids)]
+
+    def po(number):
+        return po_ids[number % len(po_ids)]
+
+    def purchase_order(number):
+        return {
+            "vendor": vendor(number),
+            "order_date": timezone.now().isoformat(),
+            "items": ["benchmark item"],
+            "quantity": number + 1,
+        }
+
+    return [
+        ("vendor_list", "vendor_list_create_api", "get", lambda n: {}, None),
+        (
+            "vendor_create",
+            "vendor_list_create_api",
+            "post",
+            lambda n: {},
+            lambda n: {
+                "name": f"Benchmark vendor {n}",
+                "contact_details": "-",
+                "address": "-",
+            },
+        ),
+        (
+            "vendor_retrieve",
+            "vendor_retrieve_update_destroy_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n)},
+            None,
+        ),
+        (
+            "vendor_update",
+            "vendor_retrieve_update_destroy_api",
+            "patch",
+            lambda n: {"vendor_id": vendor(n)},
+            lambda n: {"address": f"{n}, Chennai."},
+        ),
+        (
+            "vendor_performance",
+            "vendor_performance_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n)},
+            None,
+        ),
+        (
+            "vendor_performance_logs",
+            "vendor_performance_log_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n)},
+            None,
+        ),
+        (
+            "vendor_performance_trend",
+            "vendor_performance_log_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n), "query": "bucket=day"},
+            None,
+        ),
+        ("po_list", "po_list_create_api", "get", lambda n: {}, None),
+        ("po_create", "po_list_create_api", "post", lambda n: {}, purchase_order),
+        (
+            "po_bulk_create",
+            "po_bulk_api",
+            "post",
+            lambda n: {},
+            lambda n: [purchase_order(n * 10 + row) for row in range(10)],
+        ),
+        (
+            "po_retrieve",
+            "po_retrieve_update_destroy_api",
+            "get",
+            lambda n: {"po_id": po(n)},
+            None,
+        ),
+        (
+            "po_update",
+            "po_retrieve_update_destroy_api",
+            "patch",
+            lambda n: {"po_id": po(n)},
+            lambda n: {"quantity": n + 1},
+        ),
+        (
+            "po_acknowledge",
+            "po_acknowledgment_api",
+            "patch",
+            lambda n: {"po_id": po(n)},
+            lambda n: {"acknowledgment_date": timezone.now().isoformat()},
+        ),
+    ]
+
+
+def drive(case, requests, concurrency):
+    """Issues ``requests`` requests of ``case`` from ``concurrency`` threads"""
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    name, url_name, method, kwargs, body = case
+    numbers = itertools.count()
+    numbers_lock = threading.Lock()
+    timings, query_counts, statuses = [], [], {}
+    results_lock = threading.Lock()
+
+    def record(queries):
+        def wrapper(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        return wrapper
+
+    # one session shared by every thread, logging in from each of them races
+    # on the session table before the first request
+    login = Client()
+    login.force_login(User.objects.get(username=USERNAME))
+
+    def worker():
+        # failures, e.g. "database is locked" under write contention, are
+        # counted as errors instead of aborting the worker
+        client = Client(raise_request_exception=False)
+        client.cookies.load(login.cookies.output(header="", sep=";"))
+        try:
+            while True:
+                with numbers_lock:
+                    number = next(numbers)
+                if number >= requests:
+                    return
+
+                url_kwargs = dict(kwargs(number))
+                query = url_kwargs.pop("query", "")
+                url = reverse(f"vendors:{url_name}", kwargs=url_kwargs)
+                if query:
+                    url = f"{url}?{query}"
+                data = json.dumps(body(number)) if body else None
+
+                queries = []
+                with connection.execute_wrapper(record(queries)):
+                    started = time.perf_counter()
+                    response = getattr(client, method)(
+                        url, data=data, content_type="application/json"
+                    )
+                    elapsed = (time.perf_counter() - started) * 1000
+
+                with results_lock:
+                    timings.append(elapsed)
+                    query_counts.append(len(queries))
+                    statuses[response.status_code] = (
+                        statuses.get(response.status_code, 0) + 1
+                    )
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(timings)
+    summary.update(
+        {
+            "throughput_rps": round(len(timings) / elapsed, 1),
+            "queries": max(query_counts),
+            "queries_mean": round(sum(query_counts) / len(query_counts), 2),
+            "statuses": {str(status): count for status, count in statuses.items()},
+            "errors": sum(count for status, count in statuses.items() if status >= 400),
+        }
+    )
+    return summary
+
+
+def run(vendor_ids, requests, concurrency, only=None):
+    results = {}
+    print(
+        f"{'endpoint':<27}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'queries':>9}{'errors':>8}"
+    )
+    for case in endpoint_cases(vendor_ids):
+        if only and case[0] not in only:
+            continue
+
+        result = results[case[0]] = drive(case, requests, concurrency)
+        print(
+            f"{case[0]:<27}{result['throughput_rps']:>9}{result['p50_ms']:>9}"
+            f"{result['p95_ms']:>9}{result['p99_ms']:>9}{result['queries']:>9}"
+            f"{result['errors']:>8}"
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vendors", type=int, default=10)
+    parser.add_argument("--purchase-orders", type=int, default=500)
+    parser.add_argument("--logs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        dest="endpoints",
+        help="Only drive this endpoint, may be repeated",
+    )
+    parser.add_argument("--database", default=str(DEFAULT_DATABASE))
+    add_report_arguments(parser)
+    options = parser.parse_args(argv)
+
+    setup_django(options.database)
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    from django.contrib.auth.models import User
+
+    from benchmarks.data import seed
+
+    reset_database(options.database)
+    vendor_ids = seed(
+        vendors=options.vendors,
+        purchase_orders=options.purchase_orders,
+        logs=options.logs,
+    )
+    User.objects.create_user(username=USERNAME, password=USERNAME)
+
+    results = run(vendor_ids, options.requests, options.concurrency, options.endpoints)
+
+    settings = {
+        "vendors": options.vendors,
+        "purchase_orders": options.purchase_orders,
+        "logs": options.logs,
+        "concurrency": options.concurrency,
+        "requests": options.requests,
+    }
+    return finish_report("endpoints", settings, results, options)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,116 @@
+"""Microbenchmarks of the vendor metric calculations against their ``_old``
+variants, in the spirit of pytest-benchmark: warmup, a fixed number of rounds
+and a timing distribution per function.
+
+    python -m benchmarks.micro --vendors 5 --purchase-orders 2000 \
+        --output benchmarks/results/micro.json
+"""
+
+import argparse
+import time
+
+from benchmarks import DEFAULT_DATABASE, reset_database, setup_django
+from benchmarks.report import add_report_arguments, finish_report
+from benchmarks.stats import summarize
+
+CALCULATIONS = (
+    "calculate_on_time_delivery_rating_avg",
+    "calculate_quality_rating_avg",
+    "calculate_response_time",
+    "calculate_fullfilment_rate",
+)
+
+
+def count_queries(function):
+    from django.db import connection
+
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        result = function()
+    return result, len(queries)
+
+
+def bench(function, rounds, warmup):
+    for _ in range(warmup):
+        function()
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    result, queries = count_queries(function)
+    summary = summarize(timings)
+    summary["ops"] = round(1000 / summary["mean_ms"], 1) if summary["mean_ms"] else 0
+    summary["queries"] = queries
+    return result, summary
+
+
+def run(vendor_id, rounds, warmup):
+    from vendors import services
+    from vendors.models import Vendor
+
+    vendor = Vendor.objects.get(pk=vendor_id)
+    results = {}
+    for name in CALCULATIONS:
+        optimized, optimized_summary = bench(
+            lambda: getattr(services, name)(vendor), rounds, warmup
+        )
+        old, old_summary = bench(
+            lambda: getattr(services, f"{name}_old")(vendor), rounds, warmup
+        )
+        results[name] = {
+            **optimized_summary,
+            "speedup": round(old_summary["mean_ms"] / optimized_summary["mean_ms"], 2),
+            "matches_old": abs(optimized - old) <= 1e-6 * max(1.0, abs(old)),
+        }
+        results[f"{name}_old"] = old_summary
+
+    print(f"{'benchmark':<45}{'mean ms':>10}{'p95 ms':>10}{'ops/s':>10}{'queries':>9}")
+    for name, result in results.items():
+        print(
+            f"{name:<45}{result['mean_ms']:>10}{result['p95_ms']:>10}"
+            f"{result['ops']:>10}{result['queries']:>9}"
+        )
+    for name in CALCULATIONS:
+        result = results[name]
+        mismatch = "" if result["matches_old"] else ", RESULT DIFFERS FROM _old"
+        print(f"{name}: {result['speedup']}x the speed of _old{mismatch}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vendors", type=int, default=1)
+    parser.add_argument("--purchase-orders", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--database", default=str(DEFAULT_DATABASE))
+    add_report_arguments(parser)
+    options = parser.parse_args(argv)
+
+    setup_django(options.database)
+    from benchmarks.data import seed
+
+    reset_database(options.database)
+    vendor_ids = seed(
+        vendors=options.vendors, purchase_orders=options.purchase_orders, logs=0
+    )
+    results = run(vendor_ids[0], options.rounds, options.warmup)
+
+    settings = {
+        "vendors": options.vendors,
+        "purchase_orders": options.purchase_orders,
+        "rounds": options.rounds,
+    }
+    return finish_report("micro", settings, results, options)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
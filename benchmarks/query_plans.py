@@ -0,0 +1,150 @@
+"""Query plans and timings of the metric and listing queries, without and
+with the composite indexes declared on the vendors models.
+
+    python -m benchmarks.query_plans --vendors 20 --purchase-orders 5000
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks import DEFAULT_DATABASE, reset_database, setup_django
+
+
+def metric_indexes():
+    from vendors.models import PurchaseOrder, VendorPerformanceLog
+
+    return [
+        (model, index)
+        for model in (PurchaseOrder, VendorPerformanceLog)
+        for index in model._meta.indexes
+    ]
+
+
+def benchmark_queries(vendor_id, vendor_ids):
+    from vendors.models import Vendor, VendorPerformanceLog
+    from vendors.services import (
+        calculate_fullfilment_rate,
+        calculate_on_time_delivery_rating_avg,
+        calculate_quality_rating_avg,
+        calculate_response_time,
+        compute_vendor_scorecard,
+    )
+
+    vendor = Vendor.objects.get(pk=vendor_id)
+    return {
+        "calculate_on_time_delivery_rating_avg": lambda: (
+            calculate_on_time_delivery_rating_avg(vendor)
+        ),
+        "calculate_quality_rating_avg": lambda: calculate_quality_rating_avg(vendor),
+        "calculate_response_time": lambda: calculate_response_time(vendor),
+        "calculate_fullfilment_rate": lambda: calculate_fullfilment_rate(vendor),
+        "compute_vendor_scorecard": lambda: compute_vendor_scorecard(vendor),
+        "compute_vendor_scorecard_bulk": lambda: compute_vendor_scorecard(vendor_ids),
+        "performance_logs": lambda: list(
+            VendorPerformanceLog.objects.filter(vendor=vendor)
+            .order_by("date")
+            .values("date", "on_time_delivery_rate")[:100]
+        ),
+    }
+
+
+def capture_queries(function):
+    """Runs ``function`` and returns the (sql, params) it executed"""
+    from django.db import connection
+
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        function()
+    return queries
+
+
+def explain(sql, params):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def measure(function, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def run(label, vendor_ids, rounds):
+    report = {}
+    for name, function in benchmark_queries(vendor_ids[0], vendor_ids).items():
+        report[name] = {
+            "plans": [explain(*query) for query in capture_queries(function)],
+            **measure(function, rounds),
+        }
+
+    print(f"\n== {label} ==")
+    for name, result in report.items():
+        print(f"{name}: {result['median_ms']} ms (median of {rounds})")
+        for plan in result["plans"]:
+            for step in plan:
+                print(f"    {step}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vendors", type=int, default=10)
+    parser.add_argument("--purchase-orders", type=int, default=2000)
+    parser.add_argument("--logs", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--database", default=str(DEFAULT_DATABASE))
+    parser.add_argument("--output", help="Also write the report as JSON here")
+    options = parser.parse_args(argv)
+
+    setup_django(options.database)
+    from django.db import connection
+
+    from benchmarks.data import seed
+
+    reset_database(options.database)
+    vendor_ids = seed(
+        vendors=options.vendors,
+        purchase_orders=options.purchase_orders,
+        logs=options.logs,
+    )
+
+    with connection.schema_editor() as schema_editor:
+        for model, index in metric_indexes():
+            schema_editor.remove_index(model, index)
+    before = run("without indexes", vendor_ids, options.rounds)
+
+    with connection.schema_editor() as schema_editor:
+        for model, index in metric_indexes():
+            schema_editor.add_index(model, index)
+    after = run("with indexes", vendor_ids, options.rounds)
+
+    print("\n== speedup ==")
+    for name in before:
+        print(
+            f"{name}: {before[name]['median_ms']} ms -> {after[name]['median_ms']} ms"
+        )
+
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump({"before": before, "after": after}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
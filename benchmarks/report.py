@@ -0,0 +1,110 @@
+"""JSON benchmark reports and their comparison against a stored baseline.
+
+A report is ``{"benchmark": ..., "settings": {...}, "results": {name: {...}}}``.
+Timings regress when they grow by more than the threshold, throughput when it
+drops by more than the threshold and query counts on any increase.
+"""
+
+import json
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_THRESHOLD = 0.2
+
+# metrics where a higher value is worse
+LOWER_IS_BETTER = ("mean_ms", "p50_ms", "p95_ms", "p99_ms")
+# metrics where a lower value is worse
+HIGHER_IS_BETTER = ("ops", "throughput_rps")
+
+
+def add_report_arguments(parser):
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative change tolerated before flagging a regression",
+    )
+
+
+def build_report(benchmark, settings, results):
+    return {
+        "benchmark": benchmark,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "settings": settings,
+        "results": results,
+    }
+
+
+def load_report(path):
+    with open(path) as report:
+        return json.load(report)
+
+
+def write_report(report, path):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Regressions of ``current`` against ``baseline`` as readable lines"""
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+
+        for metric in LOWER_IS_BETTER:
+            if metric in result and metric in before and before[metric]:
+                if result[metric] > before[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{name}: {metric} {before[metric]} -> {result[metric]}"
+                    )
+        for metric in HIGHER_IS_BETTER:
+            if metric in result and metric in before and before[metric]:
+                if result[metric] < before[metric] * (1 - threshold):
+                    regressions.append(
+                        f"{name}: {metric} {before[metric]} -> {result[metric]}"
+                    )
+        if result.get("queries", 0) > before.get("queries", result.get("queries", 0)):
+            regressions.append(
+                f"{name}: queries {before['queries']} -> {result['queries']}"
+            )
+        if before.get("matches_old") and result.get("matches_old") is False:
+            regressions.append(f"{name}: result no longer matches the _old variant")
+        if result.get("errors", 0) > before.get("errors", 0):
+            regressions.append(
+                f"{name}: errors {before.get('errors', 0)} -> {result['errors']}"
+            )
+    return regressions
+
+
+def print_regressions(regressions, threshold):
+    if not regressions:
+        print(f"\nno regressions beyond {threshold:.0%}")
+        return
+
+    print(f"\n{len(regressions)} regression(s) beyond {threshold:.0%}:")
+    for regression in regressions:
+        print(f"  {regression}")
+
+
+def finish_report(benchmark, settings, results, options):
+    """Writes and compares the report as asked on the command line, returns the
+    process exit status"""
+    report = build_report(benchmark, settings, results)
+    if options.output:
+        write_report(report, options.output)
+        print(f"\nreport written to {options.output}")
+
+    if options.baseline:
+        regressions = compare_reports(
+            load_report(options.baseline), report, options.threshold
+        )
+        print_regressions(regressions, options.threshold)
+        return 1 if regressions else 0
+    return 0
@@ -0,0 +1,268 @@
+"""Mixed read/write load under each SQLite ``DATABASE_PROFILE``.
+
+Writer threads create purchase orders and rate completed ones, which
+recomputes the vendor metrics and writes a performance log, while reader
+threads poll the vendor performance, performance log and trend endpoints.
+Each profile runs in its own process against its own freshly seeded file. As
+under a real server, every thread closes or recycles its connection after each
+request according to ``CONN_MAX_AGE``, which the test client alone skips.
+
+    python -m benchmarks.sqlite --writers 4 --readers 12 --requests 2000 \
+        --output benchmarks/results/sqlite.json
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks import DEFAULT_DATABASE, reset_database, setup_django
+from benchmarks.endpoints import USERNAME
+from benchmarks.report import add_report_arguments, finish_report
+from benchmarks.stats import summarize
+
+PROFILES = ("development", "production")
+
+
+def mixed_cases(vendor_ids):
+    """(name, url name, method, kwargs, body) of the write and the read
+    requests, kwargs and body being functions of the request number"""
+    from django.utils import timezone
+
+    from vendors.constants import PO_STATUS
+    from vendors.models import PurchaseOrder
+
+    completed_ids = list(
+        PurchaseOrder.objects.filter(
+            vendor_id__in=vendor_ids, status=PO_STATUS.completed
+        )
+        .order_by("id")
+        .values_list("id", flat=True)[:1000]
+    )
+
+    def vendor(number):
+        return vendor_ids[number % len(vendor_ids)]
+
+    writes = [
+        (
+            "po_create",
+            "po_list_create_api",
+            "post",
+            lambda n: {},
+            lambda n: {
+                "vendor": vendor(n),
+                "order_date": timezone.now().isoformat(),
+                "items": ["benchmark item"],
+                "quantity": n + 1,
+            },
+        ),
+        (
+            "po_rate",
+            "po_retrieve_update_destroy_api",
+            "patch",
+            lambda n: {"po_id": completed_ids[n % len(completed_ids)]},
+            lambda n: {"quality_rating": n % 5 + 1},
+        ),
+    ]
+    reads = [
+        (
+            "vendor_performance",
+            "vendor_performance_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n)},
+            None,
+        ),
+        (
+            "vendor_performance_logs",
+            "vendor_performance_log_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n)},
+            None,
+        ),
+        (
+            "vendor_performance_trend",
+            "vendor_performance_log_api",
+            "get",
+            lambda n: {"vendor_id": vendor(n), "query": "bucket=day"},
+            None,
+        ),
+    ]
+    return writes, reads
+
+
+def drive_mixed(writes, reads, requests, writers, readers):
+    """Issues ``requests`` requests split between ``writers`` threads cycling
+    through the write cases and ``readers`` threads cycling through the read
+    cases, all at once. Returns the timings of each case"""
+    from django.contrib.auth.models import User
+    from django.db import close_old_connections, connection
+    from django.test import Client
+    from django.urls import reverse
+
+    numbers = itertools.count()
+    numbers_lock = threading.Lock()
+    timings = {case[0]: [] for case in (*writes, *reads)}
+    statuses = {case[0]: {} for case in (*writes, *reads)}
+    results_lock = threading.Lock()
+
+    login = Client()
+    login.force_login(User.objects.get(username=USERNAME))
+    connection.close()
+
+    def worker(cases):
+        client = Client(raise_request_exception=False)
+        client.cookies.load(login.cookies.output(header="", sep=";"))
+        try:
+            while True:
+                with numbers_lock:
+                    number = next(numbers)
+                if number >= requests:
+                    return
+
+                name, url_name, method, kwargs, body = cases[number % len(cases)]
+                url_kwargs = dict(kwargs(number))
+                query = url_kwargs.pop("query", "")
+                url = reverse(f"vendors:{url_name}", kwargs=url_kwargs)
+                if query:
+                    url = f"{url}?{query}"
+                data = json.dumps(body(number)) if body else None
+
+                started = time.perf_counter()
+                response = getattr(client, method)(
+                    url, data=data, content_type="application/json"
+                )
+                # what request_finished does outside the test client
+                close_old_connections()
+                elapsed = (time.perf_counter() - started) * 1000
+
+                with results_lock:
+                    timings[name].append(elapsed)
+                    case_statuses = statuses[name]
+                    case_statuses[response.status_code] = (
+                        case_statuses.get(response.status_code, 0) + 1
+                    )
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(writes,)) for _ in range(writers)]
+    threads += [threading.Thread(target=worker, args=(reads,)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name, case_timings in timings.items():
+        if not case_timings:
+            continue
+        summary = summarize(case_timings)
+        summary.update(
+            {
+                "throughput_rps": round(len(case_timings) / elapsed, 1),
+                "statuses": {
+                    str(status): count for status, count in statuses[name].items()
+                },
+                "errors": sum(
+                    count for status, count in statuses[name].items() if status >= 400
+                ),
+            }
+        )
+        results[name] = summary
+    results["total"] = {
+        "throughput_rps": round(requests / elapsed, 1),
+        "errors": sum(result["errors"] for result in results.values()),
+    }
+    return results
+
+
+def run_profile(profile, database, options):
+    """Seeds a database of its own and drives the mixed load under
+    ``profile``, in a fresh process since connections pick up their settings
+    once"""
+    setup_django(database, profile)
+    for logger in ("django.request", "vendors.instrumentation"):
+        logging.getLogger(logger).setLevel(logging.CRITICAL)
+    from django.contrib.auth.models import User
+    from django.db import connections
+
+    from benchmarks.data import seed
+
+    reset_database(database)
+    vendor_ids = seed(
+        vendors=options["vendors"],
+        purchase_orders=options["purchase_orders"],
+        logs=options["logs"],
+    )
+    User.objects.create_user(username=USERNAME, password=USERNAME)
+    writes, reads = mixed_cases(vendor_ids)
+    connections.close_all()
+
+    return drive_mixed(
+        writes, reads, options["requests"], options["writers"], options["readers"]
+    )
+
+
+def run(database, options):
+    results = {}
+    print(
+        f"{'profile.endpoint':<36}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'p99 ms':>9}{'errors':>8}"
+    )
+    context = multiprocessing.get_context("spawn")
+    for profile in PROFILES:
+        profile_database = f"{database}.{profile}"
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            profile_results = pool.submit(
+                run_profile, profile, profile_database, options
+            ).result()
+        reset_files(profile_database)
+
+        for name, result in profile_results.items():
+            key = f"{profile}.{name}"
+            results[key] = result
+            print(
+                f"{key:<36}{result['throughput_rps']:>9}"
+                f"{result.get('p50_ms', ''):>9}{result.get('p95_ms', ''):>9}"
+                f"{result.get('p99_ms', ''):>9}{result['errors']:>8}"
+            )
+    return results
+
+
+def reset_files(database):
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{database}{suffix}").unlink(missing_ok=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vendors", type=int, default=10)
+    parser.add_argument("--purchase-orders", type=int, default=200)
+    parser.add_argument("--logs", type=int, default=200)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=12)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--database", default=str(DEFAULT_DATABASE))
+    add_report_arguments(parser)
+    options = parser.parse_args(argv)
+
+    settings = {
+        "vendors": options.vendors,
+        "purchase_orders": options.purchase_orders,
+        "logs": options.logs,
+        "writers": options.writers,
+        "readers": options.readers,
+        "requests": options.requests,
+    }
+    results = run(options.database, settings)
+    return finish_report("sqlite", settings, results, options)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
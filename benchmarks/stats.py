@@ -0,0 +1,26 @@
+"""Summary statistics shared by the benchmark reports"""
+
+import statistics
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values``, ``fraction`` between 0 and 1"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(timings_ms):
+    """Distribution of timings in milliseconds"""
+    return {
+        "rounds": len(timings_ms),
+        "min_ms": round(min(timings_ms), 3),
+        "max_ms": round(max(timings_ms), 3),
+        "mean_ms": round(statistics.fmean(timings_ms), 3),
+        "stddev_ms": round(
+            statistics.stdev(timings_ms) if len(timings_ms) > 1 else 0.0, 3
+        ),
+        "p50_ms": round(percentile(timings_ms, 0.50), 3),
+        "p95_ms": round(percentile(timings_ms, 0.95), 3),
+        "p99_ms": round(percentile(timings_ms, 0.99), 3),
+    }
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,6 +22,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "vendors.prometheus.PrometheusMiddleware",
+    "vendors.instrumentation.RequestInstrumentationMiddleware",
+    "vendors.replicas.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -50,10 +54,60 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "vendor_management_system.wsgi.application"
 
+# connection settings merged into every database, see `vendors/sqlite.py` for
+# PRAGMAS and TRANSACTION_MODE; the DATABASE_PROFILE environment variable picks
+# the profile
+DATABASE_PROFILES = {
+    # SQLite's defaults and a connection per request
+    "development": {},
+    "production": {
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "TRANSACTION_MODE": "IMMEDIATE",
+        "PRAGMAS": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            # in KiB when negative, 64 MiB of page cache per connection
+            "cache_size": -64000,
+            "mmap_size": 256 * 1024 * 1024,
+            "temp_store": "MEMORY",
+        },
+    },
+}
+DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE", "development")
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "vendors_db.sqlite3",
+        # file backed so tests can exercise concurrent connections
+        "TEST": {"NAME": BASE_DIR / "test_vendors_db.sqlite3"},
+        **DATABASE_PROFILES[DATABASE_PROFILE],
+    },
+    # local stand-in for a read replica, a copy of "default" refreshed by
+    # `python manage.py sync_replicas`
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "vendors_db_replica.sqlite3",
+        "TEST": {"NAME": BASE_DIR / "test_vendors_db_replica.sqlite3"},
+        **DATABASE_PROFILES[DATABASE_PROFILE],
+    },
+}
+
+DATABASE_ROUTERS = ["vendors.replicas.ReplicaRouter"]
+
+# aliases of DATABASES the dashboard GET endpoints read from, e.g. "replica";
+# empty keeps every query on "default"
+DATABASE_READ_REPLICAS = [
+    alias for alias in os.environ.get("DATABASE_READ_REPLICAS", "").split(",") if alias
+]
+# seconds a client reads from "default" after a request of it wrote
+DATABASE_REPLICA_STICKY_SECONDS = 5
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
@@ -85,6 +139,71 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "vendors.pagination.SelectablePagination",
     "PAGE_SIZE": 10,
 }
+
+# upper bound for the `page_size` query parameter of paginated endpoints
+API_MAX_PAGE_SIZE = 100
+
+# "sync" updates vendor metrics inside the purchase order write, "deferred" only
+# queues the vendor and leaves the recomputation to `process_vendor_metrics_queue`
+VENDOR_METRICS_MODE = "sync"
+
+# bulk purchase order ingest, `POST /api/purchase_orders/bulk`
+PURCHASE_ORDER_BULK_MAX_ROWS = 10000
+PURCHASE_ORDER_BULK_CHUNK_SIZE = 500
+
+# rows fetched per round trip by the streaming CSV/NDJSON exports
+EXPORT_CHUNK_SIZE = 2000
+
+# numbers reserved per round trip by each process for vendor codes and po numbers
+SEQUENCE_BLOCK_SIZE = 20
+
+# read-through cache of `GET /api/vendors/<id>/performance`, any alias of CACHES
+VENDOR_PERFORMANCE_CACHE_ALIAS = "default"
+VENDOR_PERFORMANCE_CACHE_TIMEOUT = 300
+
+# route the vendor performance and trend endpoints to the native async views of
+# `vendors.async_apis`, for deployments served through `asgi.py`
+VENDOR_ASYNC_READ_VIEWS = False
+
+# `GET /api/vendors/performance/events` (Server-Sent Events): seconds between
+# heartbeats, between polls for logs written by other processes, and before a
+# client reconnects, and the events buffered per connection before it falls
+# back to polling
+PERFORMANCE_EVENTS_HEARTBEAT_INTERVAL = 15
+PERFORMANCE_EVENTS_POLL_INTERVAL = 2
+PERFORMANCE_EVENTS_RETRY = 3
+PERFORMANCE_EVENTS_QUEUE_SIZE = 100
+
+# raw performance logs older than this many days are compacted by
+# `compact_performance_logs` to the last log of each vendor and day, hourly
+# trends read those days from the daily rollups; None keeps every log as is
+PERFORMANCE_LOG_RETENTION_DAYS = 90
+# logs deleted per transaction while compacting
+PERFORMANCE_LOG_COMPACTION_BATCH_SIZE = 1000
+
+# weights of each metric in the composite score of `GET /api/vendors/rankings`,
+# and how stale the materialized rankings may get once a vendor changed
+VENDOR_RANKING_WEIGHTS = {
+    "on_time_delivery_rate": 0.4,
+    "quality_rating_avg": 0.3,
+    "average_response_time": 0.2,
+    "fullfilment_rate": 0.1,
+}
+VENDOR_RANKING_MAX_AGE = 60
+
+# share of requests profiled by `RequestInstrumentationMiddleware` (0 disables
+# it), those slower than the threshold are logged with their SQL/serializer/
+# signal timings
+REQUEST_INSTRUMENTATION_SAMPLE_RATE = 0.1
+REQUEST_INSTRUMENTATION_SLOW_MS = 500
+# add a `Server-Timing` header to profiled responses
+REQUEST_INSTRUMENTATION_SERVER_TIMING = DEBUG
+
+# directory shared by the worker processes to aggregate the `/metrics` samples,
+# None keeps the metrics of each process to itself
+PROMETHEUS_MULTIPROC_DIR = None
+# seconds between writes of a process' samples to that directory
+PROMETHEUS_FLUSH_INTERVAL = 5
@@ -1,3 +1,7 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.generics import (
     ListCreateAPIView,
@@ -11,8 +15,41 @@ from vendors.serializers import (
     CreatePurchaseOrderSerializer,
     EditPurchaseOrderSerializer,
     VendorPOAcknowledgmentSerializer,
+    BulkCreatePurchaseOrderSerializer,
+    BulkUpdatePurchaseOrderSerializer,
+    BulkAcknowledgePurchaseOrderSerializer,
+    VendorRankingSerializer,
 )
-from vendors.models import Vendor, PurchaseOrder, VendorPerformanceLog
+from vendors.models import (
+    PO_ORDER_STATUS_CHOICES,
+    Vendor,
+    PurchaseOrder,
+    VendorPerformanceLog,
+    VendorRanking,
+    refresh_purchase_order_vendors,
+    refresh_vendor_metrics,
+)
+from vendors.cache import get_vendor_performance
+from vendors.conditional import (
+    ConditionalListMixin,
+    ConditionalRetrieveMixin,
+    collection_validators,
+    not_modified_response,
+    set_validators,
+)
+from vendors.exports import EXPORT_FORMATS, export_response
+from vendors.filters import (
+    PurchaseOrderFilter,
+    SparseFieldsetFilter,
+    VendorFilter,
+    parse_datetime_param,
+)
+from vendors.pagination import KeysetPagination
+from vendors.rankings import RANKING_ORDERS
+from vendors.replicas import ReplicaReadMixin
+from vendors.trends import TREND_BUCKETS, performance_trend
+from vendors.parsers import NDJSONParser
+from vendors.sequences import next_po_numbers
 from rest_framework.permissions import IsAuthenticated
 
 
@@ -23,14 +60,17 @@ def get_vendor_object_or_none(vendor_id):
         return None
 
 
-class VendorListCreateAPI(ListCreateAPIView):
+class VendorListCreateAPI(ReplicaReadMixin, ConditionalListMixin, ListCreateAPIView):
     permission_classes = [IsAuthenticated]
 
     serializer_class = VendorSerializer
     queryset = Vendor.objects.all().order_by("id")
+    filter_backends = [VendorFilter, SparseFieldsetFilter]
 
 
-class VendorRetrieveUpdateDestroyAPI(RetrieveUpdateDestroyAPIView):
+class VendorRetrieveUpdateDestroyAPI(
+    ConditionalRetrieveMixin, RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
 
     serializer_class = VendorSerializer
@@ -38,36 +78,271 @@ class VendorRetrieveUpdateDestroyAPI(RetrieveUpdateDestroyAPIView):
     queryset = Vendor.objects.all()
 
 
-class VendorPerformanceAPI(APIView):
+class VendorPerformanceAPI(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, vendor_id):
-
-        vendor = get_vendor_object_or_none(vendor_id)
-        if not vendor:
+        performance = get_vendor_performance(vendor_id)
+        if not performance:
             return Response(
                 data={"detail": "No Vendor matches the given query."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        vendor_performance_details = {
-            "name": vendor.name,
-            "on_time_delivery_rate": vendor.on_time_delivery_rate,
-            "quality_rating_avg": vendor.quality_rating_avg,
-            "average_response_time": vendor.average_response_time,
-            "fulfillment_rate": vendor.fullfilment_rate,
-        }
-        return Response(data=vendor_performance_details, status=status.HTTP_200_OK)
+        not_modified = not_modified_response(
+            request, performance["etag"], performance["last_modified"]
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = Response(data=performance["data"], status=status.HTTP_200_OK)
+        return set_validators(
+            response, performance["etag"], performance["last_modified"]
+        )
+
+
+class VendorRankingListAPI(APIView):
+    """Top ``?limit=`` vendors by composite ``score`` or by one ``?metric=``,
+    read in rank order from the materialized rankings"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        metric = request.query_params.get("metric", "score")
+        if metric not in RANKING_ORDERS:
+            return Response(
+                data={"metric": f"Expected one of {', '.join(RANKING_ORDERS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        limit = request.query_params.get("limit", "10")
+        if not limit.isdigit() or not int(limit):
+            return Response(
+                data={"limit": "Expected a positive integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = min(int(limit), settings.API_MAX_PAGE_SIZE)
+
+        rankings = VendorRanking.objects.select_related("vendor").order_by(
+            RANKING_ORDERS[metric], "vendor_id"
+        )[:limit]
+        return Response(
+            data={
+                "metric": metric,
+                "results": VendorRankingSerializer(rankings, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class VendorRankingAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, vendor_id):
+        ranking = (
+            VendorRanking.objects.select_related("vendor")
+            .filter(vendor_id=vendor_id)
+            .first()
+        )
+        if not ranking:
+            # a vendor created since the last build is ranked by the next one
+            detail = (
+                "Vendor not ranked yet."
+                if Vendor.objects.filter(pk=vendor_id).exists()
+                else "No Vendor matches the given query."
+            )
+            return Response(data={"detail": detail}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            data=VendorRankingSerializer(ranking).data, status=status.HTTP_200_OK
+        )
 
 
-class PurchaseOrderListCreateAPI(ListCreateAPIView):
+class PurchaseOrderListCreateAPI(
+    ReplicaReadMixin, ConditionalListMixin, ListCreateAPIView
+):
     permission_classes = [IsAuthenticated]
 
     serializer_class = CreatePurchaseOrderSerializer
     queryset = PurchaseOrder.objects.all().order_by("id")
+    filter_backends = [PurchaseOrderFilter, SparseFieldsetFilter]
+
+
+def bulk_rows_error(rows):
+    """Error response when a bulk request body is not a list of acceptable
+    size, None otherwise"""
+    if not isinstance(rows, list):
+        return Response(
+            data={"detail": "Expected a list of purchase orders."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(rows) > settings.PURCHASE_ORDER_BULK_MAX_ROWS:
+        return Response(
+            data={
+                "detail": "A batch accepts at most "
+                f"{settings.PURCHASE_ORDER_BULK_MAX_ROWS} purchase orders."
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return None
+
+
+def bulk_response_status(succeeded, total):
+    if not succeeded and total:
+        return status.HTTP_400_BAD_REQUEST
+    if succeeded < total:
+        return status.HTTP_207_MULTI_STATUS
+    return None
+
+
+class PurchaseOrderBulkAPI(APIView):
+    """``POST`` creates and ``PATCH`` updates purchase orders in bulk, the
+    vendor metrics are refreshed once per affected vendor"""
+
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        rows = request.data
+        error = bulk_rows_error(rows)
+        if error:
+            return error
+
+        requested_vendor_ids = set()
+        for row in rows:
+            try:
+                requested_vendor_ids.add(int(row.get("vendor")))
+            except (AttributeError, TypeError, ValueError):
+                continue
+        vendor_ids = set(
+            Vendor.objects.filter(id__in=requested_vendor_ids).values_list(
+                "id", flat=True
+            )
+        )
+
+        results = []
+        purchase_orders = []
+        for index, row in enumerate(rows):
+            serializer = BulkCreatePurchaseOrderSerializer(
+                data=row, context={"vendor_ids": vendor_ids}
+            )
+            if serializer.is_valid():
+                results.append({"index": index, "status": "created"})
+                purchase_orders.append(PurchaseOrder(**serializer.validated_data))
+            else:
+                results.append(
+                    {"index": index, "status": "error", "errors": serializer.errors}
+                )
+
+        # reserved and committed before the ingest transaction, which would keep
+        # the counter locked for every other create until it commits. The
+        # numbers of a batch that then fails are skipped
+        po_numbers = next_po_numbers(len(purchase_orders))
+        for purchase_order, po_number in zip(purchase_orders, po_numbers):
+            purchase_order.po_number = po_number
+
+        with transaction.atomic():
+            PurchaseOrder.objects.bulk_create(
+                purchase_orders, batch_size=settings.PURCHASE_ORDER_BULK_CHUNK_SIZE
+            )
+            refresh_vendor_metrics(po.vendor_id for po in purchase_orders)
+
+        created = iter(purchase_orders)
+        for result in results:
+            if result["status"] == "created":
+                purchase_order = next(created)
+                result.update(id=purchase_order.id, po_number=purchase_order.po_number)
+
+        response_status = bulk_response_status(len(purchase_orders), len(results))
+        return Response(
+            data={
+                "created": len(purchase_orders),
+                "failed": len(results) - len(purchase_orders),
+                "results": results,
+            },
+            status=response_status or status.HTTP_201_CREATED,
+        )
+
+    def patch(self, request):
+        rows = request.data
+        error = bulk_rows_error(rows)
+        if error:
+            return error
+
+        requested_ids = set()
+        for row in rows:
+            try:
+                requested_ids.add(int(row.get("id")))
+            except (AttributeError, TypeError, ValueError):
+                continue
+
+        now = timezone.now()
+        results = []
+        updated = {}
+        with transaction.atomic():
+            purchase_orders = PurchaseOrder.objects.select_for_update().in_bulk(
+                requested_ids
+            )
+            for index, row in enumerate(rows):
+                serializer = BulkUpdatePurchaseOrderSerializer(
+                    data=row, partial=True, context={"purchase_orders": purchase_orders}
+                )
+                if not serializer.is_valid():
+                    results.append(
+                        {"index": index, "status": "error", "errors": serializer.errors}
+                    )
+                    continue
+
+                changes = dict(serializer.validated_data)
+                purchase_order = purchase_orders[changes.pop("id")]
+                if purchase_order.id in updated:
+                    results.append(
+                        {
+                            "index": index,
+                            "status": "error",
+                            "errors": {"id": ["Duplicate purchase order."]},
+                        }
+                    )
+                    continue
 
+                for field, value in changes.items():
+                    setattr(purchase_order, field, value)
+                purchase_order.set_completion_state(now=now)
+                # bulk_update does not maintain auto_now fields
+                purchase_order.updated_at = now
+                updated[purchase_order.id] = purchase_order
+                results.append(
+                    {"index": index, "status": "updated", "id": purchase_order.id}
+                )
 
-class PurchaseOrderRetrieveUpdateDestroyAPI(RetrieveUpdateDestroyAPIView):
+            # bulk_update sends no post_save, the metrics are refreshed below
+            PurchaseOrder.objects.bulk_update(
+                updated.values(),
+                fields=[
+                    "status",
+                    "quality_rating",
+                    "delivery_date",
+                    *PurchaseOrder.COMPLETION_FIELDS,
+                    "updated_at",
+                ],
+                batch_size=settings.PURCHASE_ORDER_BULK_CHUNK_SIZE,
+            )
+
+            refresh_purchase_order_vendors(updated.values())
+
+        response_status = bulk_response_status(len(updated), len(results))
+        return Response(
+            data={
+                "updated": len(updated),
+                "failed": len(results) - len(updated),
+                "results": results,
+            },
+            status=response_status or status.HTTP_200_OK,
+        )
+
+
+class PurchaseOrderRetrieveUpdateDestroyAPI(
+    ConditionalRetrieveMixin, RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
 
     serializer_class = EditPurchaseOrderSerializer
@@ -87,8 +362,134 @@ class PurchaseOrderAcknowledgmentAPI(UpdateAPIView):
     queryset = PurchaseOrder.objects.all()
 
 
-class VendorPerformanceTrendAPI(APIView):
+class PurchaseOrderBulkAcknowledgmentAPI(APIView):
+    """Acknowledges a list of purchase orders, given as ids or as
+    ``{"id", "acknowledgment_date"}`` rows, in one transaction"""
+
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        rows = request.data
+        error = bulk_rows_error(rows)
+        if error:
+            return error
+        rows = [row if isinstance(row, dict) else {"id": row} for row in rows]
+
+        requested_ids = set()
+        for row in rows:
+            try:
+                requested_ids.add(int(row.get("id")))
+            except (TypeError, ValueError):
+                continue
+
+        now = timezone.now()
+        results = []
+        acknowledged = {}
+        with transaction.atomic():
+            purchase_orders = PurchaseOrder.objects.select_for_update().in_bulk(
+                requested_ids
+            )
+            for index, row in enumerate(rows):
+                serializer = BulkAcknowledgePurchaseOrderSerializer(
+                    data=row, context={"purchase_orders": purchase_orders}
+                )
+                if not serializer.is_valid():
+                    results.append(
+                        {
+                            "index": index,
+                            "id": row.get("id"),
+                            "status": "error",
+                            "errors": serializer.errors,
+                        }
+                    )
+                    continue
+
+                purchase_order = purchase_orders[serializer.validated_data["id"]]
+                if purchase_order.id in acknowledged:
+                    results.append(
+                        {
+                            "index": index,
+                            "id": purchase_order.id,
+                            "status": "error",
+                            "errors": {"id": ["Duplicate purchase order."]},
+                        }
+                    )
+                    continue
+
+                purchase_order.acknowledgment_date = serializer.validated_data.get(
+                    "acknowledgment_date", now
+                )
+                # bulk_update does not maintain auto_now fields
+                purchase_order.updated_at = now
+                acknowledged[purchase_order.id] = purchase_order
+                results.append(
+                    {
+                        "index": index,
+                        "id": purchase_order.id,
+                        "status": "acknowledged",
+                        "acknowledgment_date": purchase_order.acknowledgment_date,
+                    }
+                )
+
+            # bulk_update sends no post_save, the metrics are refreshed below
+            PurchaseOrder.objects.bulk_update(
+                acknowledged.values(),
+                fields=["acknowledgment_date", "updated_at"],
+                batch_size=settings.PURCHASE_ORDER_BULK_CHUNK_SIZE,
+            )
+            refresh_purchase_order_vendors(acknowledged.values())
+
+        response_status = bulk_response_status(len(acknowledged), len(results))
+        return Response(
+            data={
+                "acknowledged": len(acknowledged),
+                "failed": len(results) - len(acknowledged),
+                "results": results,
+            },
+            status=response_status or status.HTTP_200_OK,
+        )
+
+
+TREND_LOG_FIELDS = (
+    "date",
+    "on_time_delivery_rate",
+    "quality_rating_avg",
+    "average_response_time",
+    "fulfillment_rate",
+)
+
+
+def parse_trend_params(params):
+    """(bucket, start, end) of the trend query parameters, raises ValueError
+    with the error payload when one is invalid"""
+    bucket = params.get("bucket")
+    if bucket and bucket not in TREND_BUCKETS:
+        raise ValueError({"bucket": f"Expected one of {', '.join(TREND_BUCKETS)}."})
+
+    try:
+        start = params.get("from")
+        start = start and parse_datetime_param(start)
+        end = params.get("to")
+        end = end and parse_datetime_param(end, end_of_day=True)
+    except ValueError as exc:
+        raise ValueError({"detail": f"Invalid date {exc}, expected ISO 8601."})
+    return bucket, start, end
+
+
+def vendor_performance_logs(vendor, start=None, end=None):
+    logs = VendorPerformanceLog.objects.filter(vendor=vendor)
+    if start:
+        logs = logs.filter(date__gte=start)
+    if end:
+        logs = logs.filter(date__lte=end)
+    return logs
+
+
+class VendorPerformanceTrendAPI(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = "date"
 
     def get(self, request, vendor_id):
         vendor = get_vendor_object_or_none(vendor_id)
@@ -98,21 +499,151 @@ class VendorPerformanceTrendAPI(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        logs = (
-            VendorPerformanceLog.objects.filter(vendor=vendor)
-            .order_by("date")
-            .values(
-                "date",
-                "on_time_delivery_rate",
-                "quality_rating_avg",
-                "average_response_time",
-                "fulfillment_rate",
+        try:
+            bucket, start, end = parse_trend_params(request.query_params)
+        except ValueError as exc:
+            return Response(data=exc.args[0], status=status.HTTP_400_BAD_REQUEST)
+
+        logs = vendor_performance_logs(vendor, start, end)
+        etag, last_modified = collection_validators(logs, request)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        if bucket:
+            response = Response(
+                data={
+                    "vendor": {"id": vendor.id, "name": vendor.name},
+                    "bucket": bucket,
+                    "performance_buckets": performance_trend(
+                        vendor, bucket, start=start, end=end
+                    ),
+                }
             )
-        )
+            return set_validators(response, etag, last_modified)
 
-        return Response(
+        logs = logs.order_by("date").values(*TREND_LOG_FIELDS)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(logs, request, view=self)
+
+        response = Response(
             data={
                 "vendor": {"id": vendor.id, "name": vendor.name},
-                "performance_logs": logs,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+                "performance_logs": page,
             }
         )
+        return set_validators(response, etag, last_modified)
+
+
+PURCHASE_ORDER_EXPORT_FIELDS = (
+    "id",
+    "po_number",
+    "vendor_id",
+    "order_date",
+    "delivery_date",
+    "items",
+    "quantity",
+    "status",
+    "quality_rating",
+    "issue_date",
+    "acknowledgment_date",
+    "completed_at",
+    "is_on_time",
+)
+
+PERFORMANCE_LOG_EXPORT_FIELDS = (
+    "id",
+    "vendor_id",
+    "date",
+    "on_time_delivery_rate",
+    "quality_rating_avg",
+    "average_response_time",
+    "fulfillment_rate",
+)
+
+
+class ExportAPI(APIView):
+    """Streams every row matching the ``vendor``/``from``/``to`` query
+    parameters as CSV or NDJSON, gzip compressed when the client accepts it"""
+
+    permission_classes = [IsAuthenticated]
+    queryset = None
+    date_field = None
+    fields = ()
+    filename = None
+
+    def get_queryset(self):
+        # re-evaluated on every request like GenericAPIView does
+        return self.queryset.all()
+
+    def filter_queryset(self, queryset, params):
+        vendor = params.get("vendor")
+        if vendor is not None:
+            if not vendor.isdigit():
+                raise ValueError({"vendor": "Expected a vendor id."})
+            queryset = queryset.filter(vendor_id=int(vendor))
+
+        try:
+            start = params.get("from")
+            end = params.get("to")
+            if start:
+                queryset = queryset.filter(
+                    **{f"{self.date_field}__gte": parse_datetime_param(start)}
+                )
+            if end:
+                queryset = queryset.filter(
+                    **{
+                        f"{self.date_field}__lte": parse_datetime_param(
+                            end, end_of_day=True
+                        )
+                    }
+                )
+        except ValueError as exc:
+            raise ValueError({"detail": f"Invalid date {exc}, expected ISO 8601."})
+        return queryset
+
+    def get(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                data={"detail": f"Expected one of {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        try:
+            queryset = self.filter_queryset(self.get_queryset(), request.query_params)
+        except ValueError as exc:
+            return Response(data=exc.args[0], status=status.HTTP_400_BAD_REQUEST)
+
+        return export_response(
+            request,
+            queryset.order_by("id"),
+            self.fields,
+            export_format,
+            self.filename,
+        )
+
+
+class PurchaseOrderExportAPI(ExportAPI):
+    queryset = PurchaseOrder.objects.all()
+    date_field = "order_date"
+    fields = PURCHASE_ORDER_EXPORT_FIELDS
+    filename = "purchase_orders"
+
+    def filter_queryset(self, queryset, params):
+        status_filter = params.get("status")
+        if status_filter is not None:
+            statuses = [value for value, _ in PO_ORDER_STATUS_CHOICES]
+            if status_filter not in statuses:
+                raise ValueError({"status": f"Expected one of {', '.join(statuses)}."})
+            queryset = queryset.filter(status=status_filter)
+        return super().filter_queryset(queryset, params)
+
+
+class VendorPerformanceLogExportAPI(ExportAPI):
+    queryset = VendorPerformanceLog.objects.all()
+    date_field = "date"
+    fields = PERFORMANCE_LOG_EXPORT_FIELDS
+    filename = "performance_logs"
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class VendorsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "vendors"
+
+    def ready(self):
+        # applies the configured pragmas to every new connection
+        from vendors import sqlite  # noqa: F401
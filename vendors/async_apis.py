@@ -0,0 +1,232 @@
+"""Native async variants of the vendor performance read endpoints.
+
+They serve the same payloads as their DRF counterparts in ``vendors.apis``
+but are plain Django async views built on the async cache and ORM interfaces,
+so under ASGI a request does not hold a worker thread while it waits on the
+database or the cache. ``urls.py`` routes to them when
+``VENDOR_ASYNC_READ_VIEWS`` is set.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from vendors.apis import (
+    TREND_LOG_FIELDS,
+    parse_trend_params,
+    vendor_performance_logs,
+)
+from vendors.cache import aget_vendor_performance
+from vendors.conditional import (
+    acollection_validators,
+    not_modified_response,
+    set_validators,
+)
+from vendors.events import PerformanceEventStream
+from vendors.exports import EXPORT_FORMATS, andjson_lines, ndjson_lines
+from vendors.filters import parse_id_param, parse_list_param
+from vendors.models import Vendor
+from vendors.pagination import KeysetPagination
+from vendors.replicas import replica_reads
+from vendors.trends import aperformance_trend
+
+VENDOR_NOT_FOUND = {"detail": "No Vendor matches the given query."}
+
+
+def _authenticate(request):
+    """Runs the DRF authenticators, returns the error response or None"""
+    drf_request = Request(
+        request,
+        authenticators=[
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    )
+    try:
+        user = drf_request.user
+    except APIException as exc:
+        return json_response(exc.get_full_details(), exc.status_code)
+    if not user or not user.is_authenticated:
+        return json_response({"detail": NotAuthenticated.default_detail}, 403)
+    return None
+
+
+def served_over_asgi(request):
+    """Whether the request came through ``asgi.py``. Under WSGI, Django reads
+    an async streaming body to the end before sending any of it"""
+    return isinstance(request, ASGIRequest)
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, encoder=JSONEncoder, safe=False)
+
+
+class AsyncAPIView(View):
+    """Async view limited to authenticated users like ``IsAuthenticated``.
+
+    Sessions and users are only loaded through the sync ORM in this Django
+    version, so authentication takes one thread hop"""
+
+    http_method_names = ["get", "head", "options"]
+    # read the models of the app from the replicas, see `vendors.replicas`
+    read_from_replicas = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        error = await sync_to_async(_authenticate)(request)
+        if error is not None:
+            return error
+        if not self.read_from_replicas:
+            return await super().dispatch(request, *args, **kwargs)
+        with replica_reads(request.method):
+            return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncVendorPerformanceAPI(AsyncAPIView):
+    read_from_replicas = True
+
+    async def get(self, request, vendor_id):
+        performance = await aget_vendor_performance(vendor_id)
+        if not performance:
+            return json_response(VENDOR_NOT_FOUND, status.HTTP_404_NOT_FOUND)
+
+        not_modified = not_modified_response(
+            request, performance["etag"], performance["last_modified"]
+        )
+        if not_modified is not None:
+            return not_modified
+
+        return set_validators(
+            json_response(performance["data"]),
+            performance["etag"],
+            performance["last_modified"],
+        )
+
+
+class AsyncVendorPerformanceTrendAPI(AsyncAPIView):
+    read_from_replicas = True
+    pagination_class = KeysetPagination
+    cursor_ordering = "date"
+
+    async def get(self, request, vendor_id):
+        vendor = await Vendor.objects.only("name").filter(pk=vendor_id).afirst()
+        if not vendor:
+            return json_response(VENDOR_NOT_FOUND, status.HTTP_404_NOT_FOUND)
+
+        try:
+            bucket, start, end = parse_trend_params(request.GET)
+        except ValueError as exc:
+            return json_response(exc.args[0], status.HTTP_400_BAD_REQUEST)
+
+        logs = vendor_performance_logs(vendor, start, end)
+        etag, last_modified = await acollection_validators(logs, request)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        data = {"vendor": {"id": vendor.id, "name": vendor.name}}
+        if bucket:
+            data["bucket"] = bucket
+            data["performance_buckets"] = await aperformance_trend(
+                vendor, bucket, start=start, end=end
+            )
+        else:
+            # DRF's cursor pagination only has a sync interface
+            data.update(await sync_to_async(self.paginate)(request, logs))
+        return set_validators(json_response(data), etag, last_modified)
+
+    def paginate(self, request, logs):
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(
+            logs.order_by("date").values(*TREND_LOG_FIELDS), Request(request), view=self
+        )
+        return {
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "performance_logs": page,
+        }
+
+
+class AsyncVendorPerformanceLogStreamAPI(AsyncAPIView):
+    """Streams every performance log of a vendor in the ``from``/``to`` range
+    as NDJSON, read chunk by chunk with ``aiterator``. Under WSGI, which would
+    drain an async body before sending it, the chunks are read by a sync
+    ``iterator`` instead"""
+
+    async def get(self, request, vendor_id):
+        if not await Vendor.objects.filter(pk=vendor_id).aexists():
+            return json_response(VENDOR_NOT_FOUND, status.HTTP_404_NOT_FOUND)
+
+        try:
+            _, start, end = parse_trend_params(request.GET)
+        except ValueError as exc:
+            return json_response(exc.args[0], status.HTTP_400_BAD_REQUEST)
+
+        logs = vendor_performance_logs(vendor_id, start, end).order_by("date")
+        if not served_over_asgi(request):
+            rows = logs.values_list(*TREND_LOG_FIELDS).iterator(
+                chunk_size=settings.EXPORT_CHUNK_SIZE
+            )
+            return StreamingHttpResponse(
+                (line.encode() for line in ndjson_lines(TREND_LOG_FIELDS, rows)),
+                content_type=EXPORT_FORMATS["ndjson"],
+            )
+
+        # values_list() querysets run their query when aiterator() starts,
+        # on the event loop, model instances are only fetched per chunk
+        logs = logs.only(*TREND_LOG_FIELDS).aiterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+        rows = (
+            tuple(getattr(log, field) for field in TREND_LOG_FIELDS)
+            async for log in logs
+        )
+        return StreamingHttpResponse(
+            (line.encode() async for line in andjson_lines(TREND_LOG_FIELDS, rows)),
+            content_type=EXPORT_FORMATS["ndjson"],
+        )
+
+
+class AsyncVendorPerformanceEventsAPI(AsyncAPIView):
+    """Server-Sent Events of every performance log written, of the vendors in
+    ``?vendor=1,2`` only when given. Reconnecting clients send the
+    ``Last-Event-ID`` header, or ``?last_event_id=``, to get what they missed.
+    The stream never ends, so it is only served over ASGI"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not served_over_asgi(request):
+            return json_response(
+                {"detail": "Performance events are only served over ASGI."},
+                status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def get(self, request):
+        try:
+            vendor_ids = parse_list_param(request.GET.get("vendor", ""))
+            vendor_ids = {parse_id_param(vendor_id) for vendor_id in vendor_ids}
+            last_event_id = request.headers.get("Last-Event-ID") or request.GET.get(
+                "last_event_id"
+            )
+            if last_event_id is not None:
+                last_event_id = parse_id_param(last_event_id)
+        except ValueError as exc:
+            return json_response(
+                {"detail": f"Invalid id {exc}."}, status.HTTP_400_BAD_REQUEST
+            )
+
+        stream = PerformanceEventStream(vendor_ids or None, last_event_id)
+        response = StreamingHttpResponse(
+            (chunk.encode() async for chunk in stream),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # keeps reverse proxies from buffering the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
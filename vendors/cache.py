@@ -0,0 +1,121 @@
+"""Read-through cache of the vendor performance payload.
+
+Entries live in the Django cache named by ``VENDOR_PERFORMANCE_CACHE_ALIAS``
+under one key per vendor and are dropped whenever the vendor is saved or its
+metrics are recomputed in bulk.
+"""
+
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from vendors.models import Vendor
+from vendors.prometheus import vendor_performance_cache_requests
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.VENDOR_PERFORMANCE_CACHE_ALIAS]
+
+
+def vendor_performance_key(vendor_id):
+    return f"vendor-performance:{vendor_id}"
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+    vendor_performance_cache_requests.inc(result=outcome)
+
+
+def cache_stats():
+    """Hit and miss counts of this process"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def build_vendor_performance(vendor):
+    data = {
+        "name": vendor.name,
+        "on_time_delivery_rate": vendor.on_time_delivery_rate,
+        "quality_rating_avg": vendor.quality_rating_avg,
+        "average_response_time": vendor.average_response_time,
+        "fulfillment_rate": vendor.fullfilment_rate,
+    }
+    payload = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    return {
+        "data": data,
+        "etag": f'"{hashlib.md5(payload).hexdigest()}"',
+        "last_modified": int(vendor.updated_at.timestamp()),
+    }
+
+
+def _performance_vendor(vendor_id):
+    # entries outlive the request and are only dropped on writes, filling one
+    # from a lagging replica would serve stale metrics until the next write
+    return (
+        Vendor.objects.using(DEFAULT_DB_ALIAS)
+        .filter(pk=vendor_id)
+        .only(
+            "name",
+            "on_time_delivery_rate",
+            "quality_rating_avg",
+            "average_response_time",
+            "fullfilment_rate",
+            "updated_at",
+        )
+    )
+
+
+def get_vendor_performance(vendor_id):
+    """Cached performance entry of a vendor with its ``data``, ``etag`` and
+    ``last_modified``, or None when the vendor does not exist"""
+    key = vendor_performance_key(vendor_id)
+    entry = _cache().get(key)
+    if entry is not None:
+        _count("hits")
+        return entry
+
+    _count("misses")
+    vendor = _performance_vendor(vendor_id).first()
+    if vendor is None:
+        return None
+
+    entry = build_vendor_performance(vendor)
+    _cache().set(key, entry, timeout=settings.VENDOR_PERFORMANCE_CACHE_TIMEOUT)
+    return entry
+
+
+async def aget_vendor_performance(vendor_id):
+    """``get_vendor_performance`` through the async cache and ORM interfaces"""
+    key = vendor_performance_key(vendor_id)
+    entry = await _cache().aget(key)
+    if entry is not None:
+        _count("hits")
+        return entry
+
+    _count("misses")
+    vendor = await _performance_vendor(vendor_id).afirst()
+    if vendor is None:
+        return None
+
+    entry = build_vendor_performance(vendor)
+    await _cache().aset(key, entry, timeout=settings.VENDOR_PERFORMANCE_CACHE_TIMEOUT)
+    return entry
+
+
+def invalidate_vendor_performance(vendor_ids):
+    keys = [vendor_performance_key(vendor_id) for vendor_id in vendor_ids]
+    if not keys:
+        return
+
+    _cache().delete_many(keys)
+    # a reader may have cached the old values before the write committed
+    transaction.on_commit(lambda: _cache().delete_many(keys))
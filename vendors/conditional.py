@@ -0,0 +1,90 @@
+"""Conditional GET support for the read endpoints.
+
+Rows carry an ``updated_at`` column. Detail responses get a strong ETag derived
+from the row's primary key and ``updated_at``, and from the query string when
+there is one since ``?fields=``/``?omit=`` change the representation.
+Collections get one derived from ``MAX(updated_at)`` and ``COUNT(*)`` of the
+filtered queryset and from the query string, so a client that is current
+receives a 304 before anything is serialized.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def row_validators(instance, request=None):
+    updated_at = instance.updated_at
+    version = int(updated_at.timestamp() * 1_000_000)
+    etag = f"{instance._meta.model_name}-{instance.pk}-{version}"
+    query = request.META.get("QUERY_STRING") if request is not None else None
+    if query:
+        etag = f"{etag}-{hashlib.md5(query.encode()).hexdigest()}"
+    return f'"{etag}"', int(updated_at.timestamp())
+
+
+def collection_validators(queryset, request):
+    state = queryset.order_by().aggregate(
+        last_modified=Max("updated_at"), count=Count("pk")
+    )
+    return _collection_validators(queryset, request, state)
+
+
+async def acollection_validators(queryset, request):
+    state = await queryset.order_by().aaggregate(
+        last_modified=Max("updated_at"), count=Count("pk")
+    )
+    return _collection_validators(queryset, request, state)
+
+
+def _collection_validators(queryset, request, state):
+    last_modified = state["last_modified"]
+    version = int(last_modified.timestamp() * 1_000_000) if last_modified else 0
+    digest = hashlib.md5(
+        f"{request.get_full_path()}|{state['count']}|{version}".encode()
+    ).hexdigest()
+    etag = f'"{queryset.model._meta.model_name}s-{digest}"'
+    return etag, int(last_modified.timestamp()) if last_modified else None
+
+
+def not_modified_response(request, etag, last_modified):
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class ConditionalRetrieveMixin:
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = row_validators(instance, request)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    def get_object(self):
+        # retrieve() above and the parent implementation share one lookup
+        if not hasattr(self, "_object"):
+            self._object = super().get_object()
+        return self._object
+
+
+class ConditionalListMixin:
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = collection_validators(queryset, request)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
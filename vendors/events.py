@@ -0,0 +1,179 @@
+"""Live vendor performance events for the Server-Sent Events endpoint.
+
+Every performance log written is an event whose id is the log id. The process
+that writes it publishes it to ``performance_hub`` once the transaction
+commits, and the SSE connections of that process get it immediately. Logs
+written by other processes (workers, the metrics queue, management commands)
+are picked up by polling ``VendorPerformanceLog`` for ids above the last one
+seen every ``PERFORMANCE_EVENTS_POLL_INTERVAL`` seconds, which also replays the
+logs after a ``Last-Event-ID`` on reconnect. Delivery is at least once.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from vendors.services import PERFORMANCE_LOG_METRICS
+
+PERFORMANCE_EVENT_FIELDS = ("id", "vendor_id", "date", *PERFORMANCE_LOG_METRICS)
+
+
+def performance_event(log):
+    return {field: getattr(log, field) for field in PERFORMANCE_EVENT_FIELDS}
+
+
+def encode_event(event):
+    data = {
+        "vendor": event["vendor_id"],
+        **{field: event[field] for field in ("date", *PERFORMANCE_LOG_METRICS)},
+    }
+    return (
+        f"id: {event['id']}\n"
+        "event: performance\n"
+        f"data: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+    )
+
+
+@dataclass(eq=False)
+class Subscription:
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    vendor_ids: frozenset = None
+    # set when events were dropped, the stream then catches up from the db
+    overflowed: bool = field(default=False)
+
+    def wants(self, event):
+        return self.vendor_ids is None or event["vendor_id"] in self.vendor_ids
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class PerformanceHub:
+    """In-process pub/sub of performance events, published from any thread
+    and consumed by coroutines on their own event loop"""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, vendor_ids=None, maxsize=None):
+        subscription = Subscription(
+            loop=asyncio.get_running_loop(),
+            queue=asyncio.Queue(maxsize or settings.PERFORMANCE_EVENTS_QUEUE_SIZE),
+            vendor_ids=None if vendor_ids is None else frozenset(vendor_ids),
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = [sub for sub in self._subscriptions if sub.wants(event)]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # the loop of an abandoned connection is closed
+                self.unsubscribe(subscription)
+
+
+performance_hub = PerformanceHub()
+
+
+def publish_performance_log(log):
+    """Publishes ``log`` to this process's SSE connections"""
+    performance_hub.publish(performance_event(log))
+
+
+class PerformanceEventStream:
+    """The SSE body of one connection: hub events as they are published, and
+    the logs found by polling the database past the last polled id"""
+
+    def __init__(self, vendor_ids=None, last_event_id=None, hub=performance_hub):
+        self.vendor_ids = vendor_ids
+        self.last_event_id = last_event_id
+        self.hub = hub
+        self.polled_id = None
+        # ids sent from the hub and not reached by polling yet
+        self.sent = set()
+
+    def logs_after(self, log_id):
+        from vendors.models import VendorPerformanceLog
+
+        logs = VendorPerformanceLog.objects.filter(id__gt=log_id)
+        if self.vendor_ids is not None:
+            logs = logs.filter(vendor_id__in=self.vendor_ids)
+        return logs.order_by("id")
+
+    async def latest_log_id(self):
+        from vendors.models import VendorPerformanceLog
+
+        latest = await VendorPerformanceLog.objects.order_by("-id").afirst()
+        return latest.id if latest else 0
+
+    async def poll(self, batch_size=500):
+        """SSE events of the logs written since the last poll"""
+        chunks = []
+        while True:
+            logs = [log async for log in self.logs_after(self.polled_id)[:batch_size]]
+            for log in logs:
+                if log.id not in self.sent:
+                    chunks.append(encode_event(performance_event(log)))
+                self.polled_id = log.id
+            if len(logs) < batch_size:
+                break
+        self.sent = {log_id for log_id in self.sent if log_id > self.polled_id}
+        return chunks
+
+    async def __aiter__(self):
+        heartbeat = settings.PERFORMANCE_EVENTS_HEARTBEAT_INTERVAL
+        poll_interval = settings.PERFORMANCE_EVENTS_POLL_INTERVAL
+        subscription = self.hub.subscribe(self.vendor_ids)
+        try:
+            yield f"retry: {int(settings.PERFORMANCE_EVENTS_RETRY * 1000)}\n\n"
+            if self.last_event_id is None:
+                self.polled_id = await self.latest_log_id()
+            else:
+                self.polled_id = self.last_event_id
+                for chunk in await self.poll():
+                    yield chunk
+
+            now = time.monotonic()
+            heartbeat_at, poll_at = now + heartbeat, now + poll_interval
+            while True:
+                timeout = max(min(heartbeat_at, poll_at) - time.monotonic(), 0)
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    event = None
+
+                chunks = []
+                if event and event["id"] > self.polled_id:
+                    self.sent.add(event["id"])
+                    chunks.append(encode_event(event))
+                if subscription.overflowed or time.monotonic() >= poll_at:
+                    subscription.overflowed = False
+                    chunks.extend(await self.poll())
+                    poll_at = time.monotonic() + poll_interval
+
+                if not chunks and time.monotonic() >= heartbeat_at:
+                    chunks.append(": heartbeat\n\n")
+                if chunks:
+                    heartbeat_at = time.monotonic() + heartbeat
+                for chunk in chunks:
+                    yield chunk
+        finally:
+            self.hub.unsubscribe(subscription)
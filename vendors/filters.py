@@ -0,0 +1,164 @@
+"""Query parameter filtering and sparse fieldsets for the list endpoints.
+
+Both are DRF filter backends, so they run inside ``filter_queryset`` and the
+conditional list validators see the same rows the page is built from.
+"""
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def parse_datetime_param(value, end_of_day=False):
+    """Parses an ISO date or datetime query parameter into an aware datetime,
+    a bare date covers the whole day. Raises ValueError when malformed"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = timezone.datetime.combine(day, timezone.datetime.min.time())
+        if end_of_day:
+            parsed += timezone.timedelta(days=1, microseconds=-1)
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_end_param(value):
+    return parse_datetime_param(value, end_of_day=True)
+
+
+def parse_id_param(value):
+    if not value.isdigit():
+        raise ValueError(value)
+    return int(value)
+
+
+def parse_list_param(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class QueryParamFilter(BaseFilterBackend):
+    """Filters on the query parameters named in ``params``, each mapped to a
+    (lookup, parser) pair, and on ``?search=`` over ``search_fields``.
+
+    Every malformed parameter is reported at once as a 400"""
+
+    params = {}
+    search_fields = ()
+
+    def filter_queryset(self, request, queryset, view):
+        conditions = {}
+        errors = {}
+        for param, (lookup, parse) in self.params.items():
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                conditions[lookup] = self.clean(param, parse(value))
+            except (TypeError, ValueError):
+                errors[param] = f"Invalid value {value!r}."
+        if errors:
+            raise ValidationError(errors)
+
+        queryset = queryset.filter(**conditions)
+        search = request.query_params.get("search", "").strip()
+        if search and self.search_fields:
+            match = Q()
+            for field in self.search_fields:
+                match |= Q(**{f"{field}__icontains": search})
+            queryset = queryset.filter(match)
+        return queryset
+
+    def clean(self, param, value):
+        """Hook to validate a parsed value, raises ValueError when invalid"""
+        return value
+
+
+class VendorFilter(QueryParamFilter):
+    params = {
+        f"{bound}_{metric}": (f"{metric}__{lookup}", float)
+        for metric in (
+            "on_time_delivery_rate",
+            "quality_rating_avg",
+            "average_response_time",
+            "fullfilment_rate",
+        )
+        for bound, lookup in (("min", "gte"), ("max", "lte"))
+    }
+    search_fields = ("name", "vendor_code")
+
+
+class PurchaseOrderFilter(QueryParamFilter):
+    params = {
+        "vendor": ("vendor_id", parse_id_param),
+        "status": ("status__in", parse_list_param),
+        "from": ("order_date__gte", parse_datetime_param),
+        "to": ("order_date__lte", parse_end_param),
+        "delivery_from": ("delivery_date__gte", parse_datetime_param),
+        "delivery_to": ("delivery_date__lte", parse_end_param),
+        "min_quality_rating": ("quality_rating__gte", float),
+        "max_quality_rating": ("quality_rating__lte", float),
+    }
+    search_fields = ("po_number",)
+
+    def clean(self, param, value):
+        if param == "status":
+            from vendors.models import PO_ORDER_STATUS_CHOICES
+
+            statuses = {choice for choice, _ in PO_ORDER_STATUS_CHOICES}
+            if not value or not statuses.issuperset(value):
+                raise ValueError(value)
+        return value
+
+
+def requested_fields(request, available):
+    """The serializer fields selected by ``?fields=`` and ``?omit=`` on a read,
+    None when the request asks for all of them"""
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None
+
+    fields = parse_list_param(request.query_params.get("fields", ""))
+    omit = parse_list_param(request.query_params.get("omit", ""))
+    if not fields and not omit:
+        return None
+
+    unknown = sorted(set(fields + omit) - set(available))
+    if unknown:
+        raise ValidationError({"fields": f"Unknown field(s) {', '.join(unknown)}."})
+    selected = [name for name in available if not fields or name in fields]
+    return [name for name in selected if name not in omit]
+
+
+class SparseFieldsetFilter(BaseFilterBackend):
+    """Defers the columns left out by ``?fields=``/``?omit=`` with ``.only()``,
+    the serializer drops the same fields through ``SparseFieldsetMixin``"""
+
+    def filter_queryset(self, request, queryset, view):
+        serializer = view.get_serializer_class()()
+        selected = requested_fields(request, serializer.fields)
+        if selected is None:
+            return queryset
+
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        columns = [
+            serializer.fields[name].source
+            for name in selected
+            if serializer.fields[name].source in model_fields
+        ]
+        return queryset.only(queryset.model._meta.pk.name, *columns)
+
+
+class SparseFieldsetMixin:
+    """Serializes only the fields selected by ``?fields=``/``?omit=``"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = requested_fields(self.context.get("request"), fields)
+        if selected is None:
+            return fields
+        return {name: fields[name] for name in selected}
@@ -0,0 +1,224 @@
+"""Per-request database, serializer and signal timings.
+
+``RequestInstrumentationMiddleware`` profiles a sampled share of the requests:
+it counts the SQL queries and their time through ``connection.execute_wrapper``
+and collects the time spent in serializers and signal handlers marked with
+``InstrumentedSerializerMixin`` and ``instrumented_receiver``. Sampled requests
+get an optional ``Server-Timing`` header, and those slower than the threshold a
+structured log line on the ``vendors.instrumentation`` logger.
+
+Queries run inside a signal handler or a serializer are part of both the
+``db`` and the ``signals``/``serializer`` timings.
+
+Queries are observed through ``observe_queries``, a context variable read by an
+execute wrapper installed once on every connection. Under ASGI the ORM runs
+the queries of concurrent requests on one shared thread and connection, the
+context variable still attributes each query to the request that issued it.
+"""
+
+import contextvars
+import functools
+import logging
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+_profile = contextvars.ContextVar("request_profile", default=None)
+_query_stats = contextvars.ContextVar("query_stats", default=())
+
+
+@dataclass
+class RequestProfile:
+    queries: int = 0
+    db_ms: float = 0.0
+    serializer_ms: float = 0.0
+    signals_ms: float = 0.0
+    # nesting depth of timed sections per kind, only the outermost one counts
+    _depth: dict = field(default_factory=dict, repr=False)
+
+    def as_dict(self):
+        profile = asdict(self)
+        profile.pop("_depth")
+        return {key: round(value, 3) for key, value in profile.items()}
+
+
+def current_profile():
+    """Profile of the request being instrumented, None when not sampled"""
+    return _profile.get()
+
+
+@contextmanager
+def timed(kind):
+    """Adds the time spent in the block to ``<kind>_ms`` of the current profile"""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+
+    depth = profile._depth.get(kind, 0)
+    profile._depth[kind] = depth + 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile._depth[kind] = depth
+        if not depth:
+            elapsed = (time.perf_counter() - started) * 1000
+            setattr(profile, f"{kind}_ms", getattr(profile, f"{kind}_ms") + elapsed)
+
+
+def instrumented_receiver(handler):
+    """Signal receiver decorator, place it under ``@receiver``"""
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        with timed("signals"):
+            return handler(*args, **kwargs)
+
+    return wrapper
+
+
+class InstrumentedSerializerMixin:
+    """Times (de)serialization of the serializer into the request profile"""
+
+    def to_representation(self, instance):
+        with timed("serializer"):
+            return super().to_representation(instance)
+
+    def to_internal_value(self, data):
+        with timed("serializer"):
+            return super().to_internal_value(data)
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    db_ms: float = 0.0
+
+
+def _observe_query(execute, sql, params, many, context):
+    observers = _query_stats.get()
+    if not observers:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        for stats in observers:
+            stats.queries += 1
+            stats.db_ms += elapsed
+
+
+def install_query_observer(connection):
+    if _observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_observe_query)
+
+
+@receiver(connection_created)
+def _connection_created(sender, connection, **kwargs):
+    install_query_observer(connection)
+
+
+@contextmanager
+def observe_queries():
+    """Counts and times the queries run in the block, including those the
+    async ORM runs on its worker thread, and yields the ``QueryStats``"""
+    for connection in connections.all(initialized_only=True):
+        install_query_observer(connection)
+
+    stats = QueryStats()
+    token = _query_stats.set((*_query_stats.get(), stats))
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+class RequestInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with observe_queries() as stats:
+                response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        return self.finish(request, response, profile, stats, started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with observe_queries() as stats:
+                response = await self.get_response(request)
+        finally:
+            _profile.reset(token)
+        return self.finish(request, response, profile, stats, started)
+
+    def sampled(self):
+        sample_rate = settings.REQUEST_INSTRUMENTATION_SAMPLE_RATE
+        return sample_rate and random.random() < sample_rate
+
+    def finish(self, request, response, profile, stats, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        profile.queries = stats.queries
+        profile.db_ms = stats.db_ms
+
+        if settings.REQUEST_INSTRUMENTATION_SERVER_TIMING:
+            response["Server-Timing"] = server_timing(profile, total_ms)
+
+        if total_ms >= settings.REQUEST_INSTRUMENTATION_SLOW_MS:
+            record = {
+                "method": request.method,
+                "path": request.path,
+                "view": getattr(request.resolver_match, "view_name", None),
+                "status": response.status_code,
+                "total_ms": round(total_ms, 3),
+                **profile.as_dict(),
+            }
+            logger.warning(
+                " ".join(f"{key}={value}" for key, value in record.items()),
+                extra={"request_profile": record},
+            )
+        return response
+
+
+def server_timing(profile, total_ms):
+    return ", ".join(
+        [
+            f'db;dur={profile.db_ms:.3f};desc="{profile.queries} queries"',
+            f"serializer;dur={profile.serializer_ms:.3f}",
+            f"signals;dur={profile.signals_ms:.3f}",
+            f"total;dur={total_ms:.3f}",
+        ]
+    )
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from vendors.retention import compact_performance_logs
+
+
+class Command(BaseCommand):
+    help = (
+        "Collapses the vendor performance logs older than the retention into "
+        "the last log of each vendor and day, month by month in bounded batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Retention in days, PERFORMANCE_LOG_RETENTION_DAYS by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Logs deleted per transaction, "
+            "PERFORMANCE_LOG_COMPACTION_BATCH_SIZE by default",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            help="Append the deleted logs to a gzipped NDJSON file per month here",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to wait between batches, leaving the writers a turn",
+        )
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="Run VACUUM afterwards to give the freed pages back to the disk",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print how many logs each month would lose without deleting",
+        )
+
+    def handle(
+        self,
+        *args,
+        days=None,
+        batch_size=None,
+        archive_dir=None,
+        pause=0.0,
+        vacuum=False,
+        dry_run=False,
+        **options,
+    ):
+        if days is None and settings.PERFORMANCE_LOG_RETENTION_DAYS is None:
+            raise CommandError(
+                "No retention configured, set PERFORMANCE_LOG_RETENTION_DAYS "
+                "or pass --days."
+            )
+        if batch_size is not None and batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        verb = "would delete" if dry_run else "deleted"
+
+        def report(month, deleted):
+            self.stdout.write(f"{month}: {deleted} log(s) {verb}")
+
+        results = compact_performance_logs(
+            days=days,
+            batch_size=batch_size,
+            archive_dir=archive_dir,
+            dry_run=dry_run,
+            pause=pause,
+            on_month=report,
+        )
+        if vacuum and not dry_run:
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM")
+
+        total = sum(results.values())
+        self.stdout.write(self.style.SUCCESS(f"{total} log(s) {verb}"))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vendors.metrics_queue import process_vendor_metrics_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the metrics of the vendors queued while VENDOR_METRICS_MODE "
+        'is "deferred", once per vendor however many updates were queued'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the queue instead of exiting once it is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep between polls of an empty queue with --loop",
+        )
+
+    def handle(self, *args, batch_size=100, loop=False, interval=1.0, **options):
+        total = 0
+        while True:
+            processed = process_vendor_metrics_queue(batch_size=batch_size)
+            total += processed
+            if processed:
+                continue
+            if not loop:
+                break
+            time.sleep(interval)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} vendor(s) recomputed"))
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+
+from vendors.cache import invalidate_vendor_performance
+from vendors.models import Vendor
+from vendors.services import VENDOR_COUNTER_FIELDS, compute_vendor_scorecard
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconciles the running metric counters of every vendor against a full "
+        "aggregate of its purchase orders and rebuilds the ones that drifted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vendor",
+            type=int,
+            action="append",
+            dest="vendor_ids",
+            help="Only reconcile the given vendor id, can be repeated",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted vendors, do not rebuild them",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, vendor_ids=None, check=False, chunk_size=500, **options):
+        vendors = Vendor.objects.order_by("id")
+        if vendor_ids:
+            vendors = vendors.filter(id__in=vendor_ids)
+
+        drifted = 0
+        last_id = 0
+        while True:
+            chunk = list(vendors.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            scorecards = compute_vendor_scorecard(vendor.id for vendor in chunk)
+            rebuilt = []
+            for vendor in chunk:
+                expected = scorecards[vendor.id]
+                changes = {
+                    field: (getattr(vendor, field), expected[field])
+                    for field in VENDOR_COUNTER_FIELDS
+                    if abs(getattr(vendor, field) - expected[field]) > 1e-6
+                }
+                if not changes:
+                    continue
+
+                details = ", ".join(
+                    f"{field}: {stored} -> {actual}"
+                    for field, (stored, actual) in changes.items()
+                )
+                self.stdout.write(f"{vendor.vendor_code} ({vendor.id}): {details}")
+                vendor.apply_scorecard(expected)
+                rebuilt.append(vendor)
+
+            drifted += len(rebuilt)
+            if rebuilt and not check:
+                Vendor.objects.bulk_update(rebuilt, fields=Vendor.METRIC_UPDATE_FIELDS)
+                invalidate_vendor_performance(vendor.id for vendor in rebuilt)
+
+        if check:
+            message = f"{drifted} vendor(s) out of sync"
+        else:
+            message = f"{drifted} vendor(s) rebuilt"
+        self.stdout.write(self.style.SUCCESS(message))
+        if check and drifted:
+            raise SystemExit(1)
@@ -0,0 +1,172 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from vendors.cache import invalidate_vendor_performance
+from vendors.models import Vendor, log_vendor_performance
+from vendors.rankings import refresh_vendor_rankings
+from vendors.services import (
+    VENDOR_COUNTER_FIELDS,
+    VENDOR_METRIC_FIELDS,
+    compute_vendor_scorecard,
+)
+
+DIFF_FIELDS = (*VENDOR_METRIC_FIELDS, *VENDOR_COUNTER_FIELDS)
+
+
+def vendor_id_ranges(workers):
+    """Splits the vendor ids into at most ``workers`` contiguous (first, last)
+    ranges holding about as many vendors each"""
+    ids = Vendor.objects.order_by("id").values_list("id", flat=True)
+    total = ids.count()
+    if not total:
+        return []
+
+    size = -(-total // workers)
+    firsts = [ids[offset] for offset in range(0, total, size)]
+    lasts = [first - 1 for first in firsts[1:]] + [ids.reverse()[0]]
+    return list(zip(firsts, lasts))
+
+
+def diff_vendor(vendor, scorecard):
+    return {
+        field: (getattr(vendor, field), scorecard[field])
+        for field in DIFF_FIELDS
+        if abs(getattr(vendor, field) - scorecard[field]) > 1e-6
+    }
+
+
+def recompute_vendor_range(
+    first_id, last_id, chunk_size, dry_run=False, snapshot=True, on_chunk=None
+):
+    """Recomputes the vendors with ids in [first_id, last_id] chunk by chunk.
+
+    Returns the number of vendors seen and the diff of each changed vendor as
+    (vendor_code, vendor_id, {field: (stored, recomputed)}), ``on_chunk`` gets
+    the same for every chunk"""
+    vendors = Vendor.objects.filter(id__gte=first_id, id__lte=last_id).order_by("id")
+
+    total = 0
+    diffs = []
+    last_seen = first_id - 1
+    while True:
+        # read, computed and written under the lock, so no incremental update
+        # committed meanwhile is overwritten
+        with transaction.atomic():
+            chunk = list(
+                vendors.select_for_update().filter(id__gt=last_seen)[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_seen = chunk[-1].id
+            total += len(chunk)
+
+            scorecards = compute_vendor_scorecard(vendor.id for vendor in chunk)
+            chunk_diffs = []
+            for vendor in chunk:
+                changes = diff_vendor(vendor, scorecards[vendor.id])
+                if changes:
+                    chunk_diffs.append((vendor.vendor_code, vendor.id, changes))
+                vendor.apply_scorecard(scorecards[vendor.id])
+            diffs.extend(chunk_diffs)
+
+            if not dry_run:
+                Vendor.objects.bulk_update(chunk, fields=Vendor.METRIC_UPDATE_FIELDS)
+                if snapshot:
+                    for vendor in chunk:
+                        log_vendor_performance(vendor)
+
+        if not dry_run:
+            invalidate_vendor_performance(vendor.id for vendor in chunk)
+        if on_chunk:
+            on_chunk(len(chunk), chunk_diffs)
+
+    return total, diffs
+
+
+def _init_worker():
+    # a no-op for forked workers, spawned ones start without apps loaded
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the metrics of all vendors from their purchase orders, one "
+        "GROUP BY vendor_id query and one bulk update per chunk of vendors"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Split the vendors into id ranges recomputed by this many processes",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the metrics that would change without writing them",
+        )
+        parser.add_argument(
+            "--no-snapshot",
+            action="store_false",
+            dest="snapshot",
+            help="Skip the performance log written per recomputed vendor",
+        )
+
+    def handle(
+        self,
+        *args,
+        chunk_size=500,
+        workers=1,
+        dry_run=False,
+        snapshot=True,
+        **options,
+    ):
+        self.verbosity = options["verbosity"]
+        ranges = vendor_id_ranges(max(workers, 1))
+        vendor_count = Vendor.objects.count()
+        arguments = (chunk_size, dry_run, snapshot)
+
+        done = 0
+        changed = 0
+
+        def progress(count, diffs):
+            nonlocal done, changed
+            done += count
+            changed += len(diffs)
+            self.report(done, vendor_count, diffs, dry_run)
+
+        if workers > 1 and len(ranges) > 1:
+            # children open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(len(ranges), initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(recompute_vendor_range, first, last, *arguments)
+                    for first, last in ranges
+                ]
+                for future in as_completed(futures):
+                    progress(*future.result())
+        else:
+            for first, last in ranges:
+                recompute_vendor_range(first, last, *arguments, on_chunk=progress)
+
+        if dry_run:
+            message = f"{changed} of {done} vendor(s) would change"
+        else:
+            refresh_vendor_rankings()
+            message = f"{done} vendor(s) recomputed, {changed} changed"
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def report(self, done, vendor_count, diffs, dry_run):
+        if dry_run or self.verbosity > 1:
+            for vendor_code, vendor_id, changes in diffs:
+                details = ", ".join(
+                    f"{field}: {stored} -> {recomputed}"
+                    for field, (stored, recomputed) in changes.items()
+                )
+                self.stdout.write(f"{vendor_code} ({vendor_id}): {details}")
+        self.stderr.write(f"{done}/{vendor_count} vendors")
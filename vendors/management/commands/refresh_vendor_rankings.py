@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vendors.rankings import ensure_vendor_rankings, refresh_vendor_rankings
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the materialized vendor rankings served by the leaderboard, "
+        "run it on a schedule or with --loop"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep rebuilding the rankings whenever a vendor changed",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60.0,
+            help="Seconds between checks for changed vendors with --loop",
+        )
+
+    def handle(self, *args, loop=False, interval=60.0, **options):
+        ranked = refresh_vendor_rankings()
+        self.stdout.write(self.style.SUCCESS(f"{ranked} vendor(s) ranked"))
+        while loop:
+            time.sleep(interval)
+            if ensure_vendor_rankings():
+                self.stdout.write("rankings rebuilt")
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from vendors.replicas import sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the default SQLite database over its local read replicas, "
+        "DATABASE_READ_REPLICAS unless aliases are given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("aliases", nargs="*", help="Replica database aliases")
+
+    def handle(self, *args, aliases=(), **options):
+        aliases = aliases or settings.DATABASE_READ_REPLICAS
+        if not aliases:
+            raise CommandError("No replica configured, set DATABASE_READ_REPLICAS.")
+
+        for alias in aliases:
+            if alias not in settings.DATABASES:
+                raise CommandError(f"Unknown database alias {alias!r}.")
+            try:
+                sync_replica(alias)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(f"{alias} synced"))
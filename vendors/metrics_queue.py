@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.utils import timezone
+
+from vendors.models import (
+    PendingVendorMetrics,
+    Vendor,
+    log_vendor_performance,
+    rebuild_vendor_counters,
+)
+from vendors.prometheus import vendor_metrics_recompute_duration
+
+
+def enqueue_vendor_metrics(vendor_ids, log_snapshot=False):
+    """Marks vendors as dirty, repeated calls for a queued vendor only refresh
+    its queue entry so the worker recomputes it once"""
+    now = timezone.now()
+    update_fields = ["queued_at", "log_snapshot"] if log_snapshot else ["queued_at"]
+    PendingVendorMetrics.objects.bulk_create(
+        [
+            PendingVendorMetrics(
+                vendor_id=vendor_id, queued_at=now, log_snapshot=log_snapshot
+            )
+            for vendor_id in vendor_ids
+        ],
+        update_conflicts=True,
+        unique_fields=["vendor"],
+        update_fields=update_fields,
+    )
+
+
+def process_vendor_metrics_queue(batch_size=100):
+    """Recomputes the metrics of up to ``batch_size`` queued vendors and returns
+    how many were processed"""
+    entries = list(
+        PendingVendorMetrics.objects.order_by("queued_at").values_list(
+            "id", "vendor_id", "queued_at", "log_snapshot"
+        )[:batch_size]
+    )
+
+    for entry_id, vendor_id, queued_at, log_snapshot in entries:
+        with vendor_metrics_recompute_duration.time(
+            trigger="metrics_queue"
+        ), transaction.atomic():
+            vendor = Vendor.objects.select_for_update().filter(pk=vendor_id).first()
+            if vendor is None:
+                # deleted since its entry was read
+                PendingVendorMetrics.objects.filter(vendor_id=vendor_id).delete()
+                continue
+            rebuild_vendor_counters(vendor)
+            if log_snapshot:
+                log_vendor_performance(vendor)
+
+            # an update queued while recomputing keeps the entry for the next pass,
+            # without the snapshot already logged by this one
+            deleted, _ = PendingVendorMetrics.objects.filter(
+                id=entry_id, queued_at=queued_at
+            ).delete()
+            if not deleted and log_snapshot:
+                PendingVendorMetrics.objects.filter(id=entry_id).update(
+                    log_snapshot=False
+                )
+
+    return len(entries)
+
+
+def flush_vendor_metrics_queue(batch_size=100):
+    """Drains the queue synchronously, mostly useful in tests"""
+    processed = 0
+    while True:
+        count = process_vendor_metrics_queue(batch_size=batch_size)
+        if not count:
+            return processed
+        processed += count
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.11 on 2026-10-18 05:50
+
+from django.db import migrations, models
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def rebuild_counters(apps, schema_editor):
+    Vendor = apps.get_model("vendors", "Vendor")
+    completed = Q(status="completed")
+    acknowledged = completed & Q(
+        issue_date__isnull=False, acknowledgment_date__isnull=False
+    )
+    response_time = ExpressionWrapper(
+        F("acknowledgment_date") - F("issue_date"),
+        output_field=models.DurationField(),
+    )
+
+    for vendor in Vendor.objects.all():
+        counters = vendor.purchaseorder_set.aggregate(
+            issued=Count("id", filter=Q(issue_date__isnull=False)),
+            completed=Count("id", filter=completed),
+            on_time=Count(
+                "id", filter=completed & Q(delivery_date__gte=timezone.now())
+            ),
+            quality_sum=Sum(
+                Coalesce("quality_rating", 0.0, output_field=FloatField()),
+                filter=completed,
+            ),
+            response_time_sum=Sum(response_time, filter=acknowledged),
+            response_time_count=Count("id", filter=acknowledged),
+        )
+        vendor.issued_orders_count = counters["issued"]
+        vendor.completed_orders_count = counters["completed"]
+        vendor.on_time_orders_count = counters["on_time"]
+        vendor.quality_rating_sum = counters["quality_sum"] or 0
+        vendor.response_time_sum = (
+            counters["response_time_sum"].total_seconds()
+            if counters["response_time_sum"]
+            else 0
+        )
+        vendor.response_time_count = counters["response_time_count"]
+
+        if vendor.completed_orders_count:
+            vendor.on_time_delivery_rate = (
+                vendor.on_time_orders_count / vendor.completed_orders_count * 100
+            )
+            vendor.quality_rating_avg = (
+                vendor.quality_rating_sum / vendor.completed_orders_count
+            )
+            vendor.fullfilment_rate = (
+                vendor.issued_orders_count / vendor.completed_orders_count
+            )
+        if vendor.response_time_count:
+            vendor.average_response_time = (
+                vendor.response_time_sum / vendor.response_time_count
+            )
+        vendor.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vendor",
+            name="completed_orders_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="issued_orders_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="on_time_orders_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="quality_rating_sum",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="response_time_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="response_time_sum",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(rebuild_counters, migrations.RunPython.noop),
+    ]
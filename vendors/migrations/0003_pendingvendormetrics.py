@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-18 05:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0002_vendor_metric_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingVendorMetrics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("queued_at", models.DateTimeField()),
+                ("log_snapshot", models.BooleanField(default=False)),
+                (
+                    "vendor",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE, to="vendors.vendor"
+                    ),
+                ),
+            ],
+        ),
+    ]
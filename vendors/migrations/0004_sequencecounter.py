@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-18 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0003_pendingvendormetrics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SequenceCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prefix", models.CharField(max_length=16)),
+                ("year", models.PositiveSmallIntegerField()),
+                ("last_value", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="sequencecounter",
+            constraint=models.UniqueConstraint(
+                fields=("prefix", "year"), name="unique_sequence_counter"
+            ),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.2.11 on 2026-10-18 05:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+METRICS = (
+    "on_time_delivery_rate",
+    "quality_rating_avg",
+    "average_response_time",
+    "fulfillment_rate",
+)
+
+
+def backfill_rollups(apps, schema_editor):
+    VendorPerformanceLog = apps.get_model("vendors", "VendorPerformanceLog")
+    VendorPerformanceRollup = apps.get_model("vendors", "VendorPerformanceRollup")
+
+    rollups = {}
+    for log in VendorPerformanceLog.objects.order_by("date").iterator():
+        key = (log.vendor_id, timezone.localdate(log.date))
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = rollups[key] = VendorPerformanceRollup(
+                vendor_id=log.vendor_id, day=key[1], count=0
+            )
+            for metric in METRICS:
+                value = getattr(log, metric)
+                setattr(rollup, f"{metric}_sum", 0.0)
+                setattr(rollup, f"{metric}_min", value)
+                setattr(rollup, f"{metric}_max", value)
+
+        rollup.count += 1
+        rollup.last_date = log.date
+        for metric in METRICS:
+            value = getattr(log, metric)
+            setattr(rollup, f"{metric}_sum", getattr(rollup, f"{metric}_sum") + value)
+            setattr(
+                rollup, f"{metric}_min", min(getattr(rollup, f"{metric}_min"), value)
+            )
+            setattr(
+                rollup, f"{metric}_max", max(getattr(rollup, f"{metric}_max"), value)
+            )
+            setattr(rollup, f"{metric}_last", value)
+
+    VendorPerformanceRollup.objects.bulk_create(rollups.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0004_sequencecounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VendorPerformanceRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("last_date", models.DateTimeField()),
+                ("on_time_delivery_rate_sum", models.FloatField(default=0.0)),
+                ("on_time_delivery_rate_min", models.FloatField()),
+                ("on_time_delivery_rate_max", models.FloatField()),
+                ("on_time_delivery_rate_last", models.FloatField()),
+                ("quality_rating_avg_sum", models.FloatField(default=0.0)),
+                ("quality_rating_avg_min", models.FloatField()),
+                ("quality_rating_avg_max", models.FloatField()),
+                ("quality_rating_avg_last", models.FloatField()),
+                ("average_response_time_sum", models.FloatField(default=0.0)),
+                ("average_response_time_min", models.FloatField()),
+                ("average_response_time_max", models.FloatField()),
+                ("average_response_time_last", models.FloatField()),
+                ("fulfillment_rate_sum", models.FloatField(default=0.0)),
+                ("fulfillment_rate_min", models.FloatField()),
+                ("fulfillment_rate_max", models.FloatField()),
+                ("fulfillment_rate_last", models.FloatField()),
+                (
+                    "vendor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="vendors.vendor"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="vendorperformancerollup",
+            constraint=models.UniqueConstraint(
+                fields=("vendor", "day"), name="unique_vendor_performance_rollup"
+            ),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
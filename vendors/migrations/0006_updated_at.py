@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-18 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0005_vendorperformancerollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="purchaseorder",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="vendorperformancelog",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-18 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0006_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                fields=[
+                    "vendor",
+                    "status",
+                    "delivery_date",
+                    "quality_rating",
+                    "issue_date",
+                    "acknowledgment_date",
+                ],
+                name="po_vendor_status_metrics_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendorperformancelog",
+            index=models.Index(fields=["vendor", "date"], name="log_vendor_date_idx"),
+        ),
+    ]
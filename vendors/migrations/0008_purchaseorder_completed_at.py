@@ -0,0 +1,74 @@
+# Generated by Django 4.2.11 on 2026-10-18 06:17
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+
+
+def backfill_completion(apps, schema_editor):
+    """Completed orders have no recorded completion time, their last write is
+    the closest one available"""
+    PurchaseOrder = apps.get_model("vendors", "PurchaseOrder")
+    Vendor = apps.get_model("vendors", "Vendor")
+
+    completed = PurchaseOrder.objects.filter(status="completed")
+    completed.update(completed_at=F("updated_at"))
+    completed.filter(delivery_date__gte=F("completed_at")).update(is_on_time=True)
+
+    counts = {
+        row["vendor_id"]: row["on_time"]
+        for row in completed.values("vendor_id").annotate(
+            on_time=Count("id", filter=Q(is_on_time=True))
+        )
+    }
+    vendors = list(Vendor.objects.filter(id__in=counts))
+    for vendor in vendors:
+        vendor.on_time_orders_count = counts[vendor.id]
+        vendor.on_time_delivery_rate = (
+            counts[vendor.id] / vendor.completed_orders_count * 100
+            if vendor.completed_orders_count
+            else 0
+        )
+    Vendor.objects.bulk_update(
+        vendors,
+        fields=["on_time_orders_count", "on_time_delivery_rate"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0007_metric_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="purchaseorder",
+            name="po_vendor_status_metrics_idx",
+        ),
+        migrations.AddField(
+            model_name="purchaseorder",
+            name="completed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="purchaseorder",
+            name="is_on_time",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_completion, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                fields=[
+                    "vendor",
+                    "status",
+                    "is_on_time",
+                    "quality_rating",
+                    "issue_date",
+                    "acknowledgment_date",
+                ],
+                name="po_vendor_status_metrics_idx",
+            ),
+        ),
+    ]
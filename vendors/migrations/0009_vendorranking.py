@@ -0,0 +1,83 @@
+# Generated by Django 4.2.11 on 2026-10-18 06:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0008_purchaseorder_completed_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VendorRanking",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                ("score_rank", models.PositiveIntegerField()),
+                ("on_time_delivery_rate", models.FloatField(null=True)),
+                ("on_time_delivery_rate_rank", models.PositiveIntegerField()),
+                ("quality_rating_avg", models.FloatField(null=True)),
+                ("quality_rating_avg_rank", models.PositiveIntegerField()),
+                ("average_response_time", models.FloatField(null=True)),
+                ("average_response_time_rank", models.PositiveIntegerField()),
+                ("fullfilment_rate", models.FloatField(null=True)),
+                ("fullfilment_rate_rank", models.PositiveIntegerField()),
+                ("computed_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="vendor",
+            index=models.Index(fields=["updated_at"], name="vendor_updated_at_idx"),
+        ),
+        migrations.AddField(
+            model_name="vendorranking",
+            name="vendor",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE, to="vendors.vendor"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendorranking",
+            index=models.Index(
+                fields=["score_rank", "vendor"], name="ranking_score_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendorranking",
+            index=models.Index(
+                fields=["on_time_delivery_rate_rank", "vendor"],
+                name="ranking_on_time_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendorranking",
+            index=models.Index(
+                fields=["quality_rating_avg_rank", "vendor"], name="ranking_quality_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendorranking",
+            index=models.Index(
+                fields=["average_response_time_rank", "vendor"],
+                name="ranking_response_time_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendorranking",
+            index=models.Index(
+                fields=["fullfilment_rate_rank", "vendor"],
+                name="ranking_fulfilment_idx",
+            ),
+        ),
+    ]
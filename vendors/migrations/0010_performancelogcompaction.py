@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-18 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0009_vendorranking"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PerformanceLogCompaction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("compacted_before", models.DateTimeField()),
+                ("deleted", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendors", "0010_performancelogcompaction"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vendorranking",
+            name="ranked_vendors",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,15 +1,28 @@
-from django.db import models
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest, Least
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from vendors.constants import PO_STATUS
+from vendors.events import publish_performance_log
+from vendors.instrumentation import instrumented_receiver
+from vendors.prometheus import (
+    performance_logs_written,
+    vendor_metrics_recompute_duration,
+)
 from django.utils import timezone
 
 from vendors.services import (
-    calculate_on_time_delivery_rating_avg,
-    calculate_quality_rating_avg,
-    calculate_response_time,
-    calculate_fullfilment_rate,
+    PERFORMANCE_LOG_METRICS,
+    VENDOR_COUNTER_FIELDS,
+    VENDOR_METRIC_FIELDS,
+    apply_counters_delta,
+    calculate_metrics_from_counters,
+    compute_vendor_scorecard,
+    is_delivered_on_time,
+    purchase_order_counters,
 )
 
 PO_ORDER_STATUS_CHOICES = (
@@ -29,6 +42,34 @@ class Vendor(models.Model):
     average_response_time = models.FloatField(default=0.0)
     fullfilment_rate = models.FloatField(default=0.0)
 
+    # running counters backing the metrics above, see vendors.services
+    issued_orders_count = models.PositiveIntegerField(default=0)
+    completed_orders_count = models.PositiveIntegerField(default=0)
+    on_time_orders_count = models.PositiveIntegerField(default=0)
+    quality_rating_sum = models.FloatField(default=0.0)
+    response_time_sum = models.FloatField(default=0.0)
+    response_time_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # the rankings check for vendors changed since they were computed
+            models.Index(fields=["updated_at"], name="vendor_updated_at_idx"),
+        ]
+
+    METRIC_UPDATE_FIELDS = (*VENDOR_COUNTER_FIELDS, *VENDOR_METRIC_FIELDS, "updated_at")
+
+    def refresh_metrics(self):
+        counters = {field: getattr(self, field) for field in VENDOR_COUNTER_FIELDS}
+        for field, value in calculate_metrics_from_counters(counters).items():
+            setattr(self, field, value)
+
+    def apply_scorecard(self, scorecard):
+        for field in (*VENDOR_COUNTER_FIELDS, *VENDOR_METRIC_FIELDS):
+            setattr(self, field, scorecard[field])
+        # bulk_update does not maintain auto_now fields
+        self.updated_at = timezone.now()
+
 
 class PurchaseOrder(models.Model):
     vendor = models.ForeignKey(Vendor, on_delete=models.PROTECT)
@@ -43,6 +84,84 @@ class PurchaseOrder(models.Model):
     quality_rating = models.FloatField(null=True)
     issue_date = models.DateTimeField(auto_now_add=True)
     acknowledgment_date = models.DateTimeField(null=True)
+    # stamped on the transition to completed, the on-time classification is
+    # derived from it and never changes with the clock
+    completed_at = models.DateTimeField(null=True, blank=True)
+    is_on_time = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # the metric aggregates filter by vendor and status and only read
+            # the remaining columns, which SQLite then serves from the index
+            models.Index(
+                fields=[
+                    "vendor",
+                    "status",
+                    "is_on_time",
+                    "quality_rating",
+                    "issue_date",
+                    "acknowledgment_date",
+                ],
+                name="po_vendor_status_metrics_idx",
+            )
+        ]
+
+    METRIC_STATE_FIELDS = (
+        "vendor_id",
+        "status",
+        "is_on_time",
+        "quality_rating",
+        "issue_date",
+        "acknowledgment_date",
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(field in instance.__dict__ for field in cls.METRIC_STATE_FIELDS):
+            instance._metric_state = instance.metric_state()
+        return instance
+
+    COMPLETION_FIELDS = ("completed_at", "is_on_time")
+
+    def metric_state(self):
+        """Snapshot of the fields the vendor metrics depend on"""
+        return {field: getattr(self, field) for field in self.METRIC_STATE_FIELDS}
+
+    def set_completion_state(self, now=None):
+        """Stamps ``completed_at`` when the order becomes completed, clears it
+        when it leaves that status, and classifies the delivery as on time"""
+        if self.status != PO_STATUS.completed:
+            self.completed_at = None
+        elif self.completed_at is None:
+            self.completed_at = now or timezone.now()
+        self.is_on_time = is_delivered_on_time(self.completed_at, self.delivery_date)
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        if all(field in self.__dict__ for field in self.METRIC_STATE_FIELDS):
+            self._metric_state = self.metric_state()
+
+    def save(self, *args, **kwargs):
+        self.set_completion_state()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *self.COMPLETION_FIELDS}
+
+        with transaction.atomic():
+            if not self._state.adding and self.pk is not None:
+                # the counter delta is taken against the row as stored, another
+                # instance of the order may have been saved since this one loaded
+                stored = (
+                    PurchaseOrder.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values(*self.METRIC_STATE_FIELDS)
+                    .first()
+                )
+                if stored is not None:
+                    self._metric_state = stored
+            super().save(*args, **kwargs)
 
 
 class VendorPerformanceLog(models.Model):
@@ -52,32 +171,316 @@ class VendorPerformanceLog(models.Model):
     quality_rating_avg = models.FloatField()
     average_response_time = models.FloatField()
     fulfillment_rate = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["vendor", "date"], name="log_vendor_date_idx"),
+        ]
+
+
+class VendorPerformanceRollup(models.Model):
+    """Daily aggregate of a vendor's performance logs, kept up to date as logs
+    are written so long-range trends do not scan the raw logs"""
+
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    last_date = models.DateTimeField()
+    on_time_delivery_rate_sum = models.FloatField(default=0.0)
+    on_time_delivery_rate_min = models.FloatField()
+    on_time_delivery_rate_max = models.FloatField()
+    on_time_delivery_rate_last = models.FloatField()
+    quality_rating_avg_sum = models.FloatField(default=0.0)
+    quality_rating_avg_min = models.FloatField()
+    quality_rating_avg_max = models.FloatField()
+    quality_rating_avg_last = models.FloatField()
+    average_response_time_sum = models.FloatField(default=0.0)
+    average_response_time_min = models.FloatField()
+    average_response_time_max = models.FloatField()
+    average_response_time_last = models.FloatField()
+    fulfillment_rate_sum = models.FloatField(default=0.0)
+    fulfillment_rate_min = models.FloatField()
+    fulfillment_rate_max = models.FloatField()
+    fulfillment_rate_last = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vendor", "day"], name="unique_vendor_performance_rollup"
+            )
+        ]
+
+
+class PerformanceLogCompaction(models.Model):
+    """One run of ``compact_performance_logs``, logs dated before
+    ``compacted_before`` only kept the last one of each vendor and day"""
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    compacted_before = models.DateTimeField()
+    deleted = models.PositiveBigIntegerField(default=0)
+
+
+class VendorRanking(models.Model):
+    """Materialized leaderboard, one row per vendor with the metrics it was
+    ranked on, its rank on each of them and on the weighted composite score.
+    Rebuilt as a whole by vendors.rankings since every rank is relative"""
+
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE)
+    score = models.FloatField()
+    score_rank = models.PositiveIntegerField()
+    on_time_delivery_rate = models.FloatField(null=True)
+    on_time_delivery_rate_rank = models.PositiveIntegerField()
+    quality_rating_avg = models.FloatField(null=True)
+    quality_rating_avg_rank = models.PositiveIntegerField()
+    average_response_time = models.FloatField(null=True)
+    average_response_time_rank = models.PositiveIntegerField()
+    fullfilment_rate = models.FloatField(null=True)
+    fullfilment_rate_rank = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+    # vendors ranked by the build, fewer rows left means one was deleted since
+    ranked_vendors = models.PositiveIntegerField(default=0)
+
+    RANK_FIELDS = (
+        "score_rank",
+        "on_time_delivery_rate_rank",
+        "quality_rating_avg_rank",
+        "average_response_time_rank",
+        "fullfilment_rate_rank",
+    )
+
+    class Meta:
+        # top-N reads walk one of these in order instead of sorting the table
+        indexes = [
+            models.Index(fields=["score_rank", "vendor"], name="ranking_score_idx"),
+            models.Index(
+                fields=["on_time_delivery_rate_rank", "vendor"],
+                name="ranking_on_time_idx",
+            ),
+            models.Index(
+                fields=["quality_rating_avg_rank", "vendor"],
+                name="ranking_quality_idx",
+            ),
+            models.Index(
+                fields=["average_response_time_rank", "vendor"],
+                name="ranking_response_time_idx",
+            ),
+            models.Index(
+                fields=["fullfilment_rate_rank", "vendor"],
+                name="ranking_fulfilment_idx",
+            ),
+        ]
+
+
+class PendingVendorMetrics(models.Model):
+    """Vendors whose metrics must be recomputed by the metrics queue worker,
+    one row per vendor so bursts of purchase order updates are coalesced"""
+
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE)
+    queued_at = models.DateTimeField()
+    log_snapshot = models.BooleanField(default=False)
+
+
+class SequenceCounter(models.Model):
+    """Last number handed out per code prefix and year, see vendors.sequences"""
+
+    prefix = models.CharField(max_length=16)
+    year = models.PositiveSmallIntegerField()
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["prefix", "year"], name="unique_sequence_counter"
+            )
+        ]
+
+
+def deferred_vendor_metrics():
+    return settings.VENDOR_METRICS_MODE == "deferred"
+
+
+def record_performance_rollup(log):
+    """Folds a performance log into its vendor's rollup for the log's day"""
+    date = Value(log.date, output_field=models.DateTimeField())
+    is_latest = Q(last_date__lte=log.date)
+
+    updates = {"count": F("count") + 1, "last_date": Greatest("last_date", date)}
+    defaults = {"count": 1, "last_date": log.date}
+    for metric in PERFORMANCE_LOG_METRICS:
+        value = Value(float(getattr(log, metric)), output_field=models.FloatField())
+        updates[f"{metric}_sum"] = F(f"{metric}_sum") + value
+        updates[f"{metric}_min"] = Least(f"{metric}_min", value)
+        updates[f"{metric}_max"] = Greatest(f"{metric}_max", value)
+        updates[f"{metric}_last"] = Case(
+            When(is_latest, then=value), default=F(f"{metric}_last")
+        )
+        for suffix in ("sum", "min", "max", "last"):
+            defaults[f"{metric}_{suffix}"] = getattr(log, metric)
+
+    rollups = VendorPerformanceRollup.objects.filter(
+        vendor_id=log.vendor_id, day=timezone.localdate(log.date)
+    )
+    with transaction.atomic():
+        if rollups.update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                VendorPerformanceRollup.objects.create(
+                    vendor_id=log.vendor_id,
+                    day=timezone.localdate(log.date),
+                    **defaults,
+                )
+        except IntegrityError:
+            rollups.update(**updates)
+
+
+def log_vendor_performance(vendor):
+    log = VendorPerformanceLog.objects.create(
+        date=timezone.now(),
+        vendor=vendor,
+        on_time_delivery_rate=vendor.on_time_delivery_rate,
+        quality_rating_avg=vendor.quality_rating_avg,
+        average_response_time=vendor.average_response_time,
+        fulfillment_rate=vendor.fullfilment_rate,
+    )
+    record_performance_rollup(log)
+    performance_logs_written.inc()
+    transaction.on_commit(lambda: publish_performance_log(log))
+    return log
+
+
+def update_vendor_counters(vendor_id, before=None, after=None):
+    """Applies a purchase order's before/after counter contributions to the
+    vendor and refreshes its metrics, without aggregating over its orders"""
+    vendor = Vendor.objects.select_for_update().get(pk=vendor_id)
+    apply_counters_delta(vendor, before, after)
+    vendor.refresh_metrics()
+    vendor.save(update_fields=Vendor.METRIC_UPDATE_FIELDS)
+    return vendor
+
+
+def rebuild_vendor_counters(vendor):
+    vendor.apply_scorecard(compute_vendor_scorecard(vendor))
+    vendor.save(update_fields=Vendor.METRIC_UPDATE_FIELDS)
+    return vendor
+
+
+def refresh_vendor_metrics(vendor_ids, log_snapshot=False):
+    """Recomputes the metrics of each vendor once, for bulk writes that bypass
+    the purchase order signals. Only queues the vendors in deferred mode"""
+    vendor_ids = set(vendor_ids)
+    if not vendor_ids:
+        return
+
+    if deferred_vendor_metrics():
+        from vendors.metrics_queue import enqueue_vendor_metrics
+
+        enqueue_vendor_metrics(vendor_ids, log_snapshot=log_snapshot)
+        return
+
+    with vendor_metrics_recompute_duration.time(
+        trigger="refresh_vendor_metrics"
+    ), transaction.atomic():
+        vendors = list(Vendor.objects.select_for_update().filter(id__in=vendor_ids))
+        scorecards = compute_vendor_scorecard(vendor.id for vendor in vendors)
+        for vendor in vendors:
+            vendor.apply_scorecard(scorecards[vendor.id])
+        Vendor.objects.bulk_update(vendors, fields=Vendor.METRIC_UPDATE_FIELDS)
+        if log_snapshot:
+            for vendor in vendors:
+                log_vendor_performance(vendor)
+
+    from vendors.cache import invalidate_vendor_performance
+
+    invalidate_vendor_performance(vendor_ids)
+
+
+def refresh_purchase_order_vendors(purchase_orders):
+    """Refreshes the vendors of purchase orders written without their signal,
+    logging a snapshot for the vendors of completed ones like
+    ``purchase_order_updated`` does"""
+    vendor_ids = {po.vendor_id for po in purchase_orders}
+    completed_vendor_ids = {
+        po.vendor_id for po in purchase_orders if po.status == PO_STATUS.completed
+    }
+    refresh_vendor_metrics(completed_vendor_ids, log_snapshot=True)
+    refresh_vendor_metrics(vendor_ids - completed_vendor_ids)
+
+
+def _purchase_order_counters(state):
+    return purchase_order_counters(
+        **{field: value for field, value in state.items() if field != "vendor_id"}
+    )
 
 
 @receiver(post_save, sender=PurchaseOrder)
+@instrumented_receiver
 def purchase_order_updated(sender, instance: PurchaseOrder, created, **kwargs):
-    if not created:
-        vendor = instance.vendor
-        if instance.status == PO_STATUS.completed:
-            vendor.on_time_delivery_rate = calculate_on_time_delivery_rating_avg(vendor)
-            vendor.quality_rating_avg = calculate_quality_rating_avg(vendor)
-
-        if instance.acknowledgment_date:
-            vendor.average_response_time = calculate_response_time(instance.vendor)
-
-        vendor.fullfilment_rate = calculate_fullfilment_rate(vendor)
-
-        vendor.save()
-
-        if instance.status == PO_STATUS.completed:
-            VendorPerformanceLog.objects.create(
-                date=timezone.now(),
-                vendor=vendor,
-                on_time_delivery_rate=vendor.on_time_delivery_rate,
-                quality_rating_avg=vendor.quality_rating_avg,
-                average_response_time=vendor.average_response_time,
-                fulfillment_rate=vendor.fullfilment_rate,
+    before = None if created else getattr(instance, "_metric_state", None)
+    after = instance.metric_state()
+    log_snapshot = not created and instance.status == PO_STATUS.completed
+
+    if deferred_vendor_metrics():
+        from vendors.metrics_queue import enqueue_vendor_metrics
+
+        vendor_ids = {after["vendor_id"], before and before["vendor_id"]} - {None}
+        enqueue_vendor_metrics(vendor_ids, log_snapshot=log_snapshot)
+        instance._metric_state = after
+        return
+
+    with vendor_metrics_recompute_duration.time(
+        trigger="purchase_order_updated"
+    ), transaction.atomic():
+        if not created and before is None:
+            # previous state unknown, e.g. the instance was not loaded from the db
+            vendor = rebuild_vendor_counters(
+                Vendor.objects.select_for_update().get(pk=instance.vendor_id)
+            )
+        elif before and before["vendor_id"] != after["vendor_id"]:
+            update_vendor_counters(
+                before["vendor_id"], before=_purchase_order_counters(before)
+            )
+            vendor = update_vendor_counters(
+                after["vendor_id"], after=_purchase_order_counters(after)
+            )
+        else:
+            vendor = update_vendor_counters(
+                after["vendor_id"],
+                before=before and _purchase_order_counters(before),
+                after=_purchase_order_counters(after),
             )
 
+        if log_snapshot:
+            log_vendor_performance(vendor)
+
+    instance._metric_state = after
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+@instrumented_receiver
+def vendor_changed(sender, instance: Vendor, **kwargs):
+    from vendors.cache import invalidate_vendor_performance
+
+    invalidate_vendor_performance([instance.pk])
+
+
+@receiver(post_delete, sender=PurchaseOrder)
+@instrumented_receiver
+def purchase_order_deleted(sender, instance: PurchaseOrder, **kwargs):
+    before = getattr(instance, "_metric_state", None) or instance.metric_state()
+
+    if deferred_vendor_metrics():
+        from vendors.metrics_queue import enqueue_vendor_metrics
+
+        enqueue_vendor_metrics([before["vendor_id"]])
+        return
+
+    with transaction.atomic():
+        update_vendor_counters(
+            before["vendor_id"], before=_purchase_order_counters(before)
+        )
+
 
 post_save.connect(purchase_order_updated, sender=PurchaseOrder)
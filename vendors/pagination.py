@@ -0,0 +1,63 @@
+from django.conf import settings
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+)
+
+
+class SizedPageNumberPagination(PageNumberPagination):
+    page_size_query_param = "page_size"
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination over an indexed key, no COUNT(*) and no OFFSET scan.
+
+    Views choose the key with ``cursor_ordering``, ``id`` by default"""
+
+    ordering = "id"
+    page_size_query_param = "page_size"
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, "cursor_ordering", self.ordering)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+
+class SelectablePagination(BasePagination):
+    """Page number pagination unless the client asks for keyset pagination
+    with ``?pagination=cursor`` or follows a ``cursor`` link"""
+
+    page_number_class = SizedPageNumberPagination
+    cursor_class = KeysetPagination
+
+    def __init__(self):
+        self.delegate = self.page_number_class()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            request.query_params.get("pagination") == "cursor"
+            or self.cursor_class.cursor_query_param in request.query_params
+        ):
+            self.delegate = self.cursor_class()
+        return self.delegate.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.delegate.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.delegate.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return self.delegate.get_schema_operation_parameters(view)
+
+    def to_html(self):
+        return self.delegate.to_html()
+
+    def get_results(self, data):
+        return self.delegate.get_results(data)
+
+    @property
+    def display_page_controls(self):
+        return self.delegate.display_page_controls
@@ -0,0 +1,370 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Metrics live in a registry of this process. When ``PROMETHEUS_MULTIPROC_DIR``
+is set every process also writes its samples to ``<pid>-<uuid>.json`` in that
+directory, at most once per ``PROMETHEUS_FLUSH_INTERVAL`` seconds and before
+rendering, and ``/metrics`` sums the files of all the processes. Counters and
+histograms are the only kinds, both sum across processes.
+
+A process removes its file when it exits, and ``/metrics`` prunes the files of
+processes no longer running, e.g. killed ones, so the totals only cover live
+processes. The uuid keeps a process reusing the pid of a dead one from taking
+over its file.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+from vendors.instrumentation import observe_queries
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _process_id():
+    return f"{os.getpid()}-{uuid.uuid4().hex}"
+
+
+def _process_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # running under another user
+        return True
+    return True
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.process_id = _process_id()
+        self.flushed_at = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _check_fork(self):
+        # a forked worker starts with the parent's samples, which the parent
+        # already reports
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.process_id = _process_id()
+            for metric in self.metrics.values():
+                metric.samples.clear()
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            return {
+                name: {
+                    "kind": metric.kind,
+                    "help": metric.documentation,
+                    "labelnames": list(metric.labelnames),
+                    "buckets": list(getattr(metric, "buckets", ())),
+                    "samples": [
+                        [list(labels), _copy_sample(value)]
+                        for labels, value in metric.samples.items()
+                    ],
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self, force=False):
+        """Writes this process' samples to the multiprocess directory"""
+        directory = settings.PROMETHEUS_MULTIPROC_DIR
+        if not directory:
+            return
+        if not force and time.monotonic() - self.flushed_at < (
+            settings.PROMETHEUS_FLUSH_INTERVAL
+        ):
+            return
+
+        self.flushed_at = time.monotonic()
+        samples = json.dumps(self.snapshot())
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.process_id}.json"
+        # a file of its own per flush, threads of a process may flush at once
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, prefix=f"{path.stem}.", suffix=".tmp", delete=False
+        ) as temporary:
+            temporary.write(samples)
+        try:
+            os.replace(temporary.name, path)
+        except OSError:
+            os.unlink(temporary.name)
+            raise
+
+    def remove_file(self):
+        """Removes this process' file from the multiprocess directory"""
+        directory = settings.PROMETHEUS_MULTIPROC_DIR
+        # a forked process that never flushed still holds its parent's id
+        if directory and self.pid == os.getpid():
+            (Path(directory) / f"{self.process_id}.json").unlink(missing_ok=True)
+
+    def collect(self):
+        """Samples of this process, or of every process writing to the
+        multiprocess directory"""
+        directory = settings.PROMETHEUS_MULTIPROC_DIR
+        if not directory:
+            return self.snapshot()
+
+        self.flush(force=True)
+        snapshots = []
+        for path in sorted(Path(directory).glob("*.json")):
+            pid = path.stem.split("-")[0]
+            if pid.isdigit() and not _process_running(int(pid)):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # the file of a process that is being replaced
+                continue
+        return merge_snapshots(snapshots)
+
+
+def _copy_sample(value):
+    if isinstance(value, dict):
+        return {**value, "buckets": list(value["buckets"])}
+    return value
+
+
+def merge_snapshots(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["kind"] == "counter":
+                    target["samples"][key] = target["samples"].get(key, 0) + value
+                    continue
+
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = _copy_sample(value)
+                else:
+                    current["buckets"] = [
+                        a + b for a, b in zip(current["buckets"], value["buckets"])
+                    ]
+                    current["sum"] += value["sum"]
+                    current["count"] += value["count"]
+    for metric in merged.values():
+        metric["samples"] = [
+            [list(labels), value] for labels, value in metric["samples"].items()
+        ]
+    return merged
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.remove_file)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples = {}
+        self.registry = registry
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.registry._check_fork()
+            self.samples[key] = self.samples.get(key, 0) + amount
+        self.registry.flush()
+
+    def value(self, **labels):
+        return self.samples.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        labelnames=(),
+        buckets=LATENCY_BUCKETS,
+        registry=REGISTRY,
+    ):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.registry._check_fork()
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample["buckets"][index] += 1
+                    break
+            sample["sum"] += value
+            sample["count"] += 1
+        self.registry.flush()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for labels, value in sorted(metric["samples"], key=lambda sample: sample[0]):
+            if metric["kind"] == "counter":
+                label_text = _format_labels(metric["labelnames"], labels)
+                lines.append(f"{name}{label_text} {_format_value(value)}")
+                continue
+
+            cumulative = 0
+            bounds = [*metric["buckets"], float("inf")]
+            counts = [*value["buckets"], value["count"] - sum(value["buckets"])]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                label_text = _format_labels(
+                    metric["labelnames"], labels, [("le", _format_value(bound))]
+                )
+                lines.append(f"{name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(metric["labelnames"], labels)
+            lines.append(f"{name}_sum{label_text} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{label_text} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+http_request_duration = Histogram(
+    "vms_http_request_duration_seconds",
+    "Latency of the API requests by URL name",
+    ["url_name", "method"],
+)
+http_requests = Counter(
+    "vms_http_requests_total",
+    "API requests by URL name and status code",
+    ["url_name", "method", "status"],
+)
+http_request_queries = Histogram(
+    "vms_http_request_sql_queries",
+    "SQL queries run per API request by URL name",
+    ["url_name", "method"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+vendor_metrics_recompute_duration = Histogram(
+    "vms_vendor_metrics_recompute_duration_seconds",
+    "Duration of the vendor metric recomputations by trigger",
+    ["trigger"],
+)
+performance_logs_written = Counter(
+    "vms_vendor_performance_logs_written_total",
+    "VendorPerformanceLog rows written",
+)
+vendor_performance_cache_requests = Counter(
+    "vms_vendor_performance_cache_requests_total",
+    "Vendor performance cache lookups by result (hits or misses)",
+    ["result"],
+)
+
+
+class PrometheusMiddleware:
+    """Records the latency, status and SQL query count of every request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        with observe_queries() as stats:
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, stats.queries)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with observe_queries() as stats:
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, stats.queries)
+        return response
+
+    def record(self, request, response, elapsed, queries):
+        # unmatched paths share one label so scanners cannot blow up the series
+        url_name = getattr(request.resolver_match, "view_name", None) or "unmatched"
+        labels = {"url_name": url_name, "method": request.method}
+        http_request_duration.observe(elapsed, **labels)
+        http_request_queries.observe(queries, **labels)
+        http_requests.inc(**labels, status=response.status_code)
+
+
+def metrics_view(request):
+    return HttpResponse(render(REGISTRY.collect()), content_type=CONTENT_TYPE)
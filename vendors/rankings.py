@@ -0,0 +1,100 @@
+"""Materialized vendor leaderboard.
+
+``VendorRanking`` holds each vendor's composite score and its rank on the score
+and on every metric, so top-N and rank-of-vendor reads are index lookups. Ranks
+are relative, so the table is rebuilt as a whole, never on a read: by
+``recompute_vendor_metrics`` and by the ``refresh_vendor_rankings`` command,
+which with ``--loop`` rebuilds once a vendor was created, changed or deleted
+since the last build, at most every ``VENDOR_RANKING_MAX_AGE`` seconds. The
+leaderboard serves the rows of the last build meanwhile, a deleted vendor only
+takes its own row with it.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from vendors.models import Vendor, VendorRanking
+from vendors.services import RANKING_METRICS, rank_vendors
+
+RANKING_ORDERS = {
+    "score": "score_rank",
+    **{metric: f"{metric}_rank" for metric in RANKING_METRICS},
+}
+
+
+def vendor_ranking_metrics():
+    """``{vendor_id: {metric: value}}`` of every vendor, None for a metric the
+    vendor has no purchase orders for yet"""
+    counters = sorted({counter for _, counter in RANKING_METRICS.values()})
+    rows = Vendor.objects.values_list("id", *RANKING_METRICS, *counters)
+
+    metrics = {}
+    for vendor_id, *values in rows.iterator():
+        row = dict(zip((*RANKING_METRICS, *counters), values))
+        metrics[vendor_id] = {
+            metric: row[metric] if row[counter] else None
+            for metric, (_, counter) in RANKING_METRICS.items()
+        }
+    return metrics
+
+
+def refresh_vendor_rankings(batch_size=500):
+    """Rebuilds the rankings of every vendor, returns how many were ranked"""
+    # taken before reading, a vendor changed meanwhile makes the next check stale
+    computed_at = timezone.now()
+    metrics = vendor_ranking_metrics()
+    rankings = rank_vendors(metrics, settings.VENDOR_RANKING_WEIGHTS)
+
+    rows = [
+        VendorRanking(
+            vendor_id=vendor_id,
+            computed_at=computed_at,
+            ranked_vendors=len(rankings),
+            **metrics[vendor_id],
+            **ranking,
+        )
+        for vendor_id, ranking in rankings.items()
+    ]
+    with transaction.atomic():
+        VendorRanking.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["vendor"],
+            update_fields=[
+                "score",
+                *VendorRanking.RANK_FIELDS,
+                *RANKING_METRICS,
+                "computed_at",
+                "ranked_vendors",
+            ],
+        )
+        VendorRanking.objects.filter(computed_at__lt=computed_at).delete()
+    return len(rows)
+
+
+def rankings_build():
+    """``(computed_at, ranked_vendors)`` of the last build, None before any"""
+    return VendorRanking.objects.values_list("computed_at", "ranked_vendors").first()
+
+
+def ensure_vendor_rankings():
+    """Rebuilds the rankings when a vendor was created, changed or deleted
+    since they were computed and they are older than
+    ``VENDOR_RANKING_MAX_AGE`` seconds. Returns whether they were rebuilt"""
+    build = rankings_build()
+    if build is None:
+        if not Vendor.objects.exists():
+            return False
+    else:
+        computed_at, ranked_vendors = build
+        max_age = timezone.timedelta(seconds=settings.VENDOR_RANKING_MAX_AGE)
+        if timezone.now() - computed_at < max_age:
+            return False
+        changed = Vendor.objects.filter(updated_at__gt=computed_at).exists()
+        if not changed and VendorRanking.objects.count() == ranked_vendors:
+            return False
+
+    refresh_vendor_rankings()
+    return True
@@ -0,0 +1,157 @@
+"""Read replica routing of the dashboard reads.
+
+Views opting in with ``ReplicaReadMixin`` (or ``read_from_replicas`` on the
+async views) read the models of this app from one of the
+``DATABASE_READ_REPLICAS`` aliases on GET and HEAD requests. Everything else,
+writes, other requests and the auth and session tables, stays on ``default``.
+
+Replicas lag behind, so a client reads its own writes from ``default`` for
+``DATABASE_REPLICA_STICKY_SECONDS`` after writing: ``ReplicaRoutingMiddleware``
+sets a cookie on any response of a request that wrote to the models of this
+app, and requests carrying it are pinned to ``default``. A request that wrote
+reads from ``default`` for the rest of its own run too.
+
+The replicas of a local SQLite setup are copies of the database refreshed by
+``manage.py sync_replicas``.
+"""
+
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_APPS = ("vendors",)
+STICKY_COOKIE = "vms_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_routing = contextvars.ContextVar("replica_routing", default=None)
+
+
+@dataclass
+class ReplicaRouting:
+    # the client wrote within the sticky window of an earlier request
+    pinned: bool = False
+    # inside a view reading from the replicas
+    replica_reads: bool = False
+    # this request wrote
+    wrote: bool = False
+
+    def use_replicas(self):
+        return self.replica_reads and not (self.pinned or self.wrote)
+
+
+def sticky_until(request):
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return 0.0
+
+
+@contextmanager
+def replica_reads(method):
+    """Routes the reads of the block to the replicas for a safe ``method``"""
+    routing = _routing.get()
+    if routing is None or method not in SAFE_METHODS:
+        yield
+        return
+
+    previous, routing.replica_reads = routing.replica_reads, True
+    try:
+        yield
+    finally:
+        routing.replica_reads = previous
+
+
+class ReplicaReadMixin:
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(request.method):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        replicas = settings.DATABASE_READ_REPLICAS
+        if (
+            replicas
+            and routing is not None
+            and routing.use_replicas()
+            and model._meta.app_label in REPLICA_APPS
+        ):
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        # only writes the replicas could lag on pin the client, not the session
+        # or last_login ones
+        if routing is not None and model._meta.app_label in REPLICA_APPS:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_READ_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        routing = ReplicaRouting(pinned=sticky_until(request) > time.time())
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.finish(response, routing)
+
+    async def __acall__(self, request):
+        routing = ReplicaRouting(pinned=sticky_until(request) > time.time())
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.finish(response, routing)
+
+    def finish(self, response, routing):
+        if routing.wrote and settings.DATABASE_READ_REPLICAS:
+            window = settings.DATABASE_REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                STICKY_COOKIE,
+                f"{time.time() + window:.3f}",
+                max_age=window,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def sync_replica(alias, source=DEFAULT_DB_ALIAS):
+    """Overwrites the SQLite database ``alias`` with a consistent copy of
+    ``source`` through the SQLite backup API"""
+    source_connection, replica = connections[source], connections[alias]
+    if source_connection.vendor != "sqlite" or replica.vendor != "sqlite":
+        raise ValueError("Only SQLite databases can be copied to a replica.")
+
+    source_connection.ensure_connection()
+    replica.ensure_connection()
+    source_connection.connection.backup(replica.connection)
@@ -0,0 +1,157 @@
+"""Retention of the raw vendor performance logs.
+
+Every day's logs are already folded into its ``VendorPerformanceRollup`` as
+they are written, so the raw rows of a day older than
+``PERFORMANCE_LOG_RETENTION_DAYS`` carry nothing the rollup does not, beyond
+their exact times. ``compact_performance_logs`` collapses each such vendor and
+day into a snapshot: the last log of the day is kept, the others are deleted.
+Months are compacted one at a time, oldest first, and the deletes are issued
+in batches of their own transaction so writers are never locked out for long.
+The deleted rows can be archived to one gzipped NDJSON file per month.
+
+Each run is recorded as a ``PerformanceLogCompaction``, month by month.
+Trends never notice: day, week and month buckets are read from the rollups,
+and hourly trends read the compacted days from the rollups too, one bucket per
+day, and the later ones from the raw logs.
+"""
+
+import gzip
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Min, Window
+from django.db.models.functions import RowNumber, TruncDate
+from django.utils import timezone
+
+from vendors.exports import ndjson_lines
+from vendors.models import PerformanceLogCompaction, VendorPerformanceLog
+from vendors.services import PERFORMANCE_LOG_METRICS
+
+ARCHIVE_FIELDS = ("id", "vendor_id", "date", *PERFORMANCE_LOG_METRICS, "updated_at")
+
+
+def retention_cutoff(days=None, now=None):
+    """Start of the oldest local day whose raw logs are retained, None when
+    every log is"""
+    days = settings.PERFORMANCE_LOG_RETENTION_DAYS if days is None else days
+    if days is None:
+        return None
+
+    day = timezone.localdate(now) - timezone.timedelta(days=days)
+    return timezone.make_aware(
+        timezone.datetime.combine(day, timezone.datetime.min.time())
+    )
+
+
+def month_start(date):
+    return timezone.make_aware(timezone.datetime(date.year, date.month, 1))
+
+
+def next_month(start):
+    return month_start(timezone.localtime(start + timezone.timedelta(days=32)))
+
+
+def compactable_logs(start, end):
+    """Logs dated in [start, end) other than the last one of their vendor and
+    local day"""
+    position = Window(
+        RowNumber(),
+        partition_by=[F("vendor_id"), TruncDate("date")],
+        order_by=[F("date").desc(), F("id").desc()],
+    )
+    return (
+        VendorPerformanceLog.objects.filter(date__gte=start, date__lt=end)
+        .annotate(position=position)
+        .filter(position__gt=1)
+    )
+
+
+def archive_path(directory, start):
+    return Path(directory) / f"performance_logs-{start:%Y-%m}.ndjson.gz"
+
+
+def archive_logs(path, log_ids):
+    """Appends the logs as one gzip member, readers see the members of a file
+    as one stream"""
+    rows = (
+        VendorPerformanceLog.objects.filter(id__in=log_ids)
+        .order_by("id")
+        .values_list(*ARCHIVE_FIELDS)
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "at", encoding="utf-8") as archive:
+        archive.writelines(ndjson_lines(ARCHIVE_FIELDS, rows.iterator()))
+
+
+def compact_performance_logs(
+    days=None,
+    batch_size=None,
+    archive_dir=None,
+    dry_run=False,
+    pause=0.0,
+    on_month=None,
+):
+    """Compacts the logs older than ``days`` to one snapshot per vendor and
+    day, returns ``{month: deleted}`` of every month compacted.
+
+    ``on_month`` gets each month and its count once done. Rows archived by a
+    batch that then fails to delete are archived again by the next run"""
+    cutoff = retention_cutoff(days)
+    if cutoff is None:
+        return {}
+    batch_size = batch_size or settings.PERFORMANCE_LOG_COMPACTION_BATCH_SIZE
+
+    oldest = VendorPerformanceLog.objects.filter(date__lt=cutoff).aggregate(
+        oldest=Min("date")
+    )["oldest"]
+    if oldest is None:
+        return {}
+
+    results = {}
+    run = None
+    start = month_start(timezone.localtime(oldest))
+    while start < cutoff:
+        end = min(next_month(start), cutoff)
+        log_ids = list(
+            compactable_logs(start, end).order_by("id").values_list("id", flat=True)
+        )
+
+        if not dry_run:
+            for offset in range(0, len(log_ids), batch_size):
+                batch = log_ids[offset : offset + batch_size]
+                if archive_dir:
+                    archive_logs(archive_path(archive_dir, start), batch)
+                with transaction.atomic():
+                    VendorPerformanceLog.objects.filter(id__in=batch).delete()
+                if pause:
+                    time.sleep(pause)
+
+            if run is None:
+                run = PerformanceLogCompaction(compacted_before=end, deleted=0)
+            run.compacted_before = end
+            run.deleted += len(log_ids)
+            run.save()
+
+        month = f"{start:%Y-%m}"
+        results[month] = len(log_ids)
+        if on_month:
+            on_month(month, len(log_ids))
+        start = end
+    return results
+
+
+def compacted_before():
+    """Date before which the logs were compacted, None when they never were"""
+    return PerformanceLogCompaction.objects.aggregate(
+        compacted_before=Max("compacted_before")
+    )["compacted_before"]
+
+
+async def acompacted_before():
+    return (
+        await PerformanceLogCompaction.objects.aaggregate(
+            compacted_before=Max("compacted_before")
+        )
+    )["compacted_before"]
@@ -0,0 +1,137 @@
+"""Allocation of vendor codes and po numbers.
+
+Numbers come from a ``SequenceCounter`` row per prefix and year. Each process
+reserves a block of ``SEQUENCE_BLOCK_SIZE`` numbers with a single atomic
+``UPDATE ... SET last_value = last_value + N`` and hands them out from memory,
+so most creates need no query at all and concurrent workers can never receive
+the same number. Numbers left in a block when a process exits are skipped.
+"""
+
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from vendors.models import PurchaseOrder, SequenceCounter, Vendor
+from vendors.services import (
+    PO_NUMBER_PREFIX,
+    VENDOR_CODE_PREFIX,
+    generate_po_number,
+    generate_vendor_code,
+    parse_sequence_number,
+)
+
+_leases = {}
+_leases_lock = threading.RLock()
+
+
+def _vendor_code_seed(year):
+    return max(
+        map(
+            parse_sequence_number,
+            Vendor.objects.filter(
+                vendor_code__startswith=f"{VENDOR_CODE_PREFIX}-{year}-"
+            ).values_list("vendor_code", flat=True),
+        ),
+        default=0,
+    )
+
+
+def _po_number_seed(year):
+    return max(
+        map(
+            parse_sequence_number,
+            PurchaseOrder.objects.filter(
+                po_number__startswith=f"{PO_NUMBER_PREFIX}-{year}-"
+            ).values_list("po_number", flat=True),
+        ),
+        default=0,
+    )
+
+
+SEQUENCE_SEEDS = {
+    VENDOR_CODE_PREFIX: _vendor_code_seed,
+    PO_NUMBER_PREFIX: _po_number_seed,
+}
+
+
+def reserve_sequence_block(prefix, year, size, using=None):
+    """Atomically reserves ``size`` numbers and returns the first and last one.
+
+    A missing counter starts after the highest number already in use, so
+    codes generated before the counter existed are never handed out again"""
+    using = using or router.db_for_write(SequenceCounter)
+    counters = SequenceCounter.objects.using(using).filter(prefix=prefix, year=year)
+
+    while True:
+        with transaction.atomic(using=using):
+            # the UPDATE comes first so the write lock is taken before any read
+            if counters.update(last_value=F("last_value") + size):
+                last_value = counters.values_list("last_value", flat=True).get()
+                return last_value - size + 1, last_value
+
+            seed = SEQUENCE_SEEDS.get(prefix, lambda year: 0)(year)
+            try:
+                with transaction.atomic(using=using):
+                    SequenceCounter.objects.using(using).create(
+                        prefix=prefix, year=year, last_value=seed + size
+                    )
+            except IntegrityError:
+                # another worker created the counter first, reserve from it
+                continue
+            return seed + 1, seed + size
+
+
+def allocate_sequence_numbers(prefix, year, count, using=None):
+    """Returns ``count`` unique numbers, taken from the block leased by this
+    process and reserving further blocks as needed"""
+    using = using or router.db_for_write(SequenceCounter)
+    key = (using, prefix, year)
+    numbers = []
+
+    with _leases_lock:
+        next_value, last_value = _leases.pop(key, (1, 0))
+        while len(numbers) < count:
+            if next_value > last_value:
+                size = max(settings.SEQUENCE_BLOCK_SIZE, count - len(numbers))
+                next_value, last_value = reserve_sequence_block(
+                    prefix, year, size, using=using
+                )
+            take = min(count - len(numbers), last_value - next_value + 1)
+            numbers.extend(range(next_value, next_value + take))
+            next_value += take
+
+        # a reservation made inside a transaction only holds once it commits
+        lease = (next_value, last_value)
+        transaction.on_commit(lambda: _store_lease(key, lease), using=using)
+
+    return numbers
+
+
+def _store_lease(key, lease):
+    next_value, last_value = lease
+    if next_value <= last_value:
+        with _leases_lock:
+            _leases[key] = lease
+
+
+def reset_sequence_leases():
+    """Forgets the blocks leased by this process, e.g. after a database reset"""
+    with _leases_lock:
+        _leases.clear()
+
+
+def next_vendor_code(vendor_name):
+    year = timezone.datetime.now().year
+    (number,) = allocate_sequence_numbers(VENDOR_CODE_PREFIX, year, 1)
+    return generate_vendor_code(vendor_name, number, year=year)
+
+
+def next_po_numbers(count):
+    year = timezone.datetime.now().year
+    return [
+        generate_po_number(number, year=year)
+        for number in allocate_sequence_numbers(PO_NUMBER_PREFIX, year, count)
+    ]
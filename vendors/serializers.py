@@ -1,13 +1,18 @@
 from rest_framework import serializers
-from vendors.models import Vendor, PurchaseOrder
+from vendors.filters import SparseFieldsetMixin
+from vendors.instrumentation import InstrumentedSerializerMixin
+from vendors.models import Vendor, PurchaseOrder, VendorRanking
 
-from vendors.services import generate_vendor_code, generate_po_number
+from vendors.sequences import next_vendor_code, next_po_numbers
+from vendors.services import VENDOR_COUNTER_FIELDS
 
 
-class VendorSerializer(serializers.ModelSerializer):
+class VendorSerializer(
+    SparseFieldsetMixin, InstrumentedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Vendor
-        fields = "__all__"
+        exclude = VENDOR_COUNTER_FIELDS
         read_only_fields = [
             "vendor_code",
             "on_time_delivery_rate",
@@ -17,16 +22,16 @@ class VendorSerializer(serializers.ModelSerializer):
         ]
 
     def create(self, validated_data):
-        recent_vendor = Vendor.objects.order_by("-id").first()
-        recent_vendor_code = recent_vendor.id if recent_vendor else 0
         name = validated_data.get("name")
-        vendor_code = generate_vendor_code(name, recent_vendor_code)
+        vendor_code = next_vendor_code(name)
 
         vendor = Vendor.objects.create(**validated_data, vendor_code=vendor_code)
         return vendor
 
 
-class CreatePurchaseOrderSerializer(serializers.ModelSerializer):
+class CreatePurchaseOrderSerializer(
+    SparseFieldsetMixin, InstrumentedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = PurchaseOrder
         fields = "__all__"
@@ -36,12 +41,12 @@ class CreatePurchaseOrderSerializer(serializers.ModelSerializer):
             "status",
             "quality_rating",
             "acknowledgment_date",
+            "completed_at",
+            "is_on_time",
         ]
 
     def create(self, validated_data):
-        recent_po = PurchaseOrder.objects.order_by("-id").first()
-        recent_po_id = recent_po.id if recent_po else 0
-        po_number = generate_po_number(recent_po_id)
+        (po_number,) = next_po_numbers(1)
 
         vendor = PurchaseOrder.objects.create(
             **validated_data,
@@ -53,7 +58,89 @@ class CreatePurchaseOrderSerializer(serializers.ModelSerializer):
         return vendor
 
 
-class EditPurchaseOrderSerializer(serializers.ModelSerializer):
+class BulkCreatePurchaseOrderSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
+    """Validates one row of a bulk purchase order ingest, vendors are checked
+    against the ``vendor_ids`` loaded once for the whole batch"""
+
+    vendor = serializers.IntegerField(source="vendor_id")
+
+    class Meta:
+        model = PurchaseOrder
+        fields = ["vendor", "order_date", "items", "quantity"]
+
+    def validate_vendor(self, value):
+        if value not in self.context["vendor_ids"]:
+            raise serializers.ValidationError(
+                f'Invalid pk "{value}" - object does not exist.'
+            )
+        return value
+
+
+class BulkUpdatePurchaseOrderSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
+    """Validates one row of a bulk purchase order update, used with
+    ``partial=True`` and checked against the ``purchase_orders`` loaded once for
+    the whole batch"""
+
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = PurchaseOrder
+        fields = ["id", "status", "quality_rating", "delivery_date"]
+
+    def validate_id(self, value):
+        if value not in self.context["purchase_orders"]:
+            raise serializers.ValidationError(
+                f'Invalid pk "{value}" - object does not exist.'
+            )
+        return value
+
+    def validate(self, attrs):
+        if "id" not in attrs:
+            raise serializers.ValidationError({"id": "This field is required."})
+        if len(attrs) == 1:
+            raise serializers.ValidationError(
+                "Expected at least one of status, quality_rating or delivery_date."
+            )
+        return attrs
+
+
+class BulkAcknowledgePurchaseOrderSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
+    """Validates one row of a bulk acknowledgment, the acknowledgment date
+    defaults to the time of the request"""
+
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = PurchaseOrder
+        fields = ["id", "acknowledgment_date"]
+        extra_kwargs = {"acknowledgment_date": {"required": False}}
+
+    def validate_id(self, value):
+        if value not in self.context["purchase_orders"]:
+            raise serializers.ValidationError(
+                f'Invalid pk "{value}" - object does not exist.'
+            )
+        return value
+
+    def validate(self, attrs):
+        purchase_order = self.context["purchase_orders"][attrs["id"]]
+        acknowledgment_date = attrs.get("acknowledgment_date")
+        if acknowledgment_date and acknowledgment_date < purchase_order.issue_date:
+            raise serializers.ValidationError(
+                {"acknowledgment_date": "Must not be before the issue date."}
+            )
+        return attrs
+
+
+class EditPurchaseOrderSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = PurchaseOrder
         fields = "__all__"
@@ -62,10 +149,23 @@ class EditPurchaseOrderSerializer(serializers.ModelSerializer):
             "order_date",
             "issue_date",
             "acknowledgment_date",
+            "completed_at",
+            "is_on_time",
         ]
 
 
-class VendorPOAcknowledgmentSerializer(serializers.ModelSerializer):
+class VendorPOAcknowledgmentSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = PurchaseOrder
         fields = ["acknowledgment_date"]
+
+
+class VendorRankingSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
+    name = serializers.CharField(source="vendor.name")
+    vendor_code = serializers.CharField(source="vendor.vendor_code")
+
+    class Meta:
+        model = VendorRanking
+        exclude = ["id"]
@@ -1,3 +1,4 @@
+from django.apps import apps
 from django.utils import timezone
 from django.db.models import (
     fields,
@@ -10,18 +11,43 @@ from django.db.models import (
     Q,
     When,
     FloatField,
+    Model,
 )
+from django.db.models.functions import Coalesce
 from vendors.constants import PO_STATUS
 
+VENDOR_COUNTER_FIELDS = (
+    "issued_orders_count",
+    "completed_orders_count",
+    "on_time_orders_count",
+    "quality_rating_sum",
+    "response_time_sum",
+    "response_time_count",
+)
+
+VENDOR_METRIC_FIELDS = (
+    "on_time_delivery_rate",
+    "quality_rating_avg",
+    "average_response_time",
+    "fullfilment_rate",
+)
+
+PERFORMANCE_LOG_METRICS = (
+    "on_time_delivery_rate",
+    "quality_rating_avg",
+    "average_response_time",
+    "fulfillment_rate",
+)
+
 
 def calculate_on_time_delivery_rating_avg_old(vendor):
     orders = vendor.purchaseorder_set.filter(status=PO_STATUS.completed).values_list(
-        "delivery_date", flat=True
+        "delivery_date", "completed_at"
     )
     total_orders = len(orders)
     on_time_count = 0
-    for delivery_date in orders:
-        if delivery_date and (timezone.now() <= delivery_date):
+    for delivery_date, completed_at in orders:
+        if delivery_date and completed_at and completed_at <= delivery_date:
             on_time_count += 1
 
     on_time_delivery_rating = (on_time_count / total_orders) * 100
@@ -32,18 +58,8 @@ def calculate_on_time_delivery_rating_avg(vendor):
     """Performance optimized version of calculate_on_time_delivery_rating_avg_old"""
     completed_orders = vendor.purchaseorder_set.filter(status=PO_STATUS.completed)
 
-    completed_orders = completed_orders.annotate(
-        is_on_time=Case(
-            When(
-                delivery_date__isnull=False, delivery_date__gte=timezone.now(), then=1
-            ),
-            default=0,
-            output_field=fields.IntegerField(),
-        )
-    )
-
     on_time_delivery_count = completed_orders.aggregate(
-        on_time_delivery_count=Count("id", filter=Q(is_on_time=1)),
+        on_time_delivery_count=Count("id", filter=Q(is_on_time=True)),
         total_completed_orders=Count("id"),
     )
 
@@ -76,7 +92,10 @@ def calculate_quality_rating_avg(vendor):
     completed_orders = vendor.purchaseorder_set.filter(status=PO_STATUS.completed)
 
     quality_rating_avg = completed_orders.aggregate(
-        avg_quality_rating=Avg("quality_rating", output_field=FloatField()),
+        # unrated orders count as 0 like in calculate_quality_rating_avg_old
+        avg_quality_rating=Avg(
+            Coalesce("quality_rating", 0.0, output_field=FloatField())
+        ),
         total_orders=Count("id"),
     )
 
@@ -113,13 +132,19 @@ def calculate_response_time(vendor):
         F("acknowledgment_date") - F("issue_date"), output_field=fields.DurationField()
     )
 
-    average_response_time = completed_orders.annotate(
+    response_times = completed_orders.annotate(
         response_time=response_time_expression
-    ).aggregate(avg_response_time=Sum("response_time") / Count("response_time"))[
-        "avg_response_time"
-    ]
+    ).aggregate(
+        total_response_time=Sum("response_time"),
+        response_time_count=Count("response_time"),
+    )
 
-    return average_response_time.total_seconds() if average_response_time else 0
+    response_time_count = response_times["response_time_count"]
+    if response_time_count:
+        total_response_time = response_times["total_response_time"]
+        return total_response_time.total_seconds() / response_time_count
+
+    return 0
 
 
 def calculate_fullfilment_rate_old(vendor):
@@ -141,35 +166,242 @@ def calculate_fullfilment_rate_old(vendor):
 def calculate_fullfilment_rate(vendor):
     """Performance optimized version of calculate_fullfilment_rate_old"""
 
-    orders = vendor.purchaseorder_set.values("issue_date").annotate(
+    orders = vendor.purchaseorder_set.aggregate(
         total_orders=Count("issue_date"),
-        completed_orders=Count("status", filter=Q(status=PO_STATUS.completed)),
+        completed_orders=Count("id", filter=Q(status=PO_STATUS.completed)),
     )
 
-    if orders:
-        total_orders_count = orders[0]["total_orders"]
-        completed_orders_count = orders[0]["completed_orders"]
-
-        if completed_orders_count:
-            return total_orders_count / completed_orders_count
+    if orders["completed_orders"]:
+        return orders["total_orders"] / orders["completed_orders"]
 
     return 0
 
 
-def generate_vendor_code(vendor_name, recent_vendor_id):
-    vendor_prefix = "VE"
-    current_year = timezone.datetime.now().year
+def is_delivered_on_time(completed_at, delivery_date):
+    """On-time classification of a purchase order, fixed once it is completed"""
+    return bool(completed_at and delivery_date and completed_at <= delivery_date)
+
+
+def purchase_order_counters(
+    status, is_on_time, quality_rating, issue_date, acknowledgment_date
+):
+    """Contribution of a single purchase order to its vendor's running counters"""
+    counters = dict.fromkeys(VENDOR_COUNTER_FIELDS, 0)
+    if issue_date:
+        counters["issued_orders_count"] = 1
+
+    if status == PO_STATUS.completed:
+        counters["completed_orders_count"] = 1
+        counters["quality_rating_sum"] = quality_rating or 0
+        if is_on_time:
+            counters["on_time_orders_count"] = 1
+        if issue_date and acknowledgment_date:
+            counters["response_time_sum"] = (
+                acknowledgment_date - issue_date
+            ).total_seconds()
+            counters["response_time_count"] = 1
+
+    return counters
+
+
+def apply_counters_delta(vendor, before=None, after=None):
+    """Moves the vendor's running counters from the ``before`` to the ``after``
+    contribution of a purchase order, either side may be None"""
+    for field in VENDOR_COUNTER_FIELDS:
+        delta = (after[field] if after else 0) - (before[field] if before else 0)
+        if delta:
+            setattr(vendor, field, getattr(vendor, field) + delta)
+
+
+def vendor_scorecard_aggregates():
+    """Conditional aggregates turning a purchase order queryset into the
+    running counters of its vendor(s)"""
+    completed = Q(status=PO_STATUS.completed)
+    acknowledged = completed & Q(
+        issue_date__isnull=False, acknowledgment_date__isnull=False
+    )
+    response_time_expression = ExpressionWrapper(
+        F("acknowledgment_date") - F("issue_date"), output_field=fields.DurationField()
+    )
+
+    return {
+        "issued_orders_count": Count("id", filter=Q(issue_date__isnull=False)),
+        "completed_orders_count": Count("id", filter=completed),
+        "on_time_orders_count": Count("id", filter=completed & Q(is_on_time=True)),
+        "quality_rating_sum": Sum(
+            Coalesce("quality_rating", 0.0, output_field=FloatField()),
+            filter=completed,
+        ),
+        "response_time_sum": Sum(response_time_expression, filter=acknowledged),
+        "response_time_count": Count("id", filter=acknowledged),
+    }
+
+
+def calculate_metrics_from_counters(counters):
+    """O(1) equivalent of the calculate_* aggregates, based on the running counters"""
+    completed_orders_count = counters["completed_orders_count"]
+
+    if completed_orders_count:
+        on_time_delivery_rate = (
+            counters["on_time_orders_count"] / completed_orders_count
+        ) * 100
+        quality_rating_avg = counters["quality_rating_sum"] / completed_orders_count
+        fullfilment_rate = counters["issued_orders_count"] / completed_orders_count
+    else:
+        on_time_delivery_rate = quality_rating_avg = fullfilment_rate = 0
+
+    average_response_time = (
+        counters["response_time_sum"] / counters["response_time_count"]
+        if counters["response_time_count"]
+        else 0
+    )
+
+    return {
+        "on_time_delivery_rate": on_time_delivery_rate,
+        "quality_rating_avg": quality_rating_avg,
+        "average_response_time": average_response_time,
+        "fullfilment_rate": fullfilment_rate,
+    }
+
+
+def _scorecard(counters):
+    scorecard = dict.fromkeys(VENDOR_COUNTER_FIELDS, 0)
+    scorecard.update(
+        (field, counters[field] or 0)
+        for field in VENDOR_COUNTER_FIELDS
+        if field in counters
+    )
+    if isinstance(scorecard["response_time_sum"], timezone.timedelta):
+        scorecard["response_time_sum"] = scorecard["response_time_sum"].total_seconds()
+
+    scorecard.update(calculate_metrics_from_counters(scorecard))
+    return scorecard
+
+
+def compute_vendor_scorecard(vendor_or_ids):
+    """All four vendor metrics, and the counters behind them, from one query.
+
+    Given a vendor (or a vendor id) returns its scorecard, given an iterable of
+    vendor ids returns a ``{vendor_id: scorecard}`` mapping computed
+    with a single GROUP BY vendor_id"""
+    PurchaseOrder = apps.get_model("vendors", "PurchaseOrder")
+
+    if isinstance(vendor_or_ids, (int, Model)):
+        vendor_id = getattr(vendor_or_ids, "pk", vendor_or_ids)
+        return _scorecard(
+            PurchaseOrder.objects.filter(vendor_id=vendor_id).aggregate(
+                **vendor_scorecard_aggregates()
+            )
+        )
+
+    vendor_ids = list(vendor_or_ids)
+    scorecards = {
+        row["vendor_id"]: _scorecard(row)
+        for row in PurchaseOrder.objects.filter(vendor_id__in=vendor_ids)
+        .order_by()
+        .values("vendor_id")
+        .annotate(**vendor_scorecard_aggregates())
+    }
+    return {
+        vendor_id: scorecards.get(vendor_id) or _scorecard({})
+        for vendor_id in vendor_ids
+    }
+
+
+# metric: (True when higher values rank first, counter that must be non-zero
+# for the metric to be meaningful). The fulfilment rate is issued / completed
+# orders, so 1.0 is the best possible value
+RANKING_METRICS = {
+    "on_time_delivery_rate": (True, "completed_orders_count"),
+    "quality_rating_avg": (True, "completed_orders_count"),
+    "average_response_time": (False, "response_time_count"),
+    "fullfilment_rate": (False, "completed_orders_count"),
+}
+
+
+def competition_ranks(values, descending=True):
+    """1-based ranks of a ``{key: value}`` mapping, equal values share a rank
+    (1, 2, 2, 4) and None ranks last"""
+    ordered = sorted(
+        values.items(),
+        key=lambda item: (
+            item[1] is None,
+            0 if item[1] is None else (-item[1] if descending else item[1]),
+        ),
+    )
+    ranks = {}
+    previous = object()
+    for position, (key, value) in enumerate(ordered, start=1):
+        if value != previous:
+            rank = position
+            previous = value
+        ranks[key] = rank
+    return ranks
+
+
+def rank_vendors(metrics, weights):
+    """Per-metric ranks and the weighted composite score of every vendor.
+
+    ``metrics`` maps vendor ids to their RANKING_METRICS values, None where the
+    vendor has no data yet. Each metric adds its weight times the vendor's
+    relative position on it (1 for the first, 0 for the last), so the score is
+    on a 0-100 scale whatever the units of the metrics. A vendor without data
+    for a metric gets no credit for it"""
+    count = len(metrics)
+    total_weight = sum(weights.get(metric, 0) for metric in RANKING_METRICS) or 1
+    rankings = {vendor_id: {"score": 0.0} for vendor_id in metrics}
+
+    for metric, (descending, _) in RANKING_METRICS.items():
+        ranks = competition_ranks(
+            {vendor_id: values[metric] for vendor_id, values in metrics.items()},
+            descending=descending,
+        )
+        for vendor_id, rank in ranks.items():
+            if metrics[vendor_id][metric] is None:
+                position = 0.0
+            elif count > 1:
+                position = (count - rank) / (count - 1)
+            else:
+                position = 1.0
+            rankings[vendor_id][f"{metric}_rank"] = rank
+            rankings[vendor_id]["score"] += (
+                100 * weights.get(metric, 0) * position / total_weight
+            )
+
+    for ranking in rankings.values():
+        # float noise must not split vendors with the same positions
+        ranking["score"] = round(ranking["score"], 6)
+    score_ranks = competition_ranks(
+        {vendor_id: ranking["score"] for vendor_id, ranking in rankings.items()}
+    )
+    for vendor_id, rank in score_ranks.items():
+        rankings[vendor_id]["score_rank"] = rank
+    return rankings
+
+
+VENDOR_CODE_PREFIX = "VE"
+PO_NUMBER_PREFIX = "PO"
+
+
+def generate_vendor_code(vendor_name, sequence_number, year=None):
+    vendor_prefix = VENDOR_CODE_PREFIX
+    current_year = year or timezone.datetime.now().year
     first_letter = vendor_name[0].upper()
-    vendor_id = recent_vendor_id + 1
     digit = 5
     return (
-        f"{vendor_prefix}-{current_year}-{first_letter}-{str(vendor_id).zfill(digit)}"
+        f"{vendor_prefix}-{current_year}-{first_letter}-"
+        f"{str(sequence_number).zfill(digit)}"
     )
 
 
-def generate_po_number(recent_po_id):
-    po_prefix = "PO"
-    current_year = timezone.datetime.now().year
-    po_id = recent_po_id + 1
+def generate_po_number(sequence_number, year=None):
+    po_prefix = PO_NUMBER_PREFIX
+    current_year = year or timezone.datetime.now().year
     digit = 6
-    return f"{po_prefix}-{current_year}-{str(po_id).zfill(digit)}"
+    return f"{po_prefix}-{current_year}-{str(sequence_number).zfill(digit)}"
+
+
+def parse_sequence_number(code):
+    """Numeric suffix of a generated vendor code or po number"""
+    suffix = code.rsplit("-", 1)[-1]
+    return int(suffix) if suffix.isdigit() else 0
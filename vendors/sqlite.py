@@ -0,0 +1,69 @@
+"""Connection setup of the SQLite databases.
+
+A database alias may carry a ``PRAGMAS`` mapping next to its other settings,
+filled by the ``DATABASE_PROFILE`` of the settings. Each pragma is applied to
+every new connection of that alias, on the raw ``sqlite3`` connection like the
+ones Django issues itself, so they are never counted as queries of a request.
+
+The "production" profile switches the file to write-ahead logging, where
+readers no longer block on a writer and commits only sync at checkpoints
+(``synchronous=NORMAL``). It also waits on a locked database instead of
+failing at once, and gives each connection a larger page cache and a memory
+map of the file. Those only pay off on connections that outlive a request, so
+the profile also keeps them open (``CONN_MAX_AGE``) behind health checks.
+
+``TRANSACTION_MODE`` sets how ``atomic`` blocks begin. SQLite's default
+deferred ``BEGIN`` takes the write lock at the first write, and a transaction
+that read first then fails with "database is locked" when another one wrote
+meanwhile, whatever the busy timeout. ``IMMEDIATE`` takes it upfront so
+concurrent writers queue on the busy timeout instead.
+"""
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(connection, pragmas):
+    """Runs ``PRAGMA name = value`` for each pragma on a Django connection,
+    returns the values SQLite reports back"""
+    applied = {}
+    for name, value in pragmas.items():
+        row = connection.connection.execute(f"PRAGMA {name} = {value}").fetchone()
+        applied[name] = row[0] if row else value
+    return applied
+
+
+def read_pragmas(connection, names):
+    """Current value of each pragma on a Django connection"""
+    connection.ensure_connection()
+    return {
+        name: connection.connection.execute(f"PRAGMA {name}").fetchone()[0]
+        for name in names
+    }
+
+
+def transaction_mode_wrapper(mode):
+    """Execute wrapper beginning the transactions of ``atomic`` in ``mode``"""
+    begin = f"BEGIN {mode}"
+
+    def wrapper(execute, sql, params, many, context):
+        return execute(begin if sql == "BEGIN" else sql, params, many, context)
+
+    wrapper.mode = mode
+    return wrapper
+
+
+@receiver(connection_created)
+def _configure_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+
+    pragmas = connection.settings_dict.get("PRAGMAS")
+    if pragmas:
+        apply_pragmas(connection, pragmas)
+
+    mode = connection.settings_dict.get("TRANSACTION_MODE")
+    if mode and not any(
+        getattr(wrapper, "mode", None) for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(transaction_mode_wrapper(mode))
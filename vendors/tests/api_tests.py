@@ -1,10 +1,31 @@
+import csv
+import gzip
+import io
 import json
 
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
-from vendors.models import Vendor, PurchaseOrder
+from vendors.models import (
+    Vendor,
+    PurchaseOrder,
+    VendorPerformanceLog,
+    VendorRanking,
+    record_performance_rollup,
+)
 from django.utils import timezone
 from django.contrib.auth.models import User
+from vendors.async_apis import (
+    AsyncVendorPerformanceAPI,
+    AsyncVendorPerformanceTrendAPI,
+)
+from vendors.cache import cache_stats
+from vendors.rankings import ensure_vendor_rankings, refresh_vendor_rankings
 
 def vendor_data():
     return {
@@ -345,4 +366,877 @@ class TestVendorPerformanceTrendAPI(APITestCase):
         self.client.force_login(self.user)
         response = self.client.get(url)
         assert response.status_code == 200
-        assert len(response.json()['performance_logs']) == 0
\ No newline at end of file
+        assert len(response.json()['performance_logs']) == 0
+
+class TestPurchaseOrderBulkCreateAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.url = reverse("vendors:po_bulk_api")
+        self.vendor = create_vendor()
+
+    def row(self, **kwargs):
+        return {
+            "vendor": self.vendor.id,
+            "order_date": timezone.now().isoformat(),
+            "items": ["leather strap"],
+            "quantity": 10,
+            **kwargs,
+        }
+
+    def test_creates_all_rows_when_valid_json_array(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            self.url, [self.row(), self.row(quantity=5)], format="json"
+        )
+        data = response.json()
+
+        assert response.status_code == 201
+        assert data["created"] == 2
+        assert PurchaseOrder.objects.count() == 2
+        po_numbers = [result["po_number"] for result in data["results"]]
+        assert len(set(po_numbers)) == 2
+
+        self.vendor.refresh_from_db()
+        assert self.vendor.issued_orders_count == 2
+
+    def test_reports_failed_rows_when_partially_valid(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            self.url, [self.row(), self.row(vendor=999), {}], format="json"
+        )
+        data = response.json()
+
+        assert response.status_code == 207
+        assert data["created"] == 1
+        assert data["failed"] == 2
+        assert data["results"][0]["status"] == "created"
+        assert "vendor" in data["results"][1]["errors"]
+        assert data["results"][2]["status"] == "error"
+        assert PurchaseOrder.objects.count() == 1
+
+    def test_creates_rows_when_ndjson_stream(self):
+        body = "\n".join(json.dumps(self.row()) for _ in range(3))
+        self.client.force_login(self.user)
+        response = self.client.post(
+            self.url, body, content_type="application/x-ndjson"
+        )
+
+        assert response.status_code == 201
+        assert PurchaseOrder.objects.count() == 3
+
+    def test_raises_400_when_not_a_list(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, self.row(), format="json")
+        assert response.status_code == 400
+
+
+class TestKeysetPagination(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.url = reverse("vendors:vendor_list_create_api")
+        for index in range(5):
+            Vendor.objects.create(**vendor_data(), vendor_code=f"VE-{index}")
+
+    def test_returns_cursor_page_without_count_when_requested(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {"pagination": "cursor", "page_size": 2})
+        data = response.json()
+
+        assert response.status_code == 200
+        assert "count" not in data
+        assert data["previous"] is None
+        assert [vendor["vendor_code"] for vendor in data["results"]] == ["VE-0", "VE-1"]
+
+    def test_follows_next_cursor_until_last_page(self):
+        self.client.force_login(self.user)
+        url = f"{self.url}?pagination=cursor&page_size=2"
+        codes = []
+        while url:
+            data = self.client.get(url).json()
+            codes.extend(vendor["vendor_code"] for vendor in data["results"])
+            url = data["next"]
+
+        assert codes == [f"VE-{index}" for index in range(5)]
+
+    def test_caps_page_size_to_configured_maximum(self):
+        self.client.force_login(self.user)
+        with self.settings(API_MAX_PAGE_SIZE=100):
+            response = self.client.get(self.url, {"page_size": 1000})
+
+        assert response.status_code == 200
+        assert response.json()["count"] == 5
+        assert len(response.json()["results"]) == 5
+
+    def test_paginates_performance_logs_by_date(self):
+        vendor = Vendor.objects.first()
+        for days in (3, 1, 2):
+            VendorPerformanceLog.objects.create(
+                vendor=vendor,
+                date=timezone.now() - timezone.timedelta(days=days),
+                on_time_delivery_rate=days,
+                quality_rating_avg=0,
+                average_response_time=0,
+                fulfillment_rate=0,
+            )
+        url = reverse(
+            "vendors:vendor_performance_log_api", kwargs={"vendor_id": vendor.id}
+        )
+
+        self.client.force_login(self.user)
+        data = self.client.get(url, {"page_size": 2}).json()
+        assert [log["on_time_delivery_rate"] for log in data["performance_logs"]] == [3, 2]
+
+        data = self.client.get(data["next"]).json()
+        assert [log["on_time_delivery_rate"] for log in data["performance_logs"]] == [1]
+        assert data["next"] is None
+
+
+class TestVendorPerformanceTrendBucketsAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.vendor = create_vendor()
+        self.url = reverse(
+            "vendors:vendor_performance_log_api", kwargs={"vendor_id": self.vendor.id}
+        )
+        day = timezone.make_aware(timezone.datetime(2024, 4, 1, 10))
+        for hours, rate in ((0, 50.0), (0.5, 70.0), (1, 60.0), (24, 90.0)):
+            log = VendorPerformanceLog.objects.create(
+                vendor=self.vendor,
+                date=day + timezone.timedelta(hours=hours),
+                on_time_delivery_rate=rate,
+                quality_rating_avg=4.0,
+                average_response_time=10.0,
+                fulfillment_rate=1.0,
+            )
+            record_performance_rollup(log)
+
+    def test_aggregates_raw_logs_per_hour(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {"bucket": "hour"})
+        buckets = response.json()["performance_buckets"]
+
+        assert response.status_code == 200
+        assert [bucket["count"] for bucket in buckets] == [2, 1, 1]
+        assert buckets[0]["on_time_delivery_rate"] == {
+            "avg": 60.0, "min": 50.0, "max": 70.0, "last": 70.0
+        }
+
+    def test_aggregates_rollups_per_day_within_range(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            self.url, {"bucket": "day", "from": "2024-04-01", "to": "2024-04-01"}
+        )
+        buckets = response.json()["performance_buckets"]
+
+        assert response.status_code == 200
+        assert len(buckets) == 1
+        assert buckets[0]["start"] == "2024-04-01"
+        assert buckets[0]["count"] == 3
+        assert buckets[0]["on_time_delivery_rate"] == {
+            "avg": 60.0, "min": 50.0, "max": 70.0, "last": 60.0
+        }
+
+    def test_aggregates_rollups_per_month(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {"bucket": "month"})
+        buckets = response.json()["performance_buckets"]
+
+        assert len(buckets) == 1
+        assert buckets[0]["count"] == 4
+        assert buckets[0]["on_time_delivery_rate"]["last"] == 90.0
+        assert buckets[0]["on_time_delivery_rate"]["max"] == 90.0
+
+    def test_filters_raw_logs_by_range_without_bucket(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {"from": "2024-04-02"})
+        assert len(response.json()["performance_logs"]) == 1
+
+    def test_raises_400_when_invalid_bucket_or_date(self):
+        self.client.force_login(self.user)
+        assert self.client.get(self.url, {"bucket": "year"}).status_code == 400
+        assert self.client.get(self.url, {"from": "yesterday"}).status_code == 400
+
+
+class TestVendorPerformanceAPI(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.vendor = create_vendor()
+        self.url = reverse(
+            "vendors:vendor_performance_api", kwargs={"vendor_id": self.vendor.id}
+        )
+
+    def test_raises_404_when_invalid_vendor_id(self):
+        url = reverse("vendors:vendor_performance_api", kwargs={"vendor_id": 999})
+        self.client.force_login(self.user)
+        assert self.client.get(url).status_code == 404
+
+    def test_serves_cached_performance_on_repeated_get(self):
+        self.client.force_login(self.user)
+        stats = cache_stats()
+        first = self.client.get(self.url)
+        with self.assertNumQueries(2):  # session and user lookups only
+            second = self.client.get(self.url)
+
+        assert first.json() == second.json()
+        assert first.json()["name"] == "ABC Traders"
+        assert cache_stats()["hits"] == stats["hits"] + 1
+        assert cache_stats()["misses"] == stats["misses"] + 1
+
+    def test_returns_304_when_etag_matches(self):
+        self.client.force_login(self.user)
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_returns_304_when_not_modified_since(self):
+        self.client.force_login(self.user)
+        last_modified = self.client.get(self.url)["Last-Modified"]
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+    def test_refreshes_when_purchase_order_completed(self):
+        po = PurchaseOrder.objects.create(
+            vendor=self.vendor,
+            po_number="PO-2024-000001",
+            order_date=timezone.now(),
+            items=json.dumps(["leather strap"]),
+            quantity=100,
+        )
+        self.client.force_login(self.user)
+        etag = self.client.get(self.url)["ETag"]
+
+        po = PurchaseOrder.objects.get(pk=po.pk)
+        po.status = "completed"
+        po.quality_rating = 4.0
+        po.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()["quality_rating_avg"] == 4.0
+
+    def test_refreshes_when_vendor_updated(self):
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+        self.client.put(
+            reverse(
+                "vendors:vendor_retrieve_update_destroy_api",
+                kwargs={"vendor_id": self.vendor.id},
+            ),
+            data={**vendor_data(), "name": "New Traders"},
+        )
+
+        assert self.client.get(self.url).json()["name"] == "New Traders"
+
+
+class TestConditionalGetAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.po = create_purchase_order()
+        self.client.force_login(self.user)
+
+    def test_returns_304_when_vendor_etag_matches(self):
+        url = reverse(
+            "vendors:vendor_retrieve_update_destroy_api",
+            kwargs={"vendor_id": self.po.vendor_id},
+        )
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        self.client.put(url, data={**vendor_data(), "name": "New Traders"})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+
+    def test_vendor_etag_differs_per_field_selection(self):
+        url = reverse(
+            "vendors:vendor_retrieve_update_destroy_api",
+            kwargs={"vendor_id": self.po.vendor_id},
+        )
+        sparse = self.client.get(url, {"fields": "id,name"})
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=sparse["ETag"])
+        assert response.status_code == 200
+        assert "address" in response.data
+        assert response["ETag"] != sparse["ETag"]
+        assert self.client.get(
+            url, {"fields": "id,name"}, HTTP_IF_NONE_MATCH=sparse["ETag"]
+        ).status_code == 304
+
+    def test_returns_304_when_purchase_order_etag_matches(self):
+        url = reverse("vendors:po_retrieve_update_destroy_api", kwargs={"po_id": self.po.id})
+        response = self.client.get(url)
+        assert "Last-Modified" in response
+
+        with self.assertNumQueries(3):  # session, user and the order itself
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == 304
+
+    def test_returns_304_when_list_unchanged(self):
+        url = reverse("vendors:po_list_create_api")
+        etag = self.client.get(url)["ETag"]
+
+        assert self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert self.client.get(url, {"page_size": 5}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+        PurchaseOrder.objects.create(
+            vendor=self.po.vendor,
+            po_number="PO-2024-000002",
+            order_date=timezone.now(),
+            items=json.dumps(["belt"]),
+            quantity=1,
+        )
+        assert self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_returns_304_when_performance_logs_unchanged(self):
+        url = reverse(
+            "vendors:vendor_performance_log_api", kwargs={"vendor_id": self.po.vendor_id}
+        )
+        etag = self.client.get(url)["ETag"]
+        assert self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        po = PurchaseOrder.objects.get(pk=self.po.pk)
+        po.status = "completed"
+        po.save()
+        assert self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+class TestExportAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.client.force_login(self.user)
+        self.vendor = create_vendor()
+        self.other_vendor = Vendor.objects.create(
+            name="XYZ Traders", contact_details="", address="", vendor_code="VE-XYZ"
+        )
+        for index in range(3):
+            PurchaseOrder.objects.create(
+                vendor=self.vendor if index < 2 else self.other_vendor,
+                po_number=f"PO-2024-00000{index}",
+                order_date=timezone.now(),
+                items=["leather strap", "buckle"],
+                quantity=index + 1,
+                status="completed" if index == 0 else "pending",
+            )
+
+    def export(self, export_format="csv", name="po_export_api", **headers):
+        url = reverse(f"vendors:{name}", kwargs={"export_format": export_format})
+        return lambda **params: self.client.get(url, params, **headers)
+
+    def test_streams_purchase_orders_as_csv(self):
+        response = self.export()()
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"].startswith("text/csv")
+        assert 'filename="purchase_orders.csv"' in response["Content-Disposition"]
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        assert rows[0][:3] == ["id", "po_number", "vendor_id"]
+        assert len(rows) == 4
+        assert json.loads(rows[1][5]) == ["leather strap", "buckle"]
+
+    def test_filters_purchase_orders_by_vendor_and_status(self):
+        response = self.export("ndjson")(vendor=self.vendor.id, status="pending")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        orders = [json.loads(line) for line in lines]
+        assert [order["po_number"] for order in orders] == ["PO-2024-000001"]
+        assert orders[0]["vendor_id"] == self.vendor.id
+
+    def test_filters_purchase_orders_by_order_date(self):
+        tomorrow = (timezone.localdate() + timezone.timedelta(days=1)).isoformat()
+
+        response = self.export("ndjson")(**{"from": tomorrow})
+
+        assert b"".join(response.streaming_content) == b""
+
+    def test_gzips_when_client_accepts_it(self):
+        response = self.export("ndjson", HTTP_ACCEPT_ENCODING="br, gzip")()
+
+        assert response["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response["Vary"]
+        body = gzip.decompress(b"".join(response.streaming_content)).decode()
+        assert len(body.splitlines()) == 3
+
+    def test_does_not_gzip_when_refused(self):
+        response = self.export("ndjson", HTTP_ACCEPT_ENCODING="gzip;q=0")()
+
+        assert not response.has_header("Content-Encoding")
+
+    def test_streams_performance_logs(self):
+        VendorPerformanceLog.objects.create(
+            vendor=self.vendor,
+            date=timezone.now(),
+            on_time_delivery_rate=50,
+            quality_rating_avg=4,
+            average_response_time=60,
+            fulfillment_rate=1,
+        )
+
+        response = self.export("ndjson", name="performance_log_export_api")(
+            vendor=self.vendor.id
+        )
+
+        (log,) = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        assert log["vendor_id"] == self.vendor.id
+        assert log["on_time_delivery_rate"] == 50
+
+    def test_returns_400_when_invalid_filters(self):
+        assert self.export()(status="shipped").status_code == 400
+        assert self.export()(vendor="abc").status_code == 400
+        assert self.export()(to="yesterday").status_code == 400
+
+    def test_returns_404_when_unknown_format(self):
+        assert self.export("xml")().status_code == 404
+
+    def test_returns_403_when_anonymous(self):
+        self.client.logout()
+
+        assert self.export()().status_code == 403
+
+
+class TestPurchaseOrderBulkUpdateAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.client.force_login(self.user)
+        self.url = reverse("vendors:po_bulk_api")
+        self.vendors = [
+            Vendor.objects.create(
+                name=code, contact_details="", address="", vendor_code=code
+            )
+            for code in ("VE-A", "VE-B")
+        ]
+        self.pos = [
+            PurchaseOrder.objects.create(
+                vendor=self.vendors[index % 2],
+                po_number=f"PO-2024-{index:06}",
+                order_date=timezone.now(),
+                items=["leather strap"],
+                quantity=1,
+            )
+            for index in range(6)
+        ]
+
+    def complete_rows(self, pos):
+        delivery_date = (timezone.now() + timezone.timedelta(days=1)).isoformat()
+        return [
+            {
+                "id": po.id,
+                "status": "completed",
+                "quality_rating": 4,
+                "delivery_date": delivery_date,
+            }
+            for po in pos
+        ]
+
+    def test_updates_all_rows_and_logs_once_per_vendor(self):
+        response = self.client.patch(self.url, self.complete_rows(self.pos), format="json")
+
+        assert response.status_code == 200
+        assert response.data["updated"] == 6
+        for po in PurchaseOrder.objects.all():
+            assert po.status == "completed"
+            assert po.completed_at is not None
+            assert po.is_on_time
+        for vendor in self.vendors:
+            vendor.refresh_from_db()
+            assert vendor.completed_orders_count == 3
+            assert vendor.on_time_delivery_rate == 100
+            assert vendor.quality_rating_avg == 4
+            assert VendorPerformanceLog.objects.filter(vendor=vendor).count() == 1
+
+    def test_does_not_run_more_queries_for_more_rows(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.patch(self.url, self.complete_rows(self.pos[:2]), format="json")
+        with CaptureQueriesContext(connection) as many:
+            self.client.patch(self.url, self.complete_rows(self.pos[2:]), format="json")
+
+        # the first batch also creates the day's performance rollups
+        assert len(many) <= len(few)
+
+    def test_does_not_log_when_no_order_is_completed(self):
+        rows = [{"id": po.id, "quality_rating": 2} for po in self.pos]
+
+        response = self.client.patch(self.url, rows, format="json")
+
+        assert response.status_code == 200
+        assert not VendorPerformanceLog.objects.exists()
+        assert PurchaseOrder.objects.filter(quality_rating=2).count() == 6
+
+    def test_reports_invalid_rows_and_applies_the_rest(self):
+        rows = [
+            *self.complete_rows(self.pos[:1]),
+            {"id": 999999, "status": "completed"},
+            {"id": self.pos[1].id, "status": "shipped"},
+            {"id": self.pos[2].id},
+            {"status": "completed"},
+            {"id": self.pos[0].id, "quality_rating": 1},
+        ]
+
+        response = self.client.patch(self.url, rows, format="json")
+
+        assert response.status_code == 207
+        assert [result["status"] for result in response.data["results"]] == [
+            "updated", "error", "error", "error", "error", "error",
+        ]
+        assert PurchaseOrder.objects.filter(status="completed").count() == 1
+        assert PurchaseOrder.objects.get(pk=self.pos[0].id).quality_rating == 4
+
+    def test_returns_400_when_every_row_fails(self):
+        response = self.client.patch(self.url, [{"id": 999999, "status": "completed"}], format="json")
+
+        assert response.status_code == 400
+        assert response.data["updated"] == 0
+
+
+class TestPurchaseOrderBulkAcknowledgmentAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.client.force_login(self.user)
+        self.url = reverse("vendors:po_bulk_acknowledgment_api")
+        self.vendors = [
+            Vendor.objects.create(
+                name=code, contact_details="", address="", vendor_code=code
+            )
+            for code in ("VE-A", "VE-B")
+        ]
+        self.pos = []
+        for index in range(4):
+            po = PurchaseOrder.objects.create(
+                vendor=self.vendors[index % 2],
+                po_number=f"PO-2024-{index:06}",
+                order_date=timezone.now(),
+                items=["leather strap"],
+                quantity=1,
+            )
+            po.status = "completed"
+            po.save()
+            self.pos.append(po)
+
+    def test_acknowledges_ids_and_recomputes_response_time_per_vendor(self):
+        issue_date = self.pos[0].issue_date
+        rows = [
+            {"id": self.pos[0].id, "acknowledgment_date": (issue_date + timezone.timedelta(minutes=10)).isoformat()},
+            {"id": self.pos[2].id, "acknowledgment_date": (issue_date + timezone.timedelta(minutes=20)).isoformat()},
+            self.pos[1].id,
+        ]
+        logs = VendorPerformanceLog.objects.count()
+
+        response = self.client.post(self.url, rows, format="json")
+
+        assert response.status_code == 200
+        assert response.data["acknowledged"] == 3
+        assert [result["id"] for result in response.data["results"]] == [
+            self.pos[0].id, self.pos[2].id, self.pos[1].id,
+        ]
+        vendor = Vendor.objects.get(pk=self.vendors[0].id)
+        response_times = [
+            (po.acknowledgment_date - po.issue_date).total_seconds()
+            for po in PurchaseOrder.objects.filter(vendor=vendor)
+        ]
+        assert vendor.response_time_count == 2
+        assert vendor.average_response_time == pytest.approx(
+            sum(response_times) / 2
+        )
+        assert PurchaseOrder.objects.get(pk=self.pos[1].id).acknowledgment_date is not None
+        assert VendorPerformanceLog.objects.count() == logs + 2
+
+    def test_reports_failures_per_id(self):
+        rows = [
+            self.pos[0].id,
+            999999,
+            {"id": self.pos[1].id, "acknowledgment_date": "2000-01-01T00:00:00Z"},
+            self.pos[0].id,
+        ]
+
+        response = self.client.post(self.url, rows, format="json")
+
+        assert response.status_code == 207
+        assert [(result["id"], result["status"]) for result in response.data["results"]] == [
+            (self.pos[0].id, "acknowledged"),
+            (999999, "error"),
+            (self.pos[1].id, "error"),
+            (self.pos[0].id, "error"),
+        ]
+        assert PurchaseOrder.objects.filter(acknowledgment_date__isnull=False).count() == 1
+
+    def test_returns_400_when_not_a_list(self):
+        response = self.client.post(self.url, {"id": self.pos[0].id}, format="json")
+
+        assert response.status_code == 400
+
+
+class TestListFiltersAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.client.force_login(self.user)
+        self.vendor = create_vendor()
+        self.other_vendor = Vendor.objects.create(
+            name="XYZ Traders", contact_details="", address="", vendor_code="VE-XYZ"
+        )
+        for index in range(3):
+            PurchaseOrder.objects.create(
+                vendor=self.vendor if index < 2 else self.other_vendor,
+                po_number=f"PO-2024-00000{index}",
+                order_date=timezone.now() - timezone.timedelta(days=index * 10),
+                items=["leather strap", "buckle"],
+                quantity=index + 1,
+                status="completed" if index == 0 else "pending",
+            )
+        Vendor.objects.filter(pk=self.other_vendor.pk).update(on_time_delivery_rate=90)
+        self.vendors_url = reverse("vendors:vendor_list_create_api")
+        self.pos_url = reverse("vendors:po_list_create_api")
+
+    def test_filters_purchase_orders_by_vendor_status_and_dates(self):
+        response = self.client.get(self.pos_url, {"vendor": self.vendor.id, "status": "pending,cancelled"})
+        assert [po["po_number"] for po in response.data["results"]] == ["PO-2024-000001"]
+
+        since = (timezone.localdate() - timezone.timedelta(days=15)).isoformat()
+        response = self.client.get(self.pos_url, {"from": since, "search": "0000"})
+        assert response.data["count"] == 2
+
+    def test_filters_vendors_by_metric_threshold_and_search(self):
+        response = self.client.get(self.vendors_url, {"min_on_time_delivery_rate": 50})
+        assert [vendor["id"] for vendor in response.data["results"]] == [self.other_vendor.id]
+
+        response = self.client.get(self.vendors_url, {"search": "abc"})
+        assert [vendor["id"] for vendor in response.data["results"]] == [self.vendor.id]
+
+    def test_raises_400_when_invalid_filters(self):
+        response = self.client.get(self.pos_url, {"status": "shipped", "vendor": "x", "to": "soon"})
+        assert response.status_code == 400
+        assert set(response.data) == {"status", "vendor", "to"}
+
+        response = self.client.get(self.vendors_url, {"max_fullfilment_rate": "high"})
+        assert response.status_code == 400
+
+    def test_returns_only_requested_fields_without_loading_the_rest(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.pos_url, {"fields": "id,po_number,status"})
+
+        assert response.status_code == 200
+        assert set(response.data["results"][0]) == {"id", "po_number", "status"}
+        select = next(q["sql"] for q in queries if '"po_number"' in q["sql"])
+        assert '"items"' not in select
+
+    def test_omits_items(self):
+        response = self.client.get(self.pos_url, {"omit": "items"})
+
+        result = response.data["results"][0]
+        assert "items" not in result
+        assert result["po_number"]
+
+    def test_raises_400_when_unknown_field(self):
+        response = self.client.get(self.vendors_url, {"fields": "id,secret"})
+        assert response.status_code == 400
+
+    def test_etag_differs_per_field_selection(self):
+        full = self.client.get(self.pos_url)
+        sparse = self.client.get(self.pos_url, {"omit": "items"})
+        assert full["ETag"] != sparse["ETag"]
+
+
+@override_settings(VENDOR_RANKING_MAX_AGE=0)
+class TestVendorRankingAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.client.force_login(self.user)
+        self.vendors = []
+        for index, on_time_delivery_rate in enumerate((50, 90, 70)):
+            vendor = Vendor.objects.create(
+                name=f"Vendor {index}", contact_details="", address="",
+                vendor_code=f"VE-{index}", on_time_delivery_rate=on_time_delivery_rate,
+                quality_rating_avg=5 - index, completed_orders_count=1,
+            )
+            self.vendors.append(vendor)
+        refresh_vendor_rankings()
+        self.url = reverse("vendors:vendor_ranking_list_api")
+
+    def test_returns_top_vendors_by_metric(self):
+        response = self.client.get(self.url, {"metric": "on_time_delivery_rate", "limit": 2})
+
+        assert response.status_code == 200
+        assert [row["vendor"] for row in response.data["results"]] == [
+            self.vendors[1].id, self.vendors[2].id,
+        ]
+        assert response.data["results"][0]["on_time_delivery_rate_rank"] == 1
+        assert response.data["results"][0]["vendor_code"] == "VE-1"
+
+    def test_returns_top_vendors_by_score(self):
+        response = self.client.get(self.url)
+
+        ranks = [row["score_rank"] for row in response.data["results"]]
+        assert ranks == sorted(ranks)
+        assert len(ranks) == 3
+        assert VendorRanking.objects.count() == 3
+
+    def test_reads_top_n_from_the_rank_index(self):
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {"metric": "quality_rating_avg", "limit": 1})
+
+        select = next(q["sql"] for q in queries if '"vendors_vendorranking"."score"' in q["sql"])
+        plan = connection.cursor().execute(f"EXPLAIN QUERY PLAN {select}").fetchall()
+        details = " ".join(row[-1] for row in plan)
+        assert "ranking_quality_idx" in details
+        assert "TEMP B-TREE" not in details
+
+    def test_reads_serve_the_last_build_without_writing(self):
+        Vendor.objects.filter(pk=self.vendors[0].pk).update(
+            on_time_delivery_rate=100, updated_at=timezone.now()
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("vendors:vendor_ranking_api", kwargs={"vendor_id": self.vendors[0].id})
+            )
+
+        assert response.status_code == 200
+        assert response.data["on_time_delivery_rate_rank"] == 3
+        assert not any(
+            query["sql"].startswith(("INSERT", "UPDATE", "DELETE")) for query in queries
+        )
+
+    def test_rebuilds_when_a_vendor_changes(self):
+        Vendor.objects.filter(pk=self.vendors[0].pk).update(
+            on_time_delivery_rate=100, updated_at=timezone.now()
+        )
+
+        assert ensure_vendor_rankings()
+
+        response = self.client.get(
+            reverse("vendors:vendor_ranking_api", kwargs={"vendor_id": self.vendors[0].id})
+        )
+        assert response.data["on_time_delivery_rate_rank"] == 1
+
+    def test_ranks_a_new_vendor_on_the_next_build(self):
+        vendor = create_vendor()
+        url = reverse("vendors:vendor_ranking_api", kwargs={"vendor_id": vendor.id})
+
+        response = self.client.get(url)
+        assert response.status_code == 404
+        assert response.data["detail"] == "Vendor not ranked yet."
+
+        assert ensure_vendor_rankings()
+        response = self.client.get(url)
+        assert response.status_code == 200
+        assert response.data["on_time_delivery_rate"] is None
+        assert response.data["on_time_delivery_rate_rank"] == 4
+
+    def test_deleting_a_vendor_only_removes_its_row_until_the_next_build(self):
+        self.vendors[1].delete()
+
+        response = self.client.get(self.url, {"metric": "on_time_delivery_rate"})
+        assert [row["on_time_delivery_rate_rank"] for row in response.data["results"]] == [2, 3]
+
+        with override_settings(VENDOR_RANKING_MAX_AGE=3600):
+            assert not ensure_vendor_rankings()
+        assert ensure_vendor_rankings()
+
+        response = self.client.get(self.url, {"metric": "on_time_delivery_rate"})
+        assert [row["vendor"] for row in response.data["results"]] == [
+            self.vendors[2].id, self.vendors[0].id,
+        ]
+        assert response.data["results"][0]["on_time_delivery_rate_rank"] == 1
+
+    def test_raises_400_when_invalid_metric_or_limit(self):
+        assert self.client.get(self.url, {"metric": "name"}).status_code == 400
+        assert self.client.get(self.url, {"limit": "0"}).status_code == 400
+
+    def test_raises_404_when_invalid_vendor_id(self):
+        response = self.client.get(
+            reverse("vendors:vendor_ranking_api", kwargs={"vendor_id": 999999})
+        )
+        assert response.status_code == 404
+
+
+class TestAsyncPerformanceAPI(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.vendor = create_vendor()
+        now = timezone.now()
+        for hours in range(3):
+            VendorPerformanceLog.objects.create(
+                vendor=self.vendor, date=now - timezone.timedelta(hours=hours),
+                on_time_delivery_rate=hours, quality_rating_avg=1,
+                average_response_time=2, fulfillment_rate=3,
+            )
+
+    def call(self, view, url_name, user=None, **params):
+        url = reverse(f"vendors:{url_name}", kwargs={"vendor_id": self.vendor.id})
+        request = AsyncRequestFactory().get(url, params)
+        request.user = user or self.user
+        return async_to_sync(view.as_view())(request, vendor_id=self.vendor.id)
+
+    def test_serves_the_same_performance_as_the_sync_view(self):
+        self.client.force_login(self.user)
+        expected = self.client.get(
+            reverse("vendors:vendor_performance_api", kwargs={"vendor_id": self.vendor.id})
+        )
+
+        response = self.call(AsyncVendorPerformanceAPI, "vendor_performance_api")
+
+        assert response.status_code == 200
+        assert json.loads(response.content) == expected.json()
+        assert response["ETag"] == expected["ETag"]
+
+    def test_serves_the_same_trend_as_the_sync_view(self):
+        self.client.force_login(self.user)
+        url = reverse("vendors:vendor_performance_log_api", kwargs={"vendor_id": self.vendor.id})
+
+        for params in ({"page_size": 2}, {"bucket": "day"}):
+            expected = self.client.get(url, params).json()
+            response = self.call(
+                AsyncVendorPerformanceTrendAPI, "vendor_performance_log_api", **params
+            )
+            assert response.status_code == 200
+            assert json.loads(response.content) == expected
+
+    def test_raises_400_when_invalid_bucket(self):
+        response = self.call(
+            AsyncVendorPerformanceTrendAPI, "vendor_performance_log_api", bucket="year"
+        )
+        assert response.status_code == 400
+
+    def test_returns_403_when_anonymous(self):
+        from django.contrib.auth.models import AnonymousUser
+
+        response = self.call(
+            AsyncVendorPerformanceAPI, "vendor_performance_api", user=AnonymousUser()
+        )
+        assert response.status_code == 403
+
+    def test_streams_logs_as_ndjson(self):
+        self.async_client.force_login(self.user)
+        url = reverse(
+            "vendors:vendor_performance_log_stream_api", kwargs={"vendor_id": self.vendor.id}
+        )
+
+        async def stream():
+            response = await self.async_client.get(url)
+            return response, [chunk async for chunk in response.streaming_content]
+
+        response, chunks = async_to_sync(stream)()
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/x-ndjson"
+        logs = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+        assert [log["on_time_delivery_rate"] for log in logs] == [2, 1, 0]
+
+    def test_streams_logs_with_a_sync_iterator_under_wsgi(self):
+        self.client.force_login(self.user)
+        url = reverse(
+            "vendors:vendor_performance_log_stream_api", kwargs={"vendor_id": self.vendor.id}
+        )
+        response = self.client.get(url)
+
+        assert response.status_code == 200
+        assert not response.is_async
+        logs = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        assert [log["on_time_delivery_rate"] for log in logs] == [2, 1, 0]
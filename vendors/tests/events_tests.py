@@ -0,0 +1,243 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from vendors.events import PerformanceEventStream, PerformanceHub, performance_hub
+from vendors.models import Vendor, VendorPerformanceLog, log_vendor_performance
+
+
+def create_vendor(code):
+    return Vendor.objects.create(
+        name=code, contact_details="", address="", vendor_code=code
+    )
+
+
+def create_log(vendor, rate=50.0):
+    return VendorPerformanceLog.objects.create(
+        vendor=vendor,
+        date=timezone.now(),
+        on_time_delivery_rate=rate,
+        quality_rating_avg=4.0,
+        average_response_time=60.0,
+        fulfillment_rate=1.0,
+    )
+
+
+def event(event_id, vendor_id):
+    return {"id": event_id, "vendor_id": vendor_id}
+
+
+def parse_events(chunks):
+    events = []
+    for chunk in chunks:
+        fields = dict(
+            line.split(": ", 1) for line in chunk.strip().splitlines() if ": " in line
+        )
+        if "data" in fields:
+            events.append((int(fields["id"]), json.loads(fields["data"])))
+    return events
+
+
+async def take(stream, count):
+    chunks = []
+    iterator = stream.__aiter__()
+    try:
+        while len(chunks) < count:
+            chunks.append(await asyncio.wait_for(iterator.__anext__(), 5))
+    finally:
+        await iterator.aclose()
+    return chunks
+
+
+class TestPerformanceHub:
+    def test_delivers_events_published_from_other_threads(self):
+        hub = PerformanceHub()
+
+        async def receive():
+            subscription = hub.subscribe(vendor_ids={1})
+            publisher = threading.Thread(
+                target=lambda: [hub.publish(event(1, 2)), hub.publish(event(2, 1))]
+            )
+            publisher.start()
+            received = await asyncio.wait_for(subscription.queue.get(), 5)
+            publisher.join()
+            hub.unsubscribe(subscription)
+            return received
+
+        assert async_to_sync(receive)() == event(2, 1)
+
+    def test_flags_overflow_when_the_queue_is_full(self):
+        hub = PerformanceHub()
+
+        async def overflow():
+            subscription = hub.subscribe(maxsize=1)
+            hub.publish(event(1, 1))
+            hub.publish(event(2, 1))
+            await asyncio.sleep(0)
+            return subscription
+
+        subscription = async_to_sync(overflow)()
+        assert subscription.overflowed
+        assert subscription.queue.qsize() == 1
+
+
+@pytest.mark.django_db
+class TestPerformanceEventStream:
+    def test_replays_logs_after_last_event_id(self, settings):
+        settings.PERFORMANCE_EVENTS_POLL_INTERVAL = 60
+        vendor, other = create_vendor("VE-1"), create_vendor("VE-2")
+        first = create_log(vendor)
+        create_log(other)
+        second = create_log(vendor, rate=75.0)
+
+        stream = PerformanceEventStream(vendor_ids={vendor.id}, last_event_id=first.id)
+        chunks = async_to_sync(take)(stream, 2)
+
+        assert chunks[0].startswith("retry: ")
+        [(event_id, data)] = parse_events(chunks)
+        assert event_id == second.id
+        assert data["vendor"] == vendor.id
+        assert data["on_time_delivery_rate"] == 75.0
+
+    def test_pushes_published_logs_and_heartbeats(self, settings):
+        settings.PERFORMANCE_EVENTS_POLL_INTERVAL = 60
+        settings.PERFORMANCE_EVENTS_HEARTBEAT_INTERVAL = 0.05
+        vendor = create_vendor("VE-1")
+
+        async def run():
+            stream = PerformanceEventStream().__aiter__()
+            chunks = [await stream.__anext__()]
+            loop = asyncio.get_running_loop()
+            next_chunk = loop.create_task(stream.__anext__())
+            # the stream subscribes before polling the latest id, give it a turn
+            await asyncio.sleep(0.01)
+            performance_hub.publish(
+                {
+                    "id": 10**9,
+                    "vendor_id": vendor.id,
+                    "date": timezone.now(),
+                    "on_time_delivery_rate": 1.0,
+                    "quality_rating_avg": 2.0,
+                    "average_response_time": 3.0,
+                    "fulfillment_rate": 4.0,
+                }
+            )
+            chunks.append(await asyncio.wait_for(next_chunk, 5))
+            chunks.append(await asyncio.wait_for(stream.__anext__(), 5))
+            await stream.aclose()
+            return chunks
+
+        chunks = async_to_sync(run)()
+
+        assert parse_events(chunks) == [
+            (
+                10**9,
+                {
+                    "vendor": vendor.id,
+                    "date": json.loads(chunks[1].split("data: ")[1])["date"],
+                    "on_time_delivery_rate": 1.0,
+                    "quality_rating_avg": 2.0,
+                    "average_response_time": 3.0,
+                    "fulfillment_rate": 4.0,
+                },
+            )
+        ]
+        assert chunks[2] == ": heartbeat\n\n"
+
+    def test_polls_logs_written_by_other_processes(self, settings):
+        settings.PERFORMANCE_EVENTS_POLL_INTERVAL = 0.01
+        vendor = create_vendor("VE-1")
+
+        async def run():
+            stream = PerformanceEventStream().__aiter__()
+            await stream.__anext__()
+            next_chunk = asyncio.get_running_loop().create_task(stream.__anext__())
+            await asyncio.sleep(0.01)
+            # not published to this process's hub
+            log = await VendorPerformanceLog.objects.acreate(
+                vendor=vendor,
+                date=timezone.now(),
+                on_time_delivery_rate=1.0,
+                quality_rating_avg=1.0,
+                average_response_time=1.0,
+                fulfillment_rate=1.0,
+            )
+            chunk = await asyncio.wait_for(next_chunk, 5)
+            await stream.aclose()
+            return log, chunk
+
+        log, chunk = async_to_sync(run)()
+        assert parse_events([chunk])[0][0] == log.id
+
+
+def test_publishes_performance_logs_on_commit(django_capture_on_commit_callbacks, db):
+    vendor = create_vendor("VE-1")
+
+    def write():
+        with django_capture_on_commit_callbacks(execute=True):
+            return log_vendor_performance(vendor)
+
+    async def run():
+        subscription = performance_hub.subscribe(vendor_ids={vendor.id})
+        try:
+            log = await sync_to_async(write)()
+            return log, await asyncio.wait_for(subscription.queue.get(), 5)
+        finally:
+            performance_hub.unsubscribe(subscription)
+
+    log, received = async_to_sync(run)()
+    assert received["id"] == log.id
+    assert received["vendor_id"] == vendor.id
+
+
+class TestPerformanceEventsEndpoint:
+    @pytest.fixture
+    def stream_client(self, async_client, db):
+        async_client.force_login(User.objects.create_user(username="testuser"))
+        return async_client
+
+    def test_streams_events_after_last_event_id(self, stream_client, settings):
+        settings.PERFORMANCE_EVENTS_POLL_INTERVAL = 60
+        vendor = create_vendor("VE-1")
+        first = create_log(vendor)
+        second = create_log(vendor)
+        url = reverse("vendors:vendor_performance_events_api")
+
+        async def run():
+            response = await stream_client.get(
+                url,
+                {"vendor": str(vendor.id)},
+                headers={"Last-Event-ID": str(first.id)},
+            )
+            chunks = await take(response.streaming_content, 2)
+            return response, [chunk.decode() for chunk in chunks]
+
+        response, chunks = async_to_sync(run)()
+
+        assert response["Content-Type"] == "text/event-stream"
+        assert response["Cache-Control"] == "no-cache"
+        assert [event_id for event_id, _ in parse_events(chunks)] == [second.id]
+
+    def test_raises_400_when_invalid_vendor(self, stream_client):
+        url = reverse("vendors:vendor_performance_events_api")
+
+        async def run():
+            return await stream_client.get(url, {"vendor": "1,x"})
+
+        assert async_to_sync(run)().status_code == 400
+
+    def test_returns_501_without_hanging_when_served_over_wsgi(self, client):
+        url = reverse("vendors:vendor_performance_events_api")
+        responses = []
+        request = threading.Thread(target=lambda: responses.append(client.get(url)))
+        request.start()
+        request.join(5)
+
+        assert not request.is_alive()
+        assert responses[0].status_code == 501
@@ -0,0 +1,24 @@
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+@contextmanager
+def assert_query_budget(budget, using="default"):
+    """Fails when the block runs more than ``budget`` queries on ``using``.
+
+    with assert_query_budget(4):
+        client.get(url)
+    """
+    with CaptureQueriesContext(connections[using]) as queries:
+        yield queries
+
+    if len(queries) > budget:
+        statements = "\n".join(
+            f"{number}. {query['sql']}"
+            for number, query in enumerate(queries.captured_queries, start=1)
+        )
+        raise AssertionError(
+            f"{len(queries)} queries run, the budget is {budget}:\n{statements}"
+        )
@@ -0,0 +1,104 @@
+import logging
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from vendors.tests.api_tests import create_purchase_order
+from vendors.tests.helpers import assert_query_budget
+
+INSTRUMENT_ALL = {
+    "REQUEST_INSTRUMENTATION_SAMPLE_RATE": 1.0,
+    "REQUEST_INSTRUMENTATION_SERVER_TIMING": True,
+    "REQUEST_INSTRUMENTATION_SLOW_MS": 10_000,
+}
+
+
+def parse_server_timing(header):
+    timings = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        timings[name] = dict(param.split("=", 1) for param in params)
+    return timings
+
+
+class TestRequestInstrumentationMiddleware(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="pass")
+        self.po = create_purchase_order()
+        self.client.force_login(self.user)
+        self.po_url = reverse(
+            "vendors:po_retrieve_update_destroy_api", kwargs={"po_id": self.po.id}
+        )
+
+    @override_settings(**INSTRUMENT_ALL)
+    def test_reports_queries_and_signal_time_in_server_timing(self):
+        response = self.client.patch(self.po_url, {"quantity": 5}, format="json")
+
+        assert response.status_code == 200
+        timings = parse_server_timing(response["Server-Timing"])
+        assert set(timings) == {"db", "serializer", "signals", "total"}
+        assert int(timings["db"]["desc"].strip('"').split()[0]) > 0
+        assert float(timings["signals"]["dur"]) > 0
+        assert float(timings["serializer"]["dur"]) > 0
+
+    @override_settings(**{**INSTRUMENT_ALL, "REQUEST_INSTRUMENTATION_SAMPLE_RATE": 0})
+    def test_skips_requests_outside_the_sample(self):
+        response = self.client.get(self.po_url)
+
+        assert "Server-Timing" not in response
+
+    @override_settings(**{**INSTRUMENT_ALL, "REQUEST_INSTRUMENTATION_SLOW_MS": 0})
+    def test_logs_requests_over_the_slow_threshold(self):
+        with self.assertLogs("vendors.instrumentation", logging.WARNING) as logs:
+            self.client.get(self.po_url)
+
+        record = logs.records[0].request_profile
+        assert record["view"] == "vendors:po_retrieve_update_destroy_api"
+        assert record["status"] == 200
+        assert record["queries"] > 0
+
+    @override_settings(**INSTRUMENT_ALL)
+    def test_does_not_log_fast_requests(self):
+        with self.assertNoLogs("vendors.instrumentation", logging.WARNING):
+            self.client.get(self.po_url)
+
+
+class TestEndpointQueryBudgets(APITestCase):
+    """Queries per request, session and user lookups included"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="pass")
+        self.po = create_purchase_order()
+        self.client.force_login(self.user)
+
+    def assert_budget(self, budget, method, url_name, data=None, **kwargs):
+        url = reverse(f"vendors:{url_name}", kwargs=kwargs)
+        with assert_query_budget(budget):
+            response = getattr(self.client, method)(url, data, format="json")
+        assert response.status_code < 400, response.content
+
+    def test_vendor_endpoints(self):
+        vendor_id = self.po.vendor_id
+        self.assert_budget(5, "get", "vendor_list_create_api")
+        self.assert_budget(
+            3, "get", "vendor_retrieve_update_destroy_api", vendor_id=vendor_id
+        )
+        self.assert_budget(3, "get", "vendor_performance_api", vendor_id=vendor_id)
+        self.assert_budget(5, "get", "vendor_performance_log_api", vendor_id=vendor_id)
+
+    def test_purchase_order_endpoints(self):
+        self.assert_budget(5, "get", "po_list_create_api")
+        self.assert_budget(3, "get", "po_retrieve_update_destroy_api", po_id=self.po.id)
+        self.assert_budget(
+            11,
+            "patch",
+            "po_retrieve_update_destroy_api",
+            {"quantity": 5},
+            po_id=self.po.id,
+        )
+
+    def test_budget_failure_lists_the_queries(self):
+        with self.assertRaisesMessage(AssertionError, "the budget is 0"):
+            self.assert_budget(0, "get", "po_list_create_api")
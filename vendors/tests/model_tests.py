@@ -1,8 +1,26 @@
-from vendors.models import Vendor, PurchaseOrder
+from vendors.models import (
+    Vendor,
+    PurchaseOrder,
+    PendingVendorMetrics,
+    VendorPerformanceLog,
+    rebuild_vendor_counters,
+)
+from vendors import metrics_queue
+from vendors.metrics_queue import (
+    enqueue_vendor_metrics,
+    flush_vendor_metrics_queue,
+    process_vendor_metrics_queue,
+)
 import pytest
 import json
 from vendors.tests.api_tests import create_vendor
+from django.core.management import call_command
 from django.utils import timezone
+from vendors.services import (
+    VENDOR_COUNTER_FIELDS,
+    compute_vendor_scorecard,
+    purchase_order_counters,
+)
 
 
 @pytest.mark.django_db
@@ -45,3 +63,306 @@ class TestPurchaseOrderModelShould:
         assert po.quality_rating is None
         assert po.issue_date is not None
         assert po.acknowledgment_date is None
+
+
+@pytest.mark.django_db
+class TestVendorMetricCountersShould:
+    def create_purchase_order(self, vendor, **kwargs):
+        return PurchaseOrder.objects.create(
+            vendor=vendor,
+            po_number=f"PO-2024-{PurchaseOrder.objects.count() + 1:06}",
+            order_date=timezone.now(),
+            items=json.dumps(["leather straps"]),
+            quantity=20,
+            **kwargs,
+        )
+
+    def complete(self, po, **kwargs):
+        po = PurchaseOrder.objects.get(pk=po.pk)
+        po.status = "completed"
+        for field, value in kwargs.items():
+            setattr(po, field, value)
+        po.save()
+        return po
+
+    def test_count_issued_orders_when_create(self):
+        vendor = create_vendor()
+        self.create_purchase_order(vendor)
+        self.create_purchase_order(vendor)
+
+        vendor.refresh_from_db()
+        assert vendor.issued_orders_count == 2
+        assert vendor.completed_orders_count == 0
+        assert vendor.fullfilment_rate == 0
+
+    def test_update_metrics_incrementally_when_completed(self):
+        vendor = create_vendor()
+        future = timezone.now() + timezone.timedelta(days=2)
+        past = timezone.now() - timezone.timedelta(days=2)
+        first = self.create_purchase_order(vendor)
+        second = self.create_purchase_order(vendor)
+        self.create_purchase_order(vendor)
+
+        self.complete(
+            first,
+            delivery_date=future,
+            quality_rating=4.0,
+            acknowledgment_date=first.issue_date + timezone.timedelta(seconds=30),
+        )
+        self.complete(second, delivery_date=past, quality_rating=2.0)
+
+        vendor.refresh_from_db()
+        assert vendor.completed_orders_count == 2
+        assert vendor.on_time_delivery_rate == 50.0
+        assert vendor.quality_rating_avg == 3.0
+        assert vendor.average_response_time == 30.0
+        assert vendor.fullfilment_rate == 1.5
+
+        expected = compute_vendor_scorecard(vendor)
+        for field, value in expected.items():
+            assert getattr(vendor, field) == pytest.approx(value)
+
+    def test_revert_counters_when_status_leaves_completed(self):
+        vendor = create_vendor()
+        po = self.complete(self.create_purchase_order(vendor), quality_rating=5.0)
+        po.status = "cancelled"
+        po.save()
+
+        vendor.refresh_from_db()
+        assert vendor.completed_orders_count == 0
+        assert vendor.quality_rating_sum == 0
+        assert vendor.quality_rating_avg == 0
+
+    def test_move_counters_when_vendor_changes(self):
+        vendor = create_vendor()
+        other = Vendor.objects.create(
+            name="B", contact_details="", address="", vendor_code="VE-B"
+        )
+        po = self.complete(self.create_purchase_order(vendor), quality_rating=5.0)
+        po.vendor = other
+        po.save()
+
+        vendor.refresh_from_db()
+        other.refresh_from_db()
+        assert vendor.issued_orders_count == vendor.completed_orders_count == 0
+        assert other.issued_orders_count == other.completed_orders_count == 1
+        assert other.quality_rating_avg == 5.0
+
+    def assert_counters_match_orders(self, vendor):
+        vendor.refresh_from_db()
+        expected = dict.fromkeys(VENDOR_COUNTER_FIELDS, 0)
+        for po in PurchaseOrder.objects.filter(vendor=vendor):
+            counters = purchase_order_counters(
+                **{
+                    field: getattr(po, field)
+                    for field in PurchaseOrder.METRIC_STATE_FIELDS
+                    if field != "vendor_id"
+                }
+            )
+            for field, value in counters.items():
+                expected[field] += value
+        for field, value in expected.items():
+            assert getattr(vendor, field) == pytest.approx(value), field
+
+    def test_count_once_when_completed_through_two_loaded_instances(self):
+        vendor = create_vendor()
+        po = self.create_purchase_order(vendor)
+        first = PurchaseOrder.objects.get(pk=po.pk)
+        second = PurchaseOrder.objects.get(pk=po.pk)
+
+        for instance in (first, second):
+            instance.status = "completed"
+            instance.quality_rating = 4.0
+            instance.save()
+
+        vendor.refresh_from_db()
+        assert vendor.completed_orders_count == 1
+        self.assert_counters_match_orders(vendor)
+
+    def test_take_the_refreshed_state_after_refresh_from_db(self):
+        vendor = create_vendor()
+        po = self.create_purchase_order(vendor)
+        self.complete(po, quality_rating=4.0)
+
+        po.refresh_from_db()
+        assert po._metric_state["status"] == "completed"
+        po.status = "cancelled"
+        po.save()
+
+        self.assert_counters_match_orders(vendor)
+
+    def test_decrement_counters_when_deleted(self):
+        vendor = create_vendor()
+        self.complete(self.create_purchase_order(vendor)).delete()
+
+        vendor.refresh_from_db()
+        assert vendor.issued_orders_count == 0
+        assert vendor.completed_orders_count == 0
+
+    def test_rebuild_drifted_counters_with_management_command(self):
+        vendor = create_vendor()
+        self.complete(self.create_purchase_order(vendor), quality_rating=4.0)
+        Vendor.objects.filter(pk=vendor.pk).update(
+            completed_orders_count=7, quality_rating_sum=1
+        )
+
+        with pytest.raises(SystemExit):
+            call_command("rebuild_vendor_counters", "--check")
+
+        call_command("rebuild_vendor_counters")
+        vendor.refresh_from_db()
+        assert vendor.completed_orders_count == 1
+        assert vendor.quality_rating_avg == 4.0
+
+
+@pytest.mark.django_db
+class TestDeferredVendorMetricsShould:
+    def create_purchase_order(self, vendor):
+        return PurchaseOrder.objects.create(
+            vendor=vendor,
+            po_number=f"PO-2024-{PurchaseOrder.objects.count() + 1:06}",
+            order_date=timezone.now(),
+            items=json.dumps(["leather straps"]),
+            quantity=20,
+        )
+
+    def test_coalesce_updates_and_recompute_once_when_flushed(self, settings):
+        settings.VENDOR_METRICS_MODE = "deferred"
+        vendor = create_vendor()
+        for quality_rating in (2.0, 4.0):
+            po = PurchaseOrder.objects.get(pk=self.create_purchase_order(vendor).pk)
+            po.status = "completed"
+            po.quality_rating = quality_rating
+            po.save()
+
+        vendor.refresh_from_db()
+        assert vendor.quality_rating_avg == 0.0
+        assert PendingVendorMetrics.objects.count() == 1
+        assert VendorPerformanceLog.objects.count() == 0
+
+        assert flush_vendor_metrics_queue() == 1
+
+        vendor.refresh_from_db()
+        assert vendor.quality_rating_avg == 3.0
+        assert vendor.completed_orders_count == 2
+        assert PendingVendorMetrics.objects.count() == 0
+        assert VendorPerformanceLog.objects.count() == 1
+
+    def test_not_log_snapshot_twice_when_requeued_while_recomputing(
+        self, settings, monkeypatch
+    ):
+        settings.VENDOR_METRICS_MODE = "deferred"
+        vendor = create_vendor()
+        po = self.create_purchase_order(vendor)
+        po.status = "completed"
+        po.save()
+
+        def rebuild_and_requeue(vendor):
+            rebuild_vendor_counters(vendor)
+            enqueue_vendor_metrics([vendor.id])
+
+        monkeypatch.setattr(
+            metrics_queue, "rebuild_vendor_counters", rebuild_and_requeue
+        )
+        assert process_vendor_metrics_queue() == 1
+        monkeypatch.undo()
+
+        entry = PendingVendorMetrics.objects.get()
+        assert not entry.log_snapshot
+        assert VendorPerformanceLog.objects.count() == 1
+
+        assert flush_vendor_metrics_queue() == 1
+        assert VendorPerformanceLog.objects.count() == 1
+
+    def test_skip_vendors_deleted_after_their_entry_was_read(self, monkeypatch):
+        vendor, deleted = [
+            Vendor.objects.create(
+                name=code, contact_details="", address="", vendor_code=code
+            )
+            for code in ("VE-A", "VE-B")
+        ]
+        enqueue_vendor_metrics([vendor.id])
+        enqueue_vendor_metrics([deleted.id])
+
+        def rebuild_and_delete(vendor):
+            Vendor.objects.filter(pk=deleted.pk).delete()
+            return rebuild_vendor_counters(vendor)
+
+        monkeypatch.setattr(metrics_queue, "rebuild_vendor_counters", rebuild_and_delete)
+
+        assert process_vendor_metrics_queue() == 2
+        assert PendingVendorMetrics.objects.count() == 0
+
+    def test_not_log_snapshot_when_no_order_completed(self, settings):
+        settings.VENDOR_METRICS_MODE = "deferred"
+        vendor = create_vendor()
+        self.create_purchase_order(vendor)
+
+        call_command("process_vendor_metrics_queue")
+
+        vendor.refresh_from_db()
+        assert vendor.issued_orders_count == 1
+        assert VendorPerformanceLog.objects.count() == 0
+
+
+@pytest.mark.django_db
+class TestPurchaseOrderCompletionShould:
+    def create_order(self, delivery_date):
+        return PurchaseOrder.objects.create(
+            vendor=create_vendor(),
+            po_number="PO-2024-000001",
+            order_date=timezone.now(),
+            delivery_date=delivery_date,
+            items=json.dumps(["leather straps"]),
+            quantity=1,
+        )
+
+    def test_stamp_completed_at_on_the_transition_to_completed(self):
+        po = self.create_order(timezone.now() + timezone.timedelta(days=1))
+        assert po.completed_at is None
+
+        po.status = "completed"
+        po.save(update_fields=["status"])
+        po.refresh_from_db()
+
+        assert po.completed_at is not None
+        assert po.is_on_time
+        completed_at = po.completed_at
+
+        po.quality_rating = 4
+        po.save()
+        po.refresh_from_db()
+        assert po.completed_at == completed_at
+
+    def test_clear_completion_when_reopened(self):
+        po = self.create_order(timezone.now() + timezone.timedelta(days=1))
+        po.status = "completed"
+        po.save()
+
+        po.status = "pending"
+        po.save()
+        po.refresh_from_db()
+
+        assert po.completed_at is None
+        assert not po.is_on_time
+
+    def test_classify_late_delivery(self):
+        po = self.create_order(timezone.now() - timezone.timedelta(days=1))
+
+        po.status = "completed"
+        po.save()
+
+        assert not po.is_on_time
+        assert Vendor.objects.get(pk=po.vendor_id).on_time_delivery_rate == 0
+
+    def test_keep_on_time_rate_once_delivery_date_has_passed(self):
+        now = timezone.now()
+        po = self.create_order(now - timezone.timedelta(days=1))
+        po.status = "completed"
+        po.completed_at = now - timezone.timedelta(days=2)
+        po.save()
+
+        assert po.is_on_time
+        scorecard = compute_vendor_scorecard(po.vendor_id)
+        assert scorecard["on_time_delivery_rate"] == 100
+        assert Vendor.objects.get(pk=po.vendor_id).on_time_delivery_rate == 100
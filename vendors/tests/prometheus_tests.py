@@ -0,0 +1,215 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from vendors.prometheus import (
+    REGISTRY,
+    Counter,
+    Histogram,
+    Registry,
+    http_requests,
+    performance_logs_written,
+    render,
+    vendor_performance_cache_requests,
+)
+from vendors.tests.api_tests import create_purchase_order
+
+
+@pytest.fixture
+def api_client(client, db):
+    client.force_login(User.objects.create_user(username="testuser", password="pass"))
+    return client
+
+
+def histogram_count(snapshot, name, **labels):
+    metric = snapshot[name]
+    key = [str(labels[label]) for label in metric["labelnames"]]
+    for sample_labels, value in metric["samples"]:
+        if sample_labels == key:
+            return value["count"]
+    return 0
+
+
+class TestRender:
+    def test_renders_cumulative_histogram_buckets(self):
+        registry = Registry()
+        histogram = Histogram(
+            "test_seconds", "Test", ["view"], buckets=(0.1, 1), registry=registry
+        )
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, view="a")
+
+        text = render(registry.snapshot())
+
+        assert "# TYPE test_seconds histogram" in text
+        assert 'test_seconds_bucket{view="a",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{view="a",le="1"} 2' in text
+        assert 'test_seconds_bucket{view="a",le="+Inf"} 3' in text
+        assert 'test_seconds_count{view="a"} 3' in text
+        assert 'test_seconds_sum{view="a"} 5.55' in text
+
+    def test_escapes_label_values(self):
+        registry = Registry()
+        Counter("test_total", "Test", ["path"], registry=registry).inc(path='a"b')
+
+        assert 'test_total{path="a\\"b"} 1' in render(registry.snapshot())
+
+    def test_rejects_missing_labels(self):
+        counter = Counter("test_total", "Test", ["path"], registry=Registry())
+
+        with pytest.raises(ValueError):
+            counter.inc()
+
+
+def test_sums_samples_of_every_process(tmp_path, settings):
+    settings.PROMETHEUS_MULTIPROC_DIR = str(tmp_path)
+    registry = Registry()
+    counter = Counter("test_total", "Test", ["view"], registry=registry)
+    counter.inc(2, view="a")
+    other_process = registry.snapshot()
+    other_process["test_total"]["samples"] = [[["a"], 3], [["b"], 1]]
+    (tmp_path / f"{os.getppid()}-other.json").write_text(json.dumps(other_process))
+
+    samples = dict(
+        (tuple(labels), value)
+        for labels, value in registry.collect()["test_total"]["samples"]
+    )
+
+    assert samples == {("a",): 5, ("b",): 1}
+    assert (tmp_path / f"{registry.process_id}.json").exists()
+
+
+def test_prunes_the_files_of_exited_processes(tmp_path, settings):
+    settings.PROMETHEUS_MULTIPROC_DIR = str(tmp_path)
+    registry = Registry()
+    counter = Counter("test_total", "Test", ["view"], registry=registry)
+    counter.inc(view="a")
+    exited = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    dead_file = tmp_path / f"{exited.stdout.strip()}-dead.json"
+    dead_file.write_text(json.dumps(registry.snapshot()))
+
+    samples = registry.collect()["test_total"]["samples"]
+
+    assert samples == [[["a"], 1]]
+    assert not dead_file.exists()
+
+    registry.remove_file()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_flushes_from_concurrent_threads(tmp_path, settings):
+    settings.PROMETHEUS_MULTIPROC_DIR = str(tmp_path)
+    registry = Registry()
+    counter = Counter("test_total", "Test", ["view"], registry=registry)
+    counter.inc(view="a")
+    errors = []
+
+    def flush():
+        try:
+            for _ in range(20):
+                registry.flush(force=True)
+        except OSError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=flush) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [path.name for path in tmp_path.iterdir()] == [f"{registry.process_id}.json"]
+    snapshot = json.loads((tmp_path / f"{registry.process_id}.json").read_text())
+    assert snapshot["test_total"]["samples"] == [[["a"], 1]]
+
+
+class TestMetricsEndpoint:
+    def test_reports_request_latency_and_queries_per_url_name(self, api_client):
+        api_client.get(reverse("vendors:vendor_list_create_api"))
+
+        response = api_client.get(reverse("vendors:metrics"))
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        text = response.content.decode()
+        labels = 'url_name="vendors:vendor_list_create_api",method="GET"'
+        assert f"vms_http_request_duration_seconds_count{{{labels}}}" in text
+        assert f"vms_http_request_sql_queries_count{{{labels}}}" in text
+        assert http_requests.value(
+            url_name="vendors:vendor_list_create_api", method="GET", status=200
+        )
+
+    def test_records_recompute_duration_and_logs_written(self, api_client):
+        po = create_purchase_order()
+        before = REGISTRY.snapshot()
+        logs_before = performance_logs_written.value()
+
+        response = api_client.patch(
+            reverse("vendors:po_retrieve_update_destroy_api", kwargs={"po_id": po.id}),
+            {"status": "completed", "delivery_date": timezone.now().isoformat()},
+            content_type="application/json",
+        )
+
+        assert response.status_code == 200
+        after = REGISTRY.snapshot()
+        name = "vms_vendor_metrics_recompute_duration_seconds"
+        trigger = "purchase_order_updated"
+        assert histogram_count(after, name, trigger=trigger) == (
+            histogram_count(before, name, trigger=trigger) + 1
+        )
+        assert performance_logs_written.value() == logs_before + 1
+
+    def test_counts_performance_cache_hits_and_misses(self, api_client):
+        po = create_purchase_order()
+        url = reverse(
+            "vendors:vendor_performance_api", kwargs={"vendor_id": po.vendor_id}
+        )
+        hits = vendor_performance_cache_requests.value(result="hits")
+        misses = vendor_performance_cache_requests.value(result="misses")
+
+        api_client.get(url)
+        api_client.get(url)
+
+        assert vendor_performance_cache_requests.value(result="misses") == misses + 1
+        assert vendor_performance_cache_requests.value(result="hits") == hits + 1
+
+    def test_counts_queries_of_async_views(self, async_client, db):
+        vendor = create_purchase_order().vendor
+        async_client.force_login(User.objects.create_user(username="testuser"))
+        url = reverse(
+            "vendors:vendor_performance_log_stream_api", kwargs={"vendor_id": vendor.id}
+        )
+        name = "vms_http_request_sql_queries"
+        labels = {
+            "url_name": "vendors:vendor_performance_log_stream_api",
+            "method": "GET",
+        }
+        before = histogram_count(REGISTRY.snapshot(), name, **labels)
+
+        async def get():
+            return await async_client.get(url)
+
+        response = async_to_sync(get)()
+
+        assert response.status_code == 200
+        after = REGISTRY.snapshot()
+        assert histogram_count(after, name, **labels) == before + 1
+        samples = dict(
+            (tuple(sample_labels), value)
+            for sample_labels, value in after[name]["samples"]
+        )
+        # session, user and vendor lookups
+        assert samples[tuple(labels.values())]["sum"] >= 3
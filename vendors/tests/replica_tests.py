@@ -0,0 +1,76 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITransactionTestCase
+
+from vendors.models import Vendor
+from vendors.replicas import STICKY_COOKIE
+
+
+def create_vendor(code):
+    return Vendor.objects.create(
+        name=code, contact_details="-", address="-", vendor_code=code
+    )
+
+
+@override_settings(DATABASE_READ_REPLICAS=["replica"])
+class TestReplicaRouting(APITransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        # the session and user are read from default, they never reach the replica
+        self.client.force_login(User.objects.create_user(username="testuser"))
+        self.url = reverse("vendors:vendor_list_create_api")
+
+    def vendor_count(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data["count"]
+
+    def test_reads_lists_and_trends_from_the_replica_until_synced(self):
+        vendor = create_vendor("VE-1")
+        trend_url = reverse(
+            "vendors:vendor_performance_log_api", kwargs={"vendor_id": vendor.id}
+        )
+
+        self.assertEqual(self.vendor_count(), 0)
+        self.assertEqual(self.client.get(trend_url).status_code, 404)
+
+        call_command("sync_replicas", stdout=io.StringIO())
+
+        self.assertEqual(self.vendor_count(), 1)
+        self.assertEqual(self.client.get(trend_url).status_code, 200)
+
+    def test_writers_read_their_writes_from_default(self):
+        response = self.client.post(
+            self.url,
+            {"name": "ABC Traders", "contact_details": "-", "address": "-"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.vendor_count(), 1)
+
+        del self.client.cookies[STICKY_COOKIE]
+        self.assertEqual(self.vendor_count(), 0)
+
+    def test_session_writes_do_not_pin_the_client(self):
+        User.objects.create_user(username="admin", password="admin", is_staff=True)
+        self.client.logout()
+
+        response = self.client.post(
+            reverse("admin:login"), {"username": "admin", "password": "admin"}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("sessionid", response.cookies)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_READ_REPLICAS=[])
+    def test_reads_from_default_without_replicas(self):
+        create_vendor("VE-1")
+        self.assertEqual(self.vendor_count(), 1)
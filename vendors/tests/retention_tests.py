@@ -0,0 +1,140 @@
+import gzip
+import io
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.utils import timezone
+
+from vendors.models import (
+    PerformanceLogCompaction,
+    Vendor,
+    VendorPerformanceLog,
+    record_performance_rollup,
+)
+from vendors.retention import compacted_before, retention_cutoff
+from vendors.trends import aperformance_trend, performance_trend
+
+
+def create_log(vendor, date, rate):
+    log = VendorPerformanceLog.objects.create(
+        vendor=vendor,
+        date=date,
+        on_time_delivery_rate=rate,
+        quality_rating_avg=4.0,
+        average_response_time=10.0,
+        fulfillment_rate=1.0,
+    )
+    record_performance_rollup(log)
+    return log
+
+
+@pytest.fixture
+def logs(db):
+    vendor = Vendor.objects.create(
+        name="ABC Traders", contact_details="-", address="-", vendor_code="VE-1"
+    )
+    old_day = timezone.localtime() - timezone.timedelta(days=200)
+    old_day = old_day.replace(hour=10, minute=0, second=0, microsecond=0)
+    now = timezone.now()
+    return vendor, {
+        "old": [
+            create_log(vendor, old_day, 50.0),
+            create_log(vendor, old_day + timezone.timedelta(minutes=30), 70.0),
+            create_log(vendor, old_day + timezone.timedelta(hours=1), 60.0),
+        ],
+        "next_day": [create_log(vendor, old_day + timezone.timedelta(days=1), 90.0)],
+        "recent": [
+            create_log(vendor, now - timezone.timedelta(hours=3), 20.0),
+            create_log(vendor, now - timezone.timedelta(hours=1), 30.0),
+        ],
+    }
+
+
+def compact(**options):
+    stdout = io.StringIO()
+    call_command("compact_performance_logs", days=90, stdout=stdout, **options)
+    return stdout.getvalue()
+
+
+def test_keeps_the_last_log_of_each_old_day(logs, tmp_path):
+    vendor, created = logs
+
+    output = compact(batch_size=1, archive_dir=str(tmp_path))
+
+    assert "2 log(s) deleted" in output
+    remaining = set(VendorPerformanceLog.objects.values_list("id", flat=True))
+    assert remaining == {
+        created["old"][-1].id,
+        created["next_day"][0].id,
+        *(log.id for log in created["recent"]),
+    }
+
+    [archive] = tmp_path.iterdir()
+    assert (
+        archive.name
+        == f"performance_logs-{timezone.localtime(created['old'][0].date):%Y-%m}.ndjson.gz"
+    )
+    with gzip.open(archive, "rt") as lines:
+        archived = [json.loads(line) for line in lines]
+    assert [row["id"] for row in archived] == [log.id for log in created["old"][:2]]
+    assert archived[0]["on_time_delivery_rate"] == 50.0
+
+    [run] = PerformanceLogCompaction.objects.all()
+    assert run.deleted == 2
+    assert compacted_before() == retention_cutoff(90)
+
+
+def test_dry_run_deletes_nothing(logs):
+    output = compact(dry_run=True)
+
+    assert "2 log(s) would delete" in output
+    assert VendorPerformanceLog.objects.count() == 6
+    assert compacted_before() is None
+
+
+def test_hourly_trend_reads_compacted_days_from_the_rollups(logs):
+    vendor, created = logs
+    before = performance_trend(vendor, "hour")
+
+    compact()
+    buckets = performance_trend(vendor, "hour")
+
+    assert [bucket["count"] for bucket in before] == [2, 1, 1, 1, 1]
+    assert [bucket["count"] for bucket in buckets] == [3, 1, 1, 1]
+    assert buckets[0]["start"] == created["old"][0].date.replace(hour=0)
+    assert buckets[0]["on_time_delivery_rate"] == {
+        "avg": 60.0,
+        "min": 50.0,
+        "max": 70.0,
+        "last": 60.0,
+    }
+    assert buckets[2:] == before[3:]
+
+
+def test_hourly_trend_merges_compacted_days_with_hour_buckets(logs):
+    vendor, created = logs
+    compact()
+
+    buckets = performance_trend(vendor, "hour")
+
+    starts = [bucket["start"] for bucket in buckets]
+    assert all(timezone.is_aware(start) for start in starts)
+    assert starts == sorted(starts)
+    assert starts[1] == created["next_day"][0].date.replace(hour=0)
+    assert starts[2] == timezone.localtime(created["recent"][0].date).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+@pytest.mark.parametrize("bucket", ["hour", "day", "month"])
+def test_async_trend_matches_the_sync_one(logs, bucket):
+    vendor, created = logs
+    compact()
+    start = created["old"][0].date - timezone.timedelta(days=1)
+
+    for kwargs in ({}, {"start": start}, {"end": created["next_day"][0].date}):
+        assert async_to_sync(aperformance_trend)(vendor, bucket, **kwargs) == (
+            performance_trend(vendor, bucket, **kwargs)
+        )
@@ -0,0 +1,146 @@
+import threading
+
+import pytest
+from django.db import connection, connections
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+
+from vendors.models import SequenceCounter, PurchaseOrder
+from vendors.sequences import (
+    allocate_sequence_numbers,
+    reserve_sequence_block,
+    reset_sequence_leases,
+)
+from vendors.tests.api_tests import create_vendor, vendor_data
+
+
+@pytest.fixture(autouse=True)
+def fresh_leases():
+    reset_sequence_leases()
+    yield
+    reset_sequence_leases()
+
+
+@pytest.mark.django_db
+class TestSequenceAllocatorShould:
+    def test_reserve_consecutive_blocks(self):
+        assert reserve_sequence_block("XX", 2024, 10) == (1, 10)
+        assert reserve_sequence_block("XX", 2024, 5) == (11, 15)
+        assert reserve_sequence_block("XX", 2025, 5) == (1, 5)
+
+    def test_start_after_existing_codes(self):
+        vendor = create_vendor()
+        PurchaseOrder.objects.create(
+            vendor=vendor,
+            po_number="PO-2024-000041",
+            order_date="2024-04-01T00:00:00Z",
+            items=[],
+            quantity=1,
+        )
+
+        assert reserve_sequence_block("PO", 2024, 3) == (42, 44)
+
+    def test_allocate_unique_codes_through_the_api(self, settings):
+        settings.SEQUENCE_BLOCK_SIZE = 2
+        user = User.objects.create_user(username="testuser", password="password123")
+        client = APIClient()
+        client.force_login(user)
+
+        codes = [
+            client.post(reverse("vendors:vendor_list_create_api"), vendor_data())
+            .json()["vendor_code"]
+            for _ in range(5)
+        ]
+
+        assert len(set(codes)) == 5
+        assert codes[0].endswith("-00001")
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSequenceAllocatorConcurrencyShould:
+    threads = 8
+    rounds = 25
+
+    def run_concurrently(self, target):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=WAL")
+
+        results, errors = [], []
+        barrier = threading.Barrier(self.threads)
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.rounds):
+                    results.extend(target())
+            except Exception as exc:  # surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        assert errors == []
+        return results
+
+    def test_never_reserve_overlapping_blocks(self):
+        blocks = self.run_concurrently(
+            lambda: [reserve_sequence_block("ST", 2024, 3)]
+        )
+
+        numbers = [
+            number for first, last in blocks for number in range(first, last + 1)
+        ]
+        assert len(numbers) == len(set(numbers)) == self.threads * self.rounds * 3
+        assert SequenceCounter.objects.get(prefix="ST").last_value == len(numbers)
+
+    def test_never_allocate_duplicates_from_leases(self, settings):
+        settings.SEQUENCE_BLOCK_SIZE = 4
+        numbers = self.run_concurrently(
+            lambda: allocate_sequence_numbers("ST", 2024, 2)
+        )
+
+        assert len(numbers) == len(set(numbers)) == self.threads * self.rounds * 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_create_commits_its_po_numbers_before_ingesting(monkeypatch):
+    from vendors import apis
+
+    user = User.objects.create_user(username="testuser", password="password123")
+    client = APIClient()
+    client.force_login(user)
+    vendor = create_vendor()
+    committed = []
+
+    def read_counter_elsewhere(vendor_ids):
+        # another connection only sees what the bulk request committed
+        def read():
+            committed.extend(
+                SequenceCounter.objects.filter(prefix="PO").values_list(
+                    "last_value", flat=True
+                )
+            )
+            connections.close_all()
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+
+    monkeypatch.setattr(apis, "refresh_vendor_metrics", read_counter_elsewhere)
+    response = client.post(
+        reverse("vendors:po_bulk_api"),
+        [
+            {"vendor": vendor.id, "order_date": "2024-04-01T00:00:00Z",
+             "items": [], "quantity": 1}
+        ] * 2,
+        format="json",
+    )
+
+    assert response.status_code == 201
+    assert committed and committed[0] >= 2
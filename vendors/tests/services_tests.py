@@ -0,0 +1,267 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from vendors.management.commands.recompute_vendor_metrics import vendor_id_ranges
+from vendors.models import Vendor, PurchaseOrder, VendorPerformanceLog
+from vendors.services import (
+    RANKING_METRICS,
+    calculate_fullfilment_rate,
+    calculate_fullfilment_rate_old,
+    calculate_on_time_delivery_rating_avg,
+    calculate_on_time_delivery_rating_avg_old,
+    calculate_quality_rating_avg,
+    calculate_quality_rating_avg_old,
+    calculate_response_time,
+    calculate_response_time_old,
+    competition_ranks,
+    compute_vendor_scorecard,
+    rank_vendors,
+)
+
+
+def create_vendor(code):
+    return Vendor.objects.create(
+        name=code, contact_details="", address="", vendor_code=code
+    )
+
+
+def create_purchase_orders(vendor, count, completed_every=2):
+    now = timezone.now()
+    for index in range(count):
+        po = PurchaseOrder.objects.create(
+            vendor=vendor,
+            po_number=f"{vendor.vendor_code}-{index:06}",
+            order_date=now,
+            items=json.dumps(["leather straps"]),
+            quantity=index + 1,
+        )
+        if index % completed_every:
+            continue
+
+        po = PurchaseOrder.objects.get(pk=po.pk)
+        po.status = "completed"
+        po.delivery_date = now + timezone.timedelta(days=(index % 3) - 1)
+        po.quality_rating = (index % 5) or None
+        po.acknowledgment_date = po.issue_date + timezone.timedelta(minutes=index)
+        po.save()
+
+
+def assert_matches_old_implementations(vendor, scorecard):
+    assert scorecard["on_time_delivery_rate"] == pytest.approx(
+        calculate_on_time_delivery_rating_avg_old(vendor)
+    )
+    assert scorecard["quality_rating_avg"] == pytest.approx(
+        calculate_quality_rating_avg_old(vendor)
+    )
+    assert scorecard["average_response_time"] == pytest.approx(
+        calculate_response_time_old(vendor)
+    )
+    assert scorecard["fullfilment_rate"] == pytest.approx(
+        calculate_fullfilment_rate_old(vendor)
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "calculate,calculate_old",
+    [
+        (
+            calculate_on_time_delivery_rating_avg,
+            calculate_on_time_delivery_rating_avg_old,
+        ),
+        (calculate_quality_rating_avg, calculate_quality_rating_avg_old),
+        (calculate_response_time, calculate_response_time_old),
+        (calculate_fullfilment_rate, calculate_fullfilment_rate_old),
+    ],
+)
+def test_calculate_functions_match_old_implementations(calculate, calculate_old):
+    vendor = create_vendor("VE-A")
+    create_purchase_orders(vendor, 9, completed_every=2)
+
+    assert calculate(vendor) == pytest.approx(calculate_old(vendor))
+
+
+@pytest.mark.django_db
+class TestComputeVendorScorecardShould:
+    @pytest.mark.parametrize("count,completed_every", [(1, 1), (7, 2), (12, 3)])
+    def test_match_old_implementations_for_a_vendor(self, count, completed_every):
+        vendor = create_vendor("VE-A")
+        create_purchase_orders(vendor, count, completed_every)
+
+        assert_matches_old_implementations(vendor, compute_vendor_scorecard(vendor))
+
+    def test_match_old_implementations_for_many_vendors_in_one_query(self):
+        vendors = [create_vendor(f"VE-{index}") for index in range(4)]
+        for index, vendor in enumerate(vendors):
+            create_purchase_orders(vendor, 3 + index * 2, completed_every=index + 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            scorecards = compute_vendor_scorecard(vendor.id for vendor in vendors)
+
+        assert len(queries) == 1
+        for vendor in vendors:
+            assert_matches_old_implementations(vendor, scorecards[vendor.id])
+
+    def test_return_empty_scorecard_for_vendor_without_orders(self):
+        vendor = create_vendor("VE-A")
+
+        scorecard = compute_vendor_scorecard([vendor.id])[vendor.id]
+
+        assert scorecard["completed_orders_count"] == 0
+        assert scorecard["on_time_delivery_rate"] == 0
+        assert scorecard["fullfilment_rate"] == 0
+
+    def test_agree_with_incremental_counters(self):
+        vendor = create_vendor("VE-A")
+        create_purchase_orders(vendor, 9, completed_every=2)
+        vendor.refresh_from_db()
+
+        scorecard = compute_vendor_scorecard(vendor.id)
+
+        for field, value in scorecard.items():
+            assert getattr(vendor, field) == pytest.approx(value)
+
+    def test_recompute_all_vendors_with_management_command(self):
+        vendor = create_vendor("VE-A")
+        create_purchase_orders(vendor, 5, completed_every=2)
+        expected = compute_vendor_scorecard(vendor)
+        Vendor.objects.update(
+            completed_orders_count=0, quality_rating_avg=0, fullfilment_rate=0
+        )
+
+        call_command("recompute_vendor_metrics")
+
+        vendor.refresh_from_db()
+        for field, value in expected.items():
+            assert getattr(vendor, field) == pytest.approx(value)
+
+
+@pytest.mark.django_db
+class TestRecomputeVendorMetricsCommandShould:
+    def create_drifted_vendors(self, count):
+        vendors = [create_vendor(f"VE-{index}") for index in range(count)]
+        for vendor in vendors:
+            create_purchase_orders(vendor, 5, completed_every=2)
+        expected = compute_vendor_scorecard(vendor.id for vendor in vendors)
+        Vendor.objects.update(completed_orders_count=0, quality_rating_avg=0)
+        return vendors, expected
+
+    def test_only_print_the_diff_on_dry_run(self):
+        (vendor,), expected = self.create_drifted_vendors(1)
+        stdout = io.StringIO()
+
+        call_command("recompute_vendor_metrics", dry_run=True, stdout=stdout)
+
+        output = stdout.getvalue()
+        assert f"VE-0 ({vendor.id}): quality_rating_avg: 0.0 -> " in output
+        assert "1 of 1 vendor(s) would change" in output
+        vendor.refresh_from_db()
+        assert vendor.completed_orders_count == 0
+
+    def test_write_one_performance_log_per_vendor_by_default(self):
+        vendors, expected = self.create_drifted_vendors(3)
+        logs = VendorPerformanceLog.objects.count()
+
+        call_command("recompute_vendor_metrics", chunk_size=2, stdout=io.StringIO())
+
+        assert VendorPerformanceLog.objects.count() == logs + 3
+        for vendor in vendors:
+            latest = VendorPerformanceLog.objects.filter(vendor=vendor).latest("id")
+            assert latest.quality_rating_avg == pytest.approx(
+                expected[vendor.id]["quality_rating_avg"]
+            )
+
+    def test_write_no_performance_log_with_no_snapshot(self):
+        vendors, expected = self.create_drifted_vendors(2)
+        logs = VendorPerformanceLog.objects.count()
+
+        call_command("recompute_vendor_metrics", "--no-snapshot", stdout=io.StringIO())
+
+        assert VendorPerformanceLog.objects.count() == logs
+        vendors[0].refresh_from_db()
+        assert vendors[0].quality_rating_avg == pytest.approx(
+            expected[vendors[0].id]["quality_rating_avg"]
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recompute_id_ranges_in_worker_processes(self, monkeypatch):
+        # chunks are read under the write lock, concurrent workers need
+        # SQLite to take it upfront as the production profile does
+        monkeypatch.setitem(connection.settings_dict, "TRANSACTION_MODE", "IMMEDIATE")
+        monkeypatch.setattr(connection, "execute_wrappers", [])
+        vendors, expected = self.create_drifted_vendors(5)
+        stdout = io.StringIO()
+
+        call_command("recompute_vendor_metrics", workers=2, chunk_size=2, stdout=stdout)
+
+        assert "5 vendor(s) recomputed, 5 changed" in stdout.getvalue()
+        for vendor in vendors:
+            vendor.refresh_from_db()
+            for field, value in expected[vendor.id].items():
+                assert getattr(vendor, field) == pytest.approx(value)
+
+
+def test_vendor_id_ranges_cover_every_vendor_once(db):
+    vendors = [create_vendor(f"VE-{index}") for index in range(7)]
+    ids = [vendor.id for vendor in vendors]
+
+    ranges = vendor_id_ranges(3)
+
+    assert len(ranges) == 3
+    assert ranges[0][0] == ids[0] and ranges[-1][1] == ids[-1]
+    covered = [i for first, last in ranges for i in ids if first <= i <= last]
+    assert covered == ids
+
+
+def test_competition_ranks_share_ties_and_put_missing_values_last():
+    ranks = competition_ranks({"a": 3, "b": None, "c": 5, "d": 3})
+    assert ranks == {"c": 1, "a": 2, "d": 2, "b": 4}
+    assert competition_ranks({"a": 3, "c": 5}, descending=False) == {"a": 1, "c": 2}
+
+
+def test_rank_vendors_weights_positions_per_metric():
+    metrics = {
+        1: {
+            "on_time_delivery_rate": 100,
+            "quality_rating_avg": 2,
+            "average_response_time": 60,
+            "fullfilment_rate": 1.0,
+        },
+        2: {
+            "on_time_delivery_rate": 50,
+            "quality_rating_avg": 5,
+            "average_response_time": None,
+            "fullfilment_rate": 2.0,
+        },
+    }
+    weights = {"on_time_delivery_rate": 3, "quality_rating_avg": 1}
+
+    rankings = rank_vendors(metrics, weights)
+
+    assert rankings[1]["score"] == 75
+    assert rankings[2]["score"] == 25
+    assert rankings[1]["score_rank"] == 1
+    assert rankings[2]["quality_rating_avg_rank"] == 1
+    assert rankings[2]["average_response_time_rank"] == 2
+    assert rankings[1]["fullfilment_rate_rank"] == 1
+
+
+def test_rank_vendors_gives_no_credit_for_missing_metrics():
+    metric_values = {1: 90.0, 2: 10.0, 3: None, 4: None}
+    metrics = {
+        vendor_id: {metric: value for metric in RANKING_METRICS}
+        for vendor_id, value in metric_values.items()
+    }
+    weights = {metric: 1 for metric in RANKING_METRICS}
+
+    rankings = rank_vendors(metrics, weights)
+
+    assert rankings[3]["score"] == rankings[4]["score"] == 0
+    assert rankings[2]["score"] > 0
+    assert rankings[3]["score_rank"] == 3
@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+from vendors.instrumentation import observe_queries
+from vendors.sqlite import read_pragmas
+
+PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "cache_size", "temp_store")
+
+
+@pytest.fixture
+def connect(tmp_path, db):
+    opened = []
+
+    def connect(profile):
+        settings_dict = {
+            **connection.settings_dict,
+            "NAME": str(tmp_path / f"{profile}.sqlite3"),
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": False,
+            "TRANSACTION_MODE": None,
+            "PRAGMAS": None,
+            **settings.DATABASE_PROFILES[profile],
+        }
+        opened.append(DatabaseWrapper(settings_dict, alias=profile))
+        return opened[-1]
+
+    yield connect
+    for wrapper in opened:
+        wrapper.close()
+
+
+def test_production_profile_applies_pragmas_to_new_connections(connect):
+    wrapper = connect("production")
+    with observe_queries() as queries:
+        wrapper.ensure_connection()
+
+    assert queries.queries == 0
+    assert read_pragmas(wrapper, PRAGMAS) == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "busy_timeout": 5000,
+        "cache_size": -64000,
+        "temp_store": 2,
+    }
+    assert wrapper.settings_dict["CONN_MAX_AGE"] == 600
+    assert wrapper.settings_dict["CONN_HEALTH_CHECKS"]
+
+
+def test_production_profile_takes_the_write_lock_when_transactions_begin(connect):
+    wrapper = connect("production")
+    wrapper.ensure_connection()
+    other = sqlite3.connect(wrapper.settings_dict["NAME"], timeout=0)
+
+    wrapper._start_transaction_under_autocommit()
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            other.execute("BEGIN IMMEDIATE")
+    finally:
+        wrapper.connection.rollback()
+        other.close()
+
+
+def test_development_profile_keeps_sqlite_defaults(connect):
+    wrapper = connect("development")
+
+    assert read_pragmas(wrapper, ("journal_mode", "temp_store")) == {
+        "journal_mode": "delete",
+        "temp_store": 0,
+    }
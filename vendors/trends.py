@@ -0,0 +1,189 @@
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from vendors.models import VendorPerformanceLog, VendorPerformanceRollup
+from vendors.retention import acompacted_before, compacted_before
+from vendors.services import PERFORMANCE_LOG_METRICS
+
+TREND_BUCKETS = {
+    "hour": TruncHour,
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+# buckets served from the daily rollups rather than the raw logs
+ROLLUP_BUCKETS = ("day", "week", "month")
+
+# sources of the segments of a trend, "compacted" being the daily rollups of
+# the days whose raw logs were compacted
+LOGS, ROLLUPS, COMPACTED = "logs", "rollups", "compacted"
+
+
+def _raw_rows(vendor, bucket, start, end):
+    logs = VendorPerformanceLog.objects.filter(vendor=vendor)
+    if start:
+        logs = logs.filter(date__gte=start)
+    if end:
+        logs = logs.filter(date__lte=end)
+
+    aggregates = {"count": Count("id"), "last_id": Max("id")}
+    for metric in PERFORMANCE_LOG_METRICS:
+        aggregates[f"{metric}_avg"] = Avg(metric)
+        aggregates[f"{metric}_min"] = Min(metric)
+        aggregates[f"{metric}_max"] = Max(metric)
+
+    return (
+        logs.annotate(start=TREND_BUCKETS[bucket]("date"))
+        .values("start")
+        .annotate(**aggregates)
+        .order_by("start")
+    )
+
+
+def _finish_raw_rows(rows, last_logs):
+    for row in rows:
+        last_log = last_logs[row.pop("last_id")]
+        for metric in PERFORMANCE_LOG_METRICS:
+            row[f"{metric}_last"] = getattr(last_log, metric)
+    return rows
+
+
+def _raw_buckets(vendor, bucket, start, end):
+    rows = list(_raw_rows(vendor, bucket, start, end))
+    last_logs = VendorPerformanceLog.objects.in_bulk([row["last_id"] for row in rows])
+    return _finish_raw_rows(rows, last_logs)
+
+
+async def _araw_buckets(vendor, bucket, start, end):
+    rows = [row async for row in _raw_rows(vendor, bucket, start, end)]
+    last_logs = await VendorPerformanceLog.objects.ain_bulk(
+        [row["last_id"] for row in rows]
+    )
+    return _finish_raw_rows(rows, last_logs)
+
+
+def _rollups(vendor, start, end):
+    rollups = VendorPerformanceRollup.objects.filter(vendor=vendor)
+    if start:
+        rollups = rollups.filter(day__gte=timezone.localdate(start))
+    if end:
+        rollups = rollups.filter(day__lte=timezone.localdate(end))
+    return rollups
+
+
+def _rollup_rows(rollups, bucket):
+    aggregates = {"count": Sum("count"), "last_day": Max("day")}
+    for metric in PERFORMANCE_LOG_METRICS:
+        aggregates[f"{metric}_total"] = Sum(f"{metric}_sum")
+        aggregates[f"{metric}_min"] = Min(f"{metric}_min")
+        aggregates[f"{metric}_max"] = Max(f"{metric}_max")
+
+    return (
+        rollups.annotate(start=TREND_BUCKETS[bucket]("day"))
+        .values("start")
+        .annotate(**aggregates)
+        .order_by("start")
+    )
+
+
+def _finish_rollup_rows(rows, last_rollups):
+    for row in rows:
+        last_rollup = last_rollups[row.pop("last_day")]
+        for metric in PERFORMANCE_LOG_METRICS:
+            row[f"{metric}_avg"] = row.pop(f"{metric}_total") / row["count"]
+            row[f"{metric}_last"] = getattr(last_rollup, f"{metric}_last")
+    return rows
+
+
+def _rollup_buckets(vendor, bucket, start, end):
+    rollups = _rollups(vendor, start, end)
+    rows = list(_rollup_rows(rollups, bucket))
+    last_rollups = {
+        rollup.day: rollup
+        for rollup in rollups.filter(day__in=[row["last_day"] for row in rows])
+    }
+    return _finish_rollup_rows(rows, last_rollups)
+
+
+async def _arollup_buckets(vendor, bucket, start, end):
+    rollups = _rollups(vendor, start, end)
+    rows = [row async for row in _rollup_rows(rollups, bucket)]
+    last_rollups = {
+        rollup.day: rollup
+        async for rollup in rollups.filter(day__in=[row["last_day"] for row in rows])
+    }
+    return _finish_rollup_rows(rows, last_rollups)
+
+
+def _local_midnight(day):
+    """Start of a local day as an aware datetime, like the hourly buckets"""
+    return timezone.make_aware(
+        timezone.datetime.combine(day, timezone.datetime.min.time())
+    )
+
+
+def _trend_segments(bucket, start, end, cutoff):
+    """(source, bucket, start, end) of the reads making up a trend, in order"""
+    if bucket in ROLLUP_BUCKETS:
+        return [(ROLLUPS, bucket, start, end)]
+    if cutoff is None or (start is not None and start >= cutoff):
+        return [(LOGS, bucket, start, end)]
+
+    # compacted days only kept a snapshot, their daily rollup stands in
+    if end is not None and end < cutoff:
+        return [(COMPACTED, "day", start, end)]
+    return [
+        (COMPACTED, "day", start, cutoff - timezone.timedelta(microseconds=1)),
+        (LOGS, bucket, cutoff, end),
+    ]
+
+
+def _segment_rows(source, rows):
+    if source == COMPACTED:
+        for row in rows:
+            row["start"] = _local_midnight(row["start"])
+    return rows
+
+
+def _trend(rows):
+    return [
+        {
+            "start": row["start"],
+            "count": row["count"],
+            **{
+                metric: {
+                    aggregate: row[f"{metric}_{aggregate}"]
+                    for aggregate in ("avg", "min", "max", "last")
+                }
+                for metric in PERFORMANCE_LOG_METRICS
+            },
+        }
+        for row in rows
+    ]
+
+
+def performance_trend(vendor, bucket, start=None, end=None):
+    """Per-bucket avg/min/max/last of a vendor's performance metrics.
+
+    Hourly buckets aggregate the raw logs, coarser buckets aggregate the daily
+    rollups so ``start``/``end`` apply to whole days. Hourly trends fall back
+    to one daily bucket per day, starting at local midnight, over the days whose
+    logs were compacted"""
+    cutoff = None if bucket in ROLLUP_BUCKETS else compacted_before()
+    rows = []
+    for source, *segment in _trend_segments(bucket, start, end, cutoff):
+        read = _raw_buckets if source == LOGS else _rollup_buckets
+        rows += _segment_rows(source, read(vendor, *segment))
+    return _trend(rows)
+
+
+async def aperformance_trend(vendor, bucket, start=None, end=None):
+    """``performance_trend`` read through the async ORM"""
+    cutoff = None if bucket in ROLLUP_BUCKETS else await acompacted_before()
+    rows = []
+    for source, *segment in _trend_segments(bucket, start, end, cutoff):
+        read = _araw_buckets if source == LOGS else _arollup_buckets
+        rows += _segment_rows(source, await read(vendor, *segment))
+    return _trend(rows)
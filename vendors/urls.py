@@ -1,17 +1,36 @@
+from django.conf import settings
 from django.urls import path, include
 from vendors.apis import (
     VendorListCreateAPI,
     VendorRetrieveUpdateDestroyAPI,
     PurchaseOrderListCreateAPI,
+    PurchaseOrderBulkAPI,
+    PurchaseOrderBulkAcknowledgmentAPI,
     PurchaseOrderAcknowledgmentAPI,
     PurchaseOrderRetrieveUpdateDestroyAPI,
     VendorPerformanceAPI,
-    VendorPerformanceTrendAPI
+    VendorPerformanceTrendAPI,
+    VendorRankingListAPI,
+    VendorRankingAPI,
+    PurchaseOrderExportAPI,
+    VendorPerformanceLogExportAPI,
 )
+from vendors.async_apis import (
+    AsyncVendorPerformanceAPI,
+    AsyncVendorPerformanceTrendAPI,
+    AsyncVendorPerformanceLogStreamAPI,
+    AsyncVendorPerformanceEventsAPI,
+)
+from vendors.prometheus import metrics_view
+
+if settings.VENDOR_ASYNC_READ_VIEWS:
+    VendorPerformanceAPI = AsyncVendorPerformanceAPI
+    VendorPerformanceTrendAPI = AsyncVendorPerformanceTrendAPI
 
 app_name = "vendors"
 
 urlpatterns = [
+    path("metrics", metrics_view, name="metrics"),
     path(
         "api/",
         include(
@@ -21,6 +40,16 @@ urlpatterns = [
                     VendorListCreateAPI.as_view(),
                     name="vendor_list_create_api",
                 ),
+                path(
+                    "vendors/rankings",
+                    VendorRankingListAPI.as_view(),
+                    name="vendor_ranking_list_api",
+                ),
+                path(
+                    "vendors/performance/events",
+                    AsyncVendorPerformanceEventsAPI.as_view(),
+                    name="vendor_performance_events_api",
+                ),
                 path(
                     "vendors/<int:vendor_id>/",
                     VendorRetrieveUpdateDestroyAPI.as_view(),
@@ -36,11 +65,41 @@ urlpatterns = [
                     VendorPerformanceTrendAPI.as_view(),
                     name="vendor_performance_log_api",
                 ),
+                path(
+                    "vendors/<int:vendor_id>/performance/logs/stream",
+                    AsyncVendorPerformanceLogStreamAPI.as_view(),
+                    name="vendor_performance_log_stream_api",
+                ),
+                path(
+                    "vendors/<int:vendor_id>/ranking",
+                    VendorRankingAPI.as_view(),
+                    name="vendor_ranking_api",
+                ),
                 path(
                     "purchase_orders/",
                     PurchaseOrderListCreateAPI.as_view(),
                     name="po_list_create_api",
                 ),
+                path(
+                    "purchase_orders/bulk",
+                    PurchaseOrderBulkAPI.as_view(),
+                    name="po_bulk_api",
+                ),
+                path(
+                    "purchase_orders/bulk/acknowledge",
+                    PurchaseOrderBulkAcknowledgmentAPI.as_view(),
+                    name="po_bulk_acknowledgment_api",
+                ),
+                path(
+                    "purchase_orders/export.<str:export_format>",
+                    PurchaseOrderExportAPI.as_view(),
+                    name="po_export_api",
+                ),
+                path(
+                    "performance_logs/export.<str:export_format>",
+                    VendorPerformanceLogExportAPI.as_view(),
+                    name="performance_log_export_api",
+                ),
                 path(
                     "purchase_orders/<int:po_id>",
                     PurchaseOrderRetrieveUpdateDestroyAPI.as_view(),